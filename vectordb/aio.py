@@ -0,0 +1,57 @@
+"""Async helpers for the search path.
+
+Embedding and ``knn_query`` are CPU bound, so on the async path they run in a
+bounded thread pool instead of blocking the event loop. Remote encoders that
+implement ``aembed`` / ``aembed_query`` are awaited natively.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .settings import vectordb_settings
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=vectordb_settings.ASYNC_MAX_WORKERS,
+                    thread_name_prefix="vectordb-async",
+                )
+    return _executor
+
+
+async def run_in_executor(fn, *args, **kwargs):
+    """Run ``fn`` in the vectordb thread pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(fn, *args, **kwargs)
+    )
+
+
+async def aembed(embedding_fn, texts):
+    if hasattr(embedding_fn, "aembed"):
+        return await embedding_fn.aembed(texts)
+    return await run_in_executor(embedding_fn, texts)
+
+
+async def aembed_query(embedding_fn, text: str) -> np.ndarray:
+    """Async counterpart of ``queryset._embed_query``, returns a (1, dim) array."""
+    if hasattr(embedding_fn, "aembed_query"):
+        embedding = await embedding_fn.aembed_query(text)
+    elif hasattr(embedding_fn, "embed_query"):
+        embedding = await run_in_executor(embedding_fn.embed_query, text)
+    else:
+        embedding = await aembed(embedding_fn, [text])
+    return np.asarray(embedding, dtype=np.float32).reshape(1, -1)
@@ -1,3 +1,6 @@
 from .abcz import AbstractIndex  # noqa
+from .buffer import BufferedIndexWriter  # noqa
+from .concurrent import ConcurrentIndex  # noqa
 from .indexes import BFIndex, HSWNLibIndex  # noqa
+from .sharded import ShardedIndex  # noqa
 from .singleton import SingletonABCMeta  # noqa
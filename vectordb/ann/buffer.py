@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger("VectorDB")
+
+
+class BufferedIndexWriter:
+    """Collects adds, updates and deletes and applies them to an index in bulk.
+
+    Only the last write of every id is kept. Adds are applied with
+    ``index.add`` and updates with ``index.update``: hnswlib writes an added
+    label to the slot of a deleted vector, which for a label already in the
+    index leaves its previous vector searchable. The buffer is flushed when it
+    holds ``max_size`` ids, ``max_delay`` seconds after the first buffered
+    write, or when `flush` is called, e.g. before a search that must see the
+    latest writes.
+
+    hnswlib cannot resize an index while it is searched, so unless
+    ``background`` is set the delayed flush is not run by a timer thread but
+    by the next write or `flush_due` call once the delay has passed, on the
+    caller's thread. Set ``background`` only for indexes that can be written
+    while they are searched, such as a `ConcurrentIndex`.
+    """
+
+    def __init__(
+        self,
+        index,
+        max_size: int = 1000,
+        max_delay: float | None = 1.0,
+        background: bool = False,
+    ):
+        self.index = index
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.background = background
+        self._adds = {}
+        self._updates = {}
+        self._deletes = set()
+        self._lock = threading.RLock()
+        self._timer = None
+        self._first_write_at = None
+
+    def __len__(self):
+        return len(self._adds) + len(self._updates) + len(self._deletes)
+
+    @staticmethod
+    def _rows(embeddings, ids):
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        return zip(ids.tolist(), embeddings)
+
+    def add(self, embeddings, ids):
+        with self._lock:
+            for id, embedding in self._rows(embeddings, ids):
+                if id in self._deletes or id in self._updates:
+                    # the label is in the index, deleted or not
+                    self._deletes.discard(id)
+                    self._updates[id] = embedding
+                else:
+                    self._adds[id] = embedding
+            self._written()
+        return self
+
+    def update(self, embeddings, ids):
+        with self._lock:
+            for id, embedding in self._rows(embeddings, ids):
+                self._deletes.discard(id)
+                if id in self._adds:
+                    # not in the index yet
+                    self._adds[id] = embedding
+                else:
+                    self._updates[id] = embedding
+            self._written()
+        return self
+
+    def delete(self, ids):
+        with self._lock:
+            for id in np.asarray(ids, dtype=np.int64).reshape(-1).tolist():
+                self._adds.pop(id, None)
+                self._updates.pop(id, None)
+                self._deletes.add(id)
+            self._written()
+        return self
+
+    def _written(self):
+        if self._first_write_at is None:
+            self._first_write_at = time.monotonic()
+        if len(self) >= self.max_size:
+            self.flush()
+        elif not self.background:
+            self.flush_due()
+        elif self._timer is None and self.max_delay is not None:
+            self._timer = threading.Timer(self.max_delay, self._flush_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush_due(self) -> int:
+        """Apply the buffered writes if the first one is ``max_delay`` old."""
+        with self._lock:
+            if (
+                self.max_delay is None
+                or self._first_write_at is None
+                or time.monotonic() - self._first_write_at < self.max_delay
+            ):
+                return 0
+            return self.flush()
+
+    def flush(self) -> int:
+        """Apply the buffered writes to the index.
+
+        The writes are kept in the buffer if the index raises, so that the
+        next flush applies them again.
+
+        Returns:
+            int: The number of ids written.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            first_write_at, self._first_write_at = self._first_write_at, None
+
+            adds, updates, deletes = self._adds, self._updates, self._deletes
+            self._adds, self._updates, self._deletes = {}, {}, set()
+
+            try:
+                if deletes:
+                    self.index.delete(np.fromiter(deletes, dtype=np.int64))
+                for method, rows in (("update", updates), ("add", adds)):
+                    if rows:
+                        ids = np.fromiter(rows, dtype=np.int64, count=len(rows))
+                        getattr(self.index, method)(np.stack(list(rows.values())), ids)
+            except Exception:
+                # the writer holds the lock, nothing was buffered meanwhile
+                self._adds, self._updates, self._deletes = adds, updates, deletes
+                self._first_write_at = first_write_at
+                raise
+        return len(adds) + len(updates) + len(deletes)
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not apply the buffered index writes")
@@ -0,0 +1,194 @@
+"""Concurrent searches and writes on one in-memory index.
+
+hnswlib can search an index while points are added or marked as deleted,
+but not while it is resized, and threaded or ASGI servers search the index
+from several threads while the signal handlers write to it. A
+`ConcurrentIndex` wraps an `HNSWIndex` so that:
+
+- searches never take a lock, they run on the index current when they start.
+  A point being added can hide its neighbours from a search running at the
+  same time, so a search that finds fewer than k vectors while a write was
+  being applied is retried, after that write in the worst case;
+- writes go through a bounded queue to a single writer thread, and the
+  caller waits until its write is applied;
+- when an add needs more room, the writer resizes a copy of the index, applies
+  the add to the copy and swaps it in. Searches already running finish on the
+  previous index.
+
+Deleted slots are not reused, since reusing them rewrites the neighbours of
+a point while it may be searched. The index grows instead, until the next
+rebuild.
+"""
+
+from __future__ import annotations
+
+import copy
+import queue
+import threading
+import time
+
+from . import AbstractIndex
+from .indexes import HNSWIndex, HSWNLibIndex
+
+# times a search that overlapped a write is retried, waiting twice as long
+# each time for the write to finish, from SEARCH_RETRY_DELAY seconds
+SEARCH_RETRIES = 10
+SEARCH_RETRY_DELAY = 0.001
+
+
+class _Write:
+    __slots__ = ("method", "args", "done", "error")
+
+    def __init__(self, method, args):
+        self.method = method
+        self.args = args
+        self.done = threading.Event()
+        self.error = None
+
+
+class ConcurrentIndex(AbstractIndex):
+    """Many readers and a single writer on an `HNSWIndex`.
+
+    Args:
+        index (HNSWIndex): The wrapped index, it must not be written to
+            directly any more.
+        max_pending (int, optional): Number of writes that can wait for the
+            writer, further writes block until there is room.
+    """
+
+    def __init__(self, index: HNSWIndex, max_pending: int = 1000):
+        self.index = index
+        self.max_pending = max_pending
+        self.resizes = 0
+        # odd while the writer applies a write
+        self._writes_applied = 0
+        self._writes = queue.Queue(maxsize=max_pending)
+        self._writer = threading.Thread(
+            target=self._run_writer, name="vectordb-index-writer", daemon=True
+        )
+        self._writer.start()
+
+    # reads, on the current index
+
+    def __call__(self, *args, **kwargs):
+        return self.search(*args, **kwargs)
+
+    @property
+    def size(self):
+        return self.index.size
+
+    @property
+    def dim(self):
+        return self.index.dim
+
+    @property
+    def space(self):
+        return self.index.space
+
+    @property
+    def max_elements(self):
+        return self.index.max_elements
+
+    @property
+    def metadata(self):
+        return self.index.metadata
+
+    def search(self, query, k=10, **kwargs):
+        delay = SEARCH_RETRY_DELAY
+        for attempt in range(SEARCH_RETRIES + 1):
+            writes_applied = self._writes_applied
+            try:
+                return self.index.search(query, k, **kwargs)
+            except RuntimeError:
+                # fewer than k vectors found, for real unless a write overlapped
+                overlapped = (
+                    writes_applied % 2 or self._writes_applied != writes_applied
+                )
+                if not overlapped or attempt == SEARCH_RETRIES:
+                    raise
+            if self._writes_applied % 2:
+                time.sleep(delay)
+                delay *= 2
+
+    # the range search only calls search
+    range_search = HSWNLibIndex.range_search
+
+    def get_embeddings(self, ids):
+        return self.index.get_embeddings(ids)
+
+    def get_ids(self):
+        return self.index.get_ids()
+
+    # writes, applied one at a time by the writer thread
+
+    def _submit(self, method, *args):
+        write = _Write(method, args)
+        self._writes.put(write)
+        write.done.wait()
+        if write.error is not None:
+            raise write.error
+        return self
+
+    def add(self, embeddings, ids):
+        return self._submit("add", embeddings, ids)
+
+    def update(self, embeddings, ids):
+        return self._submit("add", embeddings, ids)
+
+    def delete(self, ids):
+        return self._submit("delete", ids)
+
+    def persist(self, directory):
+        return self._submit("persist", directory)
+
+    def reset(self):
+        return self._submit("reset")
+
+    @classmethod
+    def load(cls, directory):
+        return cls(HNSWIndex.load(directory), should_not_cache=True)
+
+    def close(self):
+        """Stop the writer thread once the pending writes are applied."""
+        self._writes.put(None)
+        self._writer.join()
+
+    def _run_writer(self):
+        while True:
+            write = self._writes.get()
+            if write is None:
+                return
+            self._writes_applied += 1
+            try:
+                getattr(self, f"_apply_{write.method}")(*write.args)
+            except Exception as e:
+                write.error = e
+            finally:
+                self._writes_applied += 1
+                write.done.set()
+
+    def _apply_add(self, embeddings, ids):
+        index = self.index
+        if index.size + len(ids) > index.max_elements:
+            index = self._resized(index, index.size + len(ids))
+            index.update(embeddings, ids, replace_deleted=False)
+            self.index = index
+        else:
+            index.update(embeddings, ids, replace_deleted=False)
+
+    def _apply_delete(self, ids):
+        self.index.delete(ids)
+
+    def _apply_persist(self, directory):
+        self.index.persist(directory)
+
+    def _apply_reset(self):
+        index = copy.copy(self.index)
+        self.index = index.reset()
+
+    def _resized(self, index, min_size):
+        resized = copy.copy(index)
+        resized.index = type(index.index)(index.index)
+        resized.resize(min_size)
+        self.resizes += 1
+        return resized
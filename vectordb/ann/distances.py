@@ -0,0 +1,43 @@
+"""Distances and similarity scores, as defined by the hnswlib spaces.
+
+- "l2": squared euclidean distance, the score is ``1 / (1 + distance)``
+- "cosine": one minus the cosine similarity, the score is the similarity
+- "ip": one minus the inner product, the score is the inner product
+"""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+
+def prepare(embeddings: np.ndarray, space: str) -> np.ndarray:
+    """Normalize ``embeddings`` for the cosine space, like hnswlib does."""
+    if space == "cosine":
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-30)
+    return embeddings
+
+
+def pairwise_distances(a: np.ndarray, b: np.ndarray, space: str) -> np.ndarray:
+    """Return the ``(len(a), len(b))`` distances between prepared embeddings."""
+    products = a @ b.T
+    if space == "l2":
+        squared_a = np.einsum("ij,ij->i", a, a)[:, None]
+        squared_b = np.einsum("ij,ij->i", b, b)[None, :]
+        return np.maximum(squared_a + squared_b - 2 * products, 0)
+    return 1 - products
+
+
+def distance_to_score(distance, space: str):
+    if space == "l2":
+        return 1 / (1 + np.asarray(distance))
+    return 1 - np.asarray(distance)
+
+
+def score_to_distance(score: float, space: str) -> float:
+    """Return the largest distance whose score is at least ``score``."""
+    if space == "l2":
+        return 1 / score - 1 if score > 0 else math.inf
+    return 1 - score
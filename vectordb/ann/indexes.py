@@ -4,9 +4,14 @@ import json
 import os
 
 import hnswlib
+import numpy as np
 
 from . import AbstractIndex
 
+# number of neighbours a range search looks at first, doubled until the
+# farthest one is out of range
+RANGE_SEARCH_INITIAL_K = 32
+
 
 class HSWNLibIndex(AbstractIndex):
     def __init__(self, dim, max_elements, space="cosine", *args, **kwargs):
@@ -23,21 +28,88 @@ class HSWNLibIndex(AbstractIndex):
 
     def add(self, embeddings, ids, replace_deleted=True):
         if self.size + len(ids) > self.max_elements:
-            self.resize()
+            self.resize(self.size + len(ids))
         self.index.add_items(embeddings, ids, replace_deleted=replace_deleted)
         return self
 
-    def update(self, embeddings, ids, replace_deleted=True):
+    def update(self, embeddings, ids, replace_deleted=False):
+        # with replace_deleted, hnswlib writes a label that is already in the
+        # index to a deleted slot and leaves it in its previous slot as well,
+        # so the labels are updated in their slot, deleted ones included
+        for id in ids:
+            try:
+                self.index.unmark_deleted(id)
+            except RuntimeError:
+                # not in the index or not deleted
+                pass
+        # labels that are not in the index yet take a new slot
+        if self.size + len(ids) > self.max_elements:
+            self.resize(self.size + len(ids))
         self.index.add_items(embeddings, ids, replace_deleted=replace_deleted)
         return self
 
     def delete(self, ids):
         for id in ids:
-            self.index.mark_deleted(id)
+            try:
+                self.index.mark_deleted(id)
+            except RuntimeError:
+                # not in the index or already deleted
+                pass
         return self
 
-    def resize(self):
-        size = int(self.index.get_current_count() * 1.2)
+    def range_search(self, query, max_distance: float, k: int, **kwargs):
+        """Return the ``(labels, distances)`` within ``max_distance`` of ``query``.
+
+        Args:
+            query: A single embedding.
+            max_distance (float): Distance above which vectors are left out.
+            k (int): Maximum number of vectors to return, no more than the
+                number of vectors that can be searched.
+            **kwargs: Passed to `search`.
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(1, -1)
+        n = min(k, RANGE_SEARCH_INITIAL_K)
+        while True:
+            labels, distances = self.search(query, n, **kwargs)
+            labels, distances = labels[0], distances[0]
+            if n == k or len(distances) == 0 or distances[-1] > max_distance:
+                break
+            n = min(n * 2, k)
+        within = np.searchsorted(distances, max_distance, side="right")
+        return labels[:within], distances[:within]
+
+    def get_ids(self) -> np.ndarray:
+        """Return the labels of the index, including the ones marked as deleted."""
+        return np.asarray(self.index.get_ids_list(), dtype=np.int64)
+
+    def get_embeddings(self, ids):
+        """Return ``(ids, embeddings)`` for the labels found in the index.
+
+        Labels that are not in the index or marked as deleted are skipped.
+        """
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if len(ids) == 0:
+            return ids, np.empty((0, self.dim), dtype=np.float32)
+        try:
+            embeddings = self.index.get_items(ids, return_type="numpy")
+            return ids, np.asarray(embeddings, dtype=np.float32)
+        except RuntimeError:
+            pass
+        # look the labels up one by one to skip the missing ones
+        found, embeddings = [], []
+        for id in ids.tolist():
+            try:
+                embeddings.append(self.index.get_items([id], return_type="numpy")[0])
+            except RuntimeError:
+                continue
+            found.append(id)
+        return (
+            np.asarray(found, dtype=np.int64),
+            np.asarray(embeddings, dtype=np.float32).reshape(len(found), self.dim),
+        )
+
+    def resize(self, min_size: int = 0):
+        size = max(int(self.index.get_current_count() * 1.2), min_size)
         self.index.resize_index(size)
         self.max_elements = size
         return self
@@ -48,16 +120,23 @@ class HSWNLibIndex(AbstractIndex):
         with open(directory + ".meta", "r") as f:
             data = json.load(f)
 
-        instance = cls(**data)
+        # a fresh instance, the cached one for the same metadata may be in use
+        instance = cls(**data, should_not_cache=True)
 
         # Load the HNSWLib index using HNSWLib's own method
-        instance.index.load_index(os.path.join(directory, "vector.index"))
+        instance.load_index(os.path.join(directory, "vector.index"))
 
         # Initialize the class with the loaded attributes
         return instance
 
+    def load_index(self, path):
+        self.index.load_index(path)
+        return self
+
     def reset(self):
-        self.index.reset()
+        # hnswlib has no way to clear an index, start a new one
+        self.index = type(self.index)(space=self.space, dim=self.dim)
+        self.init_index()
         return self
 
 
@@ -116,6 +195,9 @@ class BFIndex(HSWNLibIndex):
 
 
 class HNSWIndex(HSWNLibIndex):
+    # threads used by unfiltered searches, -1 for all the cores
+    num_threads = -1
+
     def __init__(
         self,
         dim: int,
@@ -149,6 +231,11 @@ class HNSWIndex(HSWNLibIndex):
         )
         return self
 
+    def load_index(self, path):
+        # the flag is not saved with the index, set it as init_index does
+        self.index.load_index(path, allow_replace_deleted=True)
+        return self
+
     def search(self, query, k=10, **kwargs):
         ids_in = kwargs.get("ids__in", None)
         ids_not_in = kwargs.get("ids__not_in", None)
@@ -171,7 +258,7 @@ class HNSWIndex(HSWNLibIndex):
         if filter_fn is not None:
             return self.index.knn_query(query, k, filter=filter_fn, num_threads=1)
 
-        return self.index.knn_query(query, k, num_threads=-1)
+        return self.index.knn_query(query, k, num_threads=self.num_threads)
 
     @property
     def metadata(self):
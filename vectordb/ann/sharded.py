@@ -0,0 +1,369 @@
+"""An index split across worker processes.
+
+hnswlib only releases the GIL inside a single ``knn_query``, and filtered
+searches run on one thread because the filter is a python callable. A
+`ShardedIndex` spreads the vectors over ``n_shards`` HNSW indexes, each held
+by its own process, by hash of their id (``id % n_shards``). A search is
+sent to every shard at once, each shard returns its own top k and the
+results are merged with a vectorized top k selection, so filtered and
+unfiltered searches both run on as many cores as there are shards.
+
+With ``affinity=True`` every shard is pinned to its own slice of the CPUs the
+process may run on, and its unfiltered searches use as many threads as its
+slice has cores.
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import threading
+import weakref
+
+import numpy as np
+
+from . import AbstractIndex
+from .indexes import HNSWIndex, HSWNLibIndex
+
+
+def merge_topk(labels, distances, k: int):
+    """Merge the per shard ``(labels, distances)`` into the overall top ``k``.
+
+    Args:
+        labels (list[np.ndarray]): The labels found by each shard, with one
+            row per query.
+        distances (list[np.ndarray]): The matching distances.
+        k (int): Number of neighbours kept per query.
+    """
+    labels = np.concatenate(labels, axis=1)
+    distances = np.concatenate(distances, axis=1)
+    k = min(k, distances.shape[1])
+    if k < distances.shape[1]:
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(k), distances.shape)
+    order = np.argsort(
+        np.take_along_axis(distances, top, axis=1), axis=1, kind="stable"
+    )
+    top = np.take_along_axis(top, order, axis=1)
+    return (
+        np.take_along_axis(labels, top, axis=1),
+        np.take_along_axis(distances, top, axis=1),
+    )
+
+
+def _empty_results(query):
+    return (
+        np.empty((len(query), 0), dtype=np.uint64),
+        np.empty((len(query), 0), dtype=np.float32),
+    )
+
+
+def _search_shard(index, query, k, kwargs):
+    # the shard may hold fewer vectors than k, don't raise an error
+    ids_in = kwargs.get("ids__in", None)
+    k = min(k, index.size if ids_in is None else len(ids_in))
+    if k == 0:
+        return _empty_results(query)
+    try:
+        return index.search(query, k, **kwargs)
+    except RuntimeError:
+        # the size counts the deleted vectors, count the ones that can be
+        # found and return fewer results, merge_topk takes them as they are
+        candidates = index.get_ids() if ids_in is None else list(ids_in)
+        live = set(index.get_embeddings(candidates)[0].tolist())
+        live -= set(kwargs.get("ids__not_in", None) or ())
+        if len(live) >= k:
+            raise
+        if not live:
+            return _empty_results(query)
+        return index.search(query, len(live), **kwargs)
+
+
+def _call_shard(index, method, args):
+    if method == "search":
+        return _search_shard(index, *args)
+    if method == "size":
+        return index.size
+    if method == "get_ids":
+        return index.get_ids()
+    if method == "get_embeddings":
+        return index.get_embeddings(*args)
+    # add, update, delete, persist and reset
+    getattr(index, method)(*args)
+
+
+def _run_shard(conn, index_kwargs, path, cpus, num_threads):
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    if path is not None:
+        index = HNSWIndex.load(path)
+    else:
+        index = HNSWIndex(**index_kwargs, should_not_cache=True)
+    index.num_threads = num_threads
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if message is None:
+            return
+        method, args = message
+        try:
+            conn.send((True, _call_shard(index, method, args)))
+        except Exception as e:
+            conn.send((False, e))
+
+
+def _stop_shards(shards):
+    for process, conn in shards:
+        try:
+            conn.send(None)
+        except OSError:
+            pass
+        conn.close()
+    for process, _ in shards:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+
+
+class ShardedIndex(AbstractIndex):
+    """HNSW index split across ``n_shards`` worker processes.
+
+    Args:
+        dim (int): Dimension of the embeddings.
+        max_elements (int): Initial capacity, spread over the shards.
+        n_shards (int, optional): Number of shards, defaults to the number of
+            CPUs available.
+        space (str, optional): "l2", "cosine" or "ip".
+        affinity (bool, optional): Pin every shard to its own CPUs.
+        M, ef_construction, ef: See `HNSWIndex`.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        max_elements: int,
+        n_shards: int | None = None,
+        space: str = "l2",
+        affinity: bool = False,
+        M: int = 64,
+        ef_construction: int = 128,
+        ef: int = 50,
+        _paths=None,
+    ):
+        cpus = sorted(os.sched_getaffinity(0))
+        self.n_shards = n_shards or len(cpus)
+        self.dim = dim
+        self.space = space
+        self.max_elements = max_elements
+        self.affinity = affinity
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self._lock = threading.Lock()
+
+        index_kwargs = {
+            "dim": dim,
+            "max_elements": max(-(-max_elements // self.n_shards), 1),
+            "space": space,
+            "M": M,
+            "ef_construction": ef_construction,
+            "ef": ef,
+        }
+        cpu_slices = [part.tolist() for part in np.array_split(cpus, self.n_shards)]
+        # spawn, forking a process that runs threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        self._shards = []
+        for shard in range(self.n_shards):
+            shard_cpus = cpu_slices[shard] if affinity else None
+            num_threads = len(shard_cpus or []) or max(len(cpus) // self.n_shards, 1)
+            conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_run_shard,
+                args=(
+                    child_conn,
+                    index_kwargs,
+                    _paths[shard] if _paths is not None else None,
+                    shard_cpus,
+                    num_threads,
+                ),
+                name=f"vectordb-shard-{shard}",
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._shards.append((process, conn))
+        self._finalizer = weakref.finalize(self, _stop_shards, self._shards)
+
+    def __call__(self, *args, **kwargs):
+        return self.search(*args, **kwargs)
+
+    def _shard_of(self, ids: np.ndarray) -> np.ndarray:
+        return np.asarray(ids, dtype=np.int64) % self.n_shards
+
+    def _scatter(self, requests: dict) -> dict:
+        """Send ``{shard: (method, args)}`` and return ``{shard: result}``."""
+        with self._lock:
+            for shard, request in requests.items():
+                self._shards[shard][1].send(request)
+            results, error = {}, None
+            # read every answer, even after an error, to keep the pipes in sync
+            for shard in requests:
+                ok, result = self._shards[shard][1].recv()
+                if ok:
+                    results[shard] = result
+                elif error is None:
+                    error = result
+        if error is not None:
+            raise error
+        return results
+
+    def _scatter_all(self, method, *args) -> list:
+        results = self._scatter(
+            {shard: (method, args) for shard in range(self.n_shards)}
+        )
+        return [results[shard] for shard in range(self.n_shards)]
+
+    def _route(self, method, embeddings, ids):
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        shards = self._shard_of(ids)
+        requests = {}
+        for shard in np.unique(shards).tolist():
+            mask = shards == shard
+            args = (ids[mask],) if embeddings is None else (embeddings[mask], ids[mask])
+            requests[shard] = (method, args)
+        self._scatter(requests)
+
+    @property
+    def size(self):
+        return sum(self._scatter_all("size"))
+
+    def add(self, embeddings, ids):
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        self._route("add", embeddings, ids)
+        return self
+
+    def update(self, embeddings, ids):
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        self._route("update", embeddings, ids)
+        return self
+
+    def delete(self, ids):
+        self._route("delete", None, ids)
+        return self
+
+    def _split_ids(self, ids) -> list:
+        if ids is None:
+            return [None] * self.n_shards
+        ids = np.fromiter(ids, dtype=np.int64, count=len(ids))
+        shards = self._shard_of(ids)
+        return [set(ids[shards == shard].tolist()) for shard in range(self.n_shards)]
+
+    def search(self, query, k=10, **kwargs):
+        """Search every shard and merge their results, like `HNSWIndex.search`."""
+        query = np.asarray(query, dtype=np.float32).reshape(-1, self.dim)
+        ids_in = self._split_ids(kwargs.pop("ids__in", None))
+        ids_not_in = self._split_ids(kwargs.pop("ids__not_in", None))
+
+        requests = {}
+        for shard in range(self.n_shards):
+            if ids_in[shard] is not None and not ids_in[shard]:
+                # none of the allowed ids are in this shard
+                continue
+            shard_kwargs = dict(kwargs)
+            if ids_in[shard] is not None:
+                shard_kwargs["ids__in"] = ids_in[shard]
+            if ids_not_in[shard]:
+                shard_kwargs["ids__not_in"] = ids_not_in[shard]
+            requests[shard] = ("search", (query, k, shard_kwargs))
+        if not requests:
+            return _empty_results(query)
+
+        results = self._scatter(requests).values()
+        labels, distances = merge_topk(
+            [labels for labels, _ in results],
+            [distances for _, distances in results],
+            k,
+        )
+        if labels.shape[1] < k:
+            raise RuntimeError(
+                "Cannot return the results in a contiguous 2D array. "
+                "Probably ef or M is too small"
+            )
+        return labels, distances
+
+    # the range search only calls search
+    range_search = HSWNLibIndex.range_search
+
+    def get_embeddings(self, ids):
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        shards = self._shard_of(ids)
+        requests = {
+            shard: ("get_embeddings", (ids[shards == shard],))
+            for shard in np.unique(shards).tolist()
+        }
+        results = list(self._scatter(requests).values())
+        if not results:
+            return ids, np.empty((0, self.dim), dtype=np.float32)
+        found = np.concatenate([found for found, _ in results])
+        embeddings = np.concatenate([embeddings for _, embeddings in results])
+        # back in the order of ids, like HNSWIndex.get_embeddings
+        positions = {id: position for position, id in enumerate(ids.tolist())}
+        order = np.argsort(
+            np.fromiter(
+                (positions[id] for id in found.tolist()),
+                dtype=np.int64,
+                count=len(found),
+            ),
+            kind="stable",
+        )
+        return found[order], embeddings[order]
+
+    def get_ids(self) -> np.ndarray:
+        return np.concatenate(self._scatter_all("get_ids"))
+
+    @property
+    def metadata(self):
+        return {
+            "dim": self.dim,
+            "max_elements": self.max_elements,
+            "n_shards": self.n_shards,
+            "space": self.space,
+            "affinity": self.affinity,
+            "M": self.M,
+            "ef_construction": self.ef_construction,
+            "ef": self.ef,
+        }
+
+    def persist(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self._scatter(
+            {
+                shard: ("persist", (os.path.join(directory, f"shard-{shard}"),))
+                for shard in range(self.n_shards)
+            }
+        )
+        with open(directory + ".meta", "w") as f:
+            json.dump(self.metadata, f)
+
+    @classmethod
+    def load(cls, directory):
+        with open(directory + ".meta", "r") as f:
+            data = json.load(f)
+        paths = [
+            os.path.join(directory, f"shard-{shard}")
+            for shard in range(data["n_shards"])
+        ]
+        return cls(**data, _paths=paths, should_not_cache=True)
+
+    def reset(self):
+        self._scatter_all("reset")
+        return self
+
+    def close(self):
+        """Stop the shard processes."""
+        self._finalizer()
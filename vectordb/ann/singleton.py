@@ -1,14 +1,20 @@
 from __future__ import annotations
 
 import abc
+import contextlib
+import threading
 from typing import Any
 
+_local = threading.local()
+
 
 class SingletonMeta(type):
     _instances: dict[Any, Any] = {}
 
     def __call__(cls, *args, **kwargs):
-        should_not_cache = kwargs.pop("should_not_cache", False)
+        should_not_cache = kwargs.pop("should_not_cache", False) or getattr(
+            _local, "uncached", False
+        )
 
         key = (cls,) + (tuple(args), tuple(sorted(kwargs.items())))
 
@@ -20,6 +26,23 @@ class SingletonMeta(type):
 
         return cls._instances[key]
 
+    @staticmethod
+    @contextlib.contextmanager
+    def uncached():
+        """Create fresh instances in this block, as with ``should_not_cache``."""
+        previous = getattr(_local, "uncached", False)
+        _local.uncached = True
+        try:
+            yield
+        finally:
+            _local.uncached = previous
+
+    def forget(cls, instance):
+        """Drop ``instance`` from the cache so that it can be freed."""
+        for key, cached in list(cls._instances.items()):
+            if cached is instance:
+                del cls._instances[key]
+
 
 class SingletonABCMeta(SingletonMeta, abc.ABCMeta):
     pass
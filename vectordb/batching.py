@@ -0,0 +1,221 @@
+"""Helpers shared by the remote embedding clients.
+
+Remote providers limit how many inputs (and tokens) a single request may carry
+and throttle clients that send too much at once. These helpers split a list of
+texts into request sized batches, send them concurrently with bounded
+parallelism, retry throttled requests with exponential backoff and write the
+results into one contiguous float32 array.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Sequence
+
+import numpy as np
+
+from .settings import vectordb_settings
+
+logger = logging.getLogger("VectorDB")
+
+
+def estimate_tokens(text: str) -> int:
+    """A cheap, deliberately pessimistic token estimate (about 3 chars/token)."""
+    return len(text) // 3 + 1
+
+
+def make_batches(
+    texts: Sequence[str],
+    max_batch_size: int,
+    max_batch_tokens: int | None = None,
+    count_tokens: Callable[[str], int] = estimate_tokens,
+) -> list[tuple[int, int]]:
+    """Split ``texts`` into contiguous ``(start, end)`` ranges.
+
+    Every range holds at most ``max_batch_size`` texts and, when
+    ``max_batch_tokens`` is set, at most that many estimated tokens. A single
+    text larger than the token budget gets a batch of its own.
+    """
+    batches = []
+    start = 0
+    tokens = 0
+    for i, text in enumerate(texts):
+        text_tokens = count_tokens(text) if max_batch_tokens else 0
+        if i > start and (
+            i - start >= max_batch_size
+            or (max_batch_tokens and tokens + text_tokens > max_batch_tokens)
+        ):
+            batches.append((start, i))
+            start = i
+            tokens = 0
+        tokens += text_tokens
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def retry_with_backoff(
+    fn: Callable,
+    *args,
+    retry_on: tuple[type[BaseException], ...] = (),
+    max_retries: int | None = None,
+    base_delay: float = 0.5,
+    max_delay: float = 30.0,
+    retry_after: Callable[[BaseException], float | None] | None = None,
+    **kwargs,
+):
+    """Call ``fn`` and retry it with exponential backoff on ``retry_on`` errors.
+
+    ``retry_after`` may extract a server supplied delay (for example from a
+    ``Retry-After`` header) which takes precedence over the computed backoff.
+    """
+    if max_retries is None:
+        max_retries = vectordb_settings.EMBEDDING_MAX_RETRIES
+    attempt = 0
+    while True:
+        try:
+            return fn(*args, **kwargs)
+        except retry_on as e:
+            if attempt >= max_retries:
+                raise
+            time.sleep(_backoff_delay(e, attempt, base_delay, max_delay, retry_after))
+            attempt += 1
+
+
+async def aretry_with_backoff(
+    fn: Callable,
+    *args,
+    retry_on: tuple[type[BaseException], ...] = (),
+    max_retries: int | None = None,
+    base_delay: float = 0.5,
+    max_delay: float = 30.0,
+    retry_after: Callable[[BaseException], float | None] | None = None,
+    **kwargs,
+):
+    """Async version of `retry_with_backoff` for coroutine functions."""
+    if max_retries is None:
+        max_retries = vectordb_settings.EMBEDDING_MAX_RETRIES
+    attempt = 0
+    while True:
+        try:
+            return await fn(*args, **kwargs)
+        except retry_on as e:
+            if attempt >= max_retries:
+                raise
+            await asyncio.sleep(
+                _backoff_delay(e, attempt, base_delay, max_delay, retry_after)
+            )
+            attempt += 1
+
+
+def _backoff_delay(error, attempt, base_delay, max_delay, retry_after) -> float:
+    delay = retry_after(error) if retry_after is not None else None
+    if delay is None:
+        delay = min(max_delay, base_delay * 2**attempt)
+        delay += random.uniform(0, delay / 2)
+    logger.warning(
+        f"Embedding request throttled ({error.__class__.__name__}), "
+        f"retrying in {delay:.2f}s"
+    )
+    return delay
+
+
+class BatchedEmbeddingExecutor:
+    """Run batch requests concurrently and collect them into one array.
+
+    The thread pool is created on first use and shared by all calls of the
+    owning encoder, so the number of in-flight requests stays bounded by
+    ``max_workers`` no matter how many threads call the encoder.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        self.max_workers = (
+            max_workers or vectordb_settings.EMBEDDING_MAX_CONCURRENT_REQUESTS
+        )
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="vectordb-embed",
+                    )
+        return self._pool
+
+    def run(
+        self,
+        embed_batch: Callable[[list[str]], np.ndarray],
+        texts: Sequence[str],
+        batches: list[tuple[int, int]],
+    ) -> np.ndarray:
+        """Embed ``texts`` batch by batch and return an ``(n, d)`` float32 array.
+
+        ``embed_batch`` receives a list of texts and must return one row per
+        text. The output array is allocated once the first batch reports the
+        dimension, and every batch is copied straight into its rows.
+        """
+        if len(batches) == 1:
+            start, end = batches[0]
+            return np.ascontiguousarray(
+                embed_batch(list(texts[start:end])), dtype=np.float32
+            )
+
+        futures = {
+            self.pool.submit(embed_batch, list(texts[start:end])): (start, end)
+            for start, end in batches
+        }
+        output = None
+        try:
+            for future in as_completed(futures):
+                start, end = futures[future]
+                rows = future.result()
+                if output is None:
+                    output = np.empty((len(texts), len(rows[0])), dtype=np.float32)
+                output[start:end] = rows
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return output
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+async def agather_batches(
+    embed_batch: Callable,
+    texts: Sequence[str],
+    batches: list[tuple[int, int]],
+    max_concurrency: int | None = None,
+) -> np.ndarray:
+    """Async version of `BatchedEmbeddingExecutor.run`.
+
+    ``embed_batch`` is a coroutine function, at most ``max_concurrency`` of
+    them are awaited at the same time.
+    """
+    semaphore = asyncio.Semaphore(
+        max_concurrency or vectordb_settings.EMBEDDING_MAX_CONCURRENT_REQUESTS
+    )
+    output = None
+
+    async def run(start, end):
+        nonlocal output
+        async with semaphore:
+            rows = await embed_batch(list(texts[start:end]))
+        if output is None:
+            output = np.empty((len(texts), len(rows[0])), dtype=np.float32)
+        output[start:end] = rows
+
+    await asyncio.gather(*(run(start, end) for start, end in batches))
+    return output
@@ -0,0 +1,152 @@
+"""Search result cache.
+
+`related_text` results are cached under the normalized query text, ``k``,
+the distance threshold, a fingerprint of the queryset filters and the index
+version. The version is bumped by every write to the Vector table, so a
+cached result is never served once the vectors it was computed from have
+changed.
+
+Entries live in an in-process LRU with a TTL (``SEARCH_CACHE_SIZE``,
+``SEARCH_CACHE_TTL``). Set ``SEARCH_CACHE_BACKEND`` to the alias of a Django
+cache to share the results, and the version, between processes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+
+from .settings import vectordb_settings
+
+VERSION_KEY = "vectordb:index-version"
+
+
+class SearchCache:
+    """A thread safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(
+        self, max_size: int, ttl: float | None = None, backend: str | None = None
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.backend = caches[backend] if backend else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def version(self) -> int:
+        if self.backend is not None:
+            return self.backend.get_or_set(VERSION_KEY, 0, timeout=None)
+        return self._version
+
+    def bump_version(self):
+        """Invalidate every cached result."""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+        if self.backend is not None:
+            try:
+                self.backend.incr(VERSION_KEY)
+            except ValueError:
+                self.backend.add(VERSION_KEY, 1, timeout=None)
+
+    def get(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.evictions += 1
+
+        value = self.backend.get(key) if self.backend is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._store(key, value)
+        return value
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._store(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value, timeout=self.ttl)
+
+    def _store(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "version": self._version,
+            }
+
+    def make_key(
+        self, queryset, text: str, k: int | None, max_distance: float | None = None
+    ) -> str | None:
+        """Return the cache key of a search, or None if it can't be cached."""
+        try:
+            sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        except EmptyResultSet:
+            return None
+        # collapse the whitespace, it does not change the meaning of a query
+        text = " ".join(text.split())
+        fingerprint = repr(
+            (text, k, max_distance, sql, params, queryset.db, self.version)
+        )
+        return "vectordb:search:" + hashlib.sha1(fingerprint.encode()).hexdigest()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache | None:
+    """Return the search cache, or None when ``SEARCH_CACHE_SIZE`` is 0."""
+    global _cache
+    if not vectordb_settings.SEARCH_CACHE_SIZE:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SearchCache(
+                    vectordb_settings.SEARCH_CACHE_SIZE,
+                    vectordb_settings.SEARCH_CACHE_TTL,
+                    vectordb_settings.SEARCH_CACHE_BACKEND,
+                )
+    return _cache
+
+
+def invalidate_search_cache():
+    """Bump the index version, called on every write to the Vector table."""
+    cache = get_search_cache()
+    if cache is not None:
+        cache.bump_version()
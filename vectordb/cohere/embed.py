@@ -2,11 +2,23 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import threading
+import weakref
+from collections import OrderedDict
 from typing import Literal
 
 import numpy as np
 from django.conf import settings
 
+from ..batching import (
+    BatchedEmbeddingExecutor,
+    agather_batches,
+    aretry_with_backoff,
+    make_batches,
+    retry_with_backoff,
+)
 from ..settings import vectordb_settings
 
 # support those setting the key in vectordb_settings or django settings
@@ -20,28 +32,95 @@ except ImportError:
         "Cohere API is not installed. Please install cohere package. Or run `$ pip install cohere`"
     )
 
+try:
+    from cohere.errors import TooManyRequestsError
+
+    RETRY_ON: tuple[type[BaseException], ...] = (TooManyRequestsError,)
+except ImportError:  # older clients raise a generic error for throttling
+    RETRY_ON = ()
+
 INPUT_TYPE = Literal["search_document", "search_query"]
 
 
 class CohereEmbeddings:
     """Cohere embeddings."""
 
-    def __init__(self, model_name="embed-multilingual-v3.0"):
+    # the embed endpoint accepts at most 96 texts per request
+    max_batch_size = 96
+
+    def __init__(
+        self,
+        model_name="embed-multilingual-v3.0",
+        *,
+        max_concurrent_requests: int | None = None,
+        max_retries: int | None = None,
+        query_cache_size: int = 1024,
+    ):
         """Initialize Cohere embeddings.
 
         Args:
             model_name (str, optional): Cohere model name. Defaults to "embed-multilingual-v3.0".
+            max_concurrent_requests (int, optional): Maximum number of batches sent
+                at once. Defaults to the EMBEDDING_MAX_CONCURRENT_REQUESTS setting.
+            max_retries (int, optional): Retries for throttled requests. Defaults to
+                the EMBEDDING_MAX_RETRIES setting.
+            query_cache_size (int, optional): Number of query embeddings kept by
+                `embed_query`. Defaults to 1024.
         """
         if not hasattr(settings, "COHERE_API_KEY"):
             raise ValueError("`COHERE_API_KEY` is not set in Django settings.")
         self.client = cohere.Client(api_key=settings.COHERE_API_KEY)
         self.model = model_name
+        self.max_retries = max_retries
+        self.executor = BatchedEmbeddingExecutor(max_concurrent_requests)
+        self.query_cache_size = query_cache_size
+        self._query_cache = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        # async clients are bound to the event loop they were created in
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    @property
+    def async_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = cohere.AsyncClient(api_key=settings.COHERE_API_KEY)
+            self._async_clients[loop] = client
+        return client
+
+    def _embed_batch(self, texts: list[str], input_type: INPUT_TYPE) -> np.ndarray:
+        response = retry_with_backoff(
+            self.client.embed,
+            texts=texts,
+            input_type=input_type,
+            model=self.model,
+            retry_on=RETRY_ON,
+            max_retries=self.max_retries,
+        )
+        return response.embeddings
+
+    async def _aembed_batch(
+        self, texts: list[str], input_type: INPUT_TYPE
+    ) -> np.ndarray:
+        response = await aretry_with_backoff(
+            self.async_client.embed,
+            texts=texts,
+            input_type=input_type,
+            model=self.model,
+            retry_on=RETRY_ON,
+            max_retries=self.max_retries,
+        )
+        return response.embeddings
 
     def get_embedding(
         self, text: str | list[str], input_type: INPUT_TYPE = "search_document"
     ) -> np.ndarray:
         """Get embeddings for text.
 
+        Lists are split into batches of at most `max_batch_size` texts which
+        are sent concurrently and written into a single float32 array in the
+        order of the input.
+
         Args:
             text (str | list[str]): Text to embed.
             input_type (Literal["search_document", "search_query"]): Input type.
@@ -51,19 +130,91 @@ class CohereEmbeddings:
             np.ndarray: Embeddings.
         """
         if isinstance(text, list):
-            response = self.client.embed(
-                texts=text, input_type=input_type, model=self.model
+            if not text:
+                return np.empty(
+                    (0, vectordb_settings.DEFAULT_EMBEDDING_DIMENSION),
+                    dtype=np.float32,
+                )
+            batches = make_batches(text, self.max_batch_size)
+            return self.executor.run(
+                functools.partial(self._embed_batch, input_type=input_type),
+                text,
+                batches,
             )
-            return np.array(response.embeddings, dtype=np.float32)
         elif isinstance(text, str):
             text = text.replace("\n", " ")
-            response = self.client.embed(
-                texts=[text], input_type=input_type, model=self.model
+            embeddings = self._embed_batch([text], input_type)
+            return np.array(embeddings[0], dtype=np.float32)
+        else:
+            raise ValueError("`text` must be a string or a list of strings.")
+
+    async def aembed(
+        self, text: str | list[str], input_type: INPUT_TYPE = "search_document"
+    ) -> np.ndarray:
+        """Async version of `get_embedding` using the native async client."""
+        if isinstance(text, list):
+            if not text:
+                return np.empty(
+                    (0, vectordb_settings.DEFAULT_EMBEDDING_DIMENSION),
+                    dtype=np.float32,
+                )
+            batches = make_batches(text, self.max_batch_size)
+            return await agather_batches(
+                functools.partial(self._aembed_batch, input_type=input_type),
+                text,
+                batches,
+                self.executor.max_workers,
             )
-            return np.array(response.embeddings[0], dtype=np.float32)
+        elif isinstance(text, str):
+            text = text.replace("\n", " ")
+            embeddings = await self._aembed_batch([text], input_type)
+            return np.array(embeddings[0], dtype=np.float32)
         else:
             raise ValueError("`text` must be a string or a list of strings.")
 
+    def _get_cached_query(self, text: str) -> np.ndarray | None:
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(text)
+            if embedding is not None:
+                self._query_cache.move_to_end(text)
+            return embedding
+
+    def _cache_query(self, text: str, embedding: np.ndarray) -> np.ndarray:
+        embedding.setflags(write=False)
+        with self._query_cache_lock:
+            self._query_cache[text] = embedding
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        return embedding
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a search query with `input_type="search_query"`.
+
+        Query embeddings are cached, so repeated searches for the same text do
+        not call the API again.
+
+        Args:
+            text (str): The search query.
+
+        Returns:
+            np.ndarray: A read-only embedding of shape (dim,).
+        """
+        embedding = self._get_cached_query(text)
+        if embedding is None:
+            embedding = self._cache_query(
+                text, self.get_embedding(text, input_type="search_query")
+            )
+        return embedding
+
+    async def aembed_query(self, text: str) -> np.ndarray:
+        """Async version of `embed_query`, sharing the same cache."""
+        embedding = self._get_cached_query(text)
+        if embedding is None:
+            embedding = self._cache_query(
+                text, await self.aembed(text, input_type="search_query")
+            )
+        return embedding
+
     def __call__(
         self, text: str | list[str], input_type: str = "search_document"
     ) -> np.ndarray:
@@ -1,9 +1,59 @@
+import threading
+
 import numpy as np
 import pytest
 
 from ...cohere.embed import CohereEmbeddings
 
 
+class FakeResponse:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def embed(self, texts, input_type, model):
+        with self.lock:
+            self.calls.append((list(texts), input_type))
+        return FakeResponse([[float(text), 1.0, 2.0] for text in texts])
+
+
+@pytest.fixture
+def embedding_fn(settings):
+    settings.COHERE_API_KEY = "test"
+    embedding_fn = CohereEmbeddings(max_concurrent_requests=3)
+    embedding_fn.client = FakeClient()
+    return embedding_fn
+
+
+def test_lists_are_split_into_api_batches(embedding_fn):
+    texts = [str(i) for i in range(250)]
+    embeddings = embedding_fn(texts)
+
+    assert embeddings.shape == (250, 3)
+    assert embeddings.dtype == np.float32
+    np.testing.assert_array_equal(embeddings[:, 0], np.arange(250))
+    batch_sizes = sorted(len(texts) for texts, _ in embedding_fn.client.calls)
+    assert batch_sizes == [58, 96, 96]
+    assert all(
+        input_type == "search_document" for _, input_type in embedding_fn.client.calls
+    )
+
+
+def test_embed_query_uses_search_query_and_is_cached(embedding_fn):
+    first = embedding_fn.embed_query("42")
+    second = embedding_fn.embed_query("42")
+
+    assert first.shape == (3,)
+    assert first[0] == 42
+    assert embedding_fn.client.calls == [(["42"], "search_query")]
+    assert second is first
+
+
 @pytest.mark.skip(reason="Test only works with Cohere API key.")
 def test_embeddings():
     embedding_fn = CohereEmbeddings()
@@ -0,0 +1,123 @@
+"""Compare the ANN index with the Vector table and repair the drift.
+
+The index is only updated by the process that writes a vector, so an index
+that lives for a long time, or one loaded from disk, can drift from the
+database. `check_index` streams the embeddings from the database in chunks
+of ids, compares them with the vectors stored in the index and reports:
+
+- missing: vectors in the database that are not in the index
+- extra: labels in the index whose vector has been deleted
+- stale: vectors whose embedding in the index differs from the database
+
+With ``repair=True`` the drift is fixed with bulk adds and deletes instead
+of rebuilding the index.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .queryset import _candidates_from_rows
+
+
+@dataclass
+class ConsistencyReport:
+    checked: int = 0
+    missing: list[int] = field(default_factory=list)
+    extra: list[int] = field(default_factory=list)
+    stale: list[int] = field(default_factory=list)
+    repaired: bool = False
+
+    @property
+    def is_consistent(self) -> bool:
+        return not (self.missing or self.extra or self.stale)
+
+    def __str__(self):
+        return (
+            f"{self.checked} vectors checked: {len(self.missing)} missing, "
+            f"{len(self.extra)} extra, {len(self.stale)} stale"
+        )
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-30)
+
+
+def check_index(
+    manager, index=None, chunk_size: int = 1000, repair: bool = False
+) -> ConsistencyReport:
+    """Compare ``index`` with the vectors of ``manager``.
+
+    Args:
+        manager (VectorManager): The manager of the Vector model.
+        index (HNSWIndex, optional): Defaults to the manager's index, with the
+            buffered writes applied.
+        chunk_size (int, optional): Number of vectors read and compared at
+            once. Defaults to 1000.
+        repair (bool, optional): Add the missing and stale vectors to the
+            index and delete the extra ones. Defaults to False.
+
+    Returns:
+        ConsistencyReport: The ids of the vectors that drifted.
+    """
+    if index is None:
+        # not evicted from the registry while it is compared
+        with manager.use_index(flush=True) as index:
+            return check_index(manager, index, chunk_size=chunk_size, repair=repair)
+    report = ConsistencyReport()
+
+    # labels of the index, including the ones marked as deleted
+    labels = np.sort(index.get_ids())
+    seen = np.zeros(len(labels), dtype=bool)
+
+    vectors = manager.exclude(status=manager.model.Status.PENDING).order_by("id")
+    last_id = None
+    while True:
+        chunk = vectors if last_id is None else vectors.filter(id__gt=last_id)
+        rows = list(chunk.values_list("id", "embedding")[:chunk_size])
+        if not rows:
+            break
+        ids, embeddings = _candidates_from_rows(rows)
+        last_id = int(ids[-1])
+        report.checked += len(ids)
+
+        positions = np.minimum(np.searchsorted(labels, ids), max(len(labels) - 1, 0))
+        in_labels = (
+            labels[positions] == ids if len(labels) else np.zeros(len(ids), bool)
+        )
+        seen[positions[in_labels]] = True
+
+        indexed_ids, indexed = index.get_embeddings(ids[in_labels])
+        is_indexed = np.isin(ids, indexed_ids)
+        missing = ids[~is_indexed]
+
+        expected = embeddings[is_indexed]
+        if index.space == "cosine":
+            # hnswlib stores normalized vectors for the cosine space
+            expected = _normalize(expected)
+        differs = ~np.all(np.isclose(indexed, expected, rtol=1e-5, atol=1e-6), axis=1)
+        stale = indexed_ids[differs]
+
+        report.missing.extend(missing.tolist())
+        report.stale.extend(stale.tolist())
+        if repair and (len(missing) or len(stale)):
+            # labels marked as deleted are still in the index and are
+            # updated in their slot, like the stale ones
+            update = in_labels & ~is_indexed
+            update[is_indexed] = differs
+            if update.any():
+                index.update(embeddings[update], ids[update])
+            if (~in_labels).any():
+                index.add(embeddings[~in_labels], ids[~in_labels])
+
+    # labels that are not in the database, unless already marked as deleted
+    extra, _ = index.get_embeddings(labels[~seen])
+    report.extra = extra.tolist()
+    if repair and len(extra):
+        index.delete(extra)
+
+    report.repaired = repair
+    return report
@@ -0,0 +1,184 @@
+"""Near-duplicate detection across the whole vector table.
+
+`DuplicateFinder` streams the embeddings from the database in blocks of
+``block_size`` vectors and yields the pairs of vectors whose distance is at
+most ``threshold``, so the embeddings are never all in memory at once. In
+the ANN mode a filtered queryset has the ids it selects held in a set, to
+restrict the index search to them.
+
+- By default every block is searched against the ANN index with a single
+  multi-query ``knn_query`` (on all cores), looking at the ``k`` nearest
+  neighbours of each vector.
+- With ``exact=True`` the distances are computed with blocked matrix
+  products between every pair of blocks, which finds every pair but costs
+  O(n^2).
+
+Distances use the definitions of the index space: squared euclidean
+distance for "l2", one minus the cosine similarity for "cosine" and one
+minus the inner product for "ip".
+"""
+
+from __future__ import annotations
+
+import itertools
+import time
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from .ann.distances import pairwise_distances, prepare
+from .queryset import _candidates_from_rows
+from .settings import vectordb_settings
+
+
+def _iter_blocks(queryset, block_size: int, start_id=None):
+    """Yield ``(ids, embeddings)`` blocks ordered by id."""
+    queryset = queryset.order_by("id")
+    last_id = start_id
+    while True:
+        block = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        rows = list(block.values_list("id", "embedding")[:block_size])
+        if not rows:
+            return
+        ids, embeddings = _candidates_from_rows(rows)
+        yield ids, embeddings
+        last_id = int(ids[-1])
+
+
+class DuplicateFinder:
+    """Find the pairs of vectors closer than ``threshold``.
+
+    Args:
+        queryset (VectorQuerySet): The vectors to compare.
+        threshold (float): Maximum distance between duplicates.
+        k (int, optional): Neighbours looked at per vector in the ANN mode.
+        exact (bool, optional): Compare every pair with matrix products.
+        block_size (int, optional): Number of vectors read and compared at once.
+    """
+
+    def __init__(
+        self,
+        queryset,
+        threshold: float,
+        *,
+        k: int = 10,
+        exact: bool = False,
+        block_size: int = 1024,
+    ):
+        self.queryset = queryset.exclude(status=queryset.model.Status.PENDING)
+        self.threshold = threshold
+        self.k = k
+        self.exact = exact
+        self.block_size = block_size
+        self.space = vectordb_settings.DEFAULT_EMBEDDING_SPACE
+
+        self.vectors_scanned = 0
+        self.pairs_compared = 0
+        self.duplicates_found = 0
+        self.elapsed = 0.0
+
+    @property
+    def pairs_per_second(self) -> float:
+        return self.pairs_compared / self.elapsed if self.elapsed else 0.0
+
+    def __iter__(self):
+        return self.pairs()
+
+    def pairs(self) -> Iterator[tuple[int, int, float]]:
+        """Yield ``(id, other_id, distance)`` with ``id < other_id``."""
+        start = time.perf_counter()
+        try:
+            pairs = self._exact_pairs() if self.exact else self._ann_pairs()
+            for pair in pairs:
+                self.duplicates_found += 1
+                self.elapsed = time.perf_counter() - start
+                yield pair
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def _ann_pairs(self):
+        manager = self.queryset.model.objects
+        index = manager.get_index()
+        ids_in = None
+        if not self.queryset._is_unfiltered():
+            ids_in = set(self.queryset.values_list("id", flat=True))
+        k = min(self.k + 1, max(index.size, 1))
+
+        yielded = set()
+        for ids, embeddings in _iter_blocks(self.queryset, self.block_size):
+            labels, distances = index.search(embeddings, k, ids__in=ids_in)
+            labels = labels.astype(np.int64)
+            self.vectors_scanned += len(ids)
+            self.pairs_compared += labels.size
+
+            # the blocks are in id order, so a pair is first found from its
+            # smallest id. Keep the pairs yielded from there until their
+            # largest id is searched, which yields only the pairs the
+            # smallest id did not find.
+            rows, cols = np.nonzero(
+                (distances <= self.threshold) & (labels != ids[:, None])
+            )
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                id, other = int(ids[row]), int(labels[row, col])
+                pair = (min(id, other), max(id, other))
+                if pair in yielded:
+                    continue
+                if id < other:
+                    yielded.add(pair)
+                yield pair + (float(distances[row, col]),)
+            last_id = int(ids[-1])
+            yielded = {pair for pair in yielded if pair[1] > last_id}
+
+    def _exact_pairs(self):
+        for ids, embeddings in _iter_blocks(self.queryset, self.block_size):
+            block = prepare(embeddings, self.space)
+            self.vectors_scanned += len(ids)
+
+            # the block against itself, then against every later block
+            others = itertools.chain(
+                [(ids, embeddings)],
+                _iter_blocks(self.queryset, self.block_size, int(ids[-1])),
+            )
+            for other_ids, other_embeddings in others:
+                distances = pairwise_distances(
+                    block, prepare(other_embeddings, self.space), self.space
+                )
+                mask = distances <= self.threshold
+                if other_ids is ids:
+                    mask = np.triu(mask, k=1)
+                    self.pairs_compared += len(ids) * (len(ids) - 1) // 2
+                else:
+                    self.pairs_compared += distances.size
+                rows, cols = np.nonzero(mask)
+                for row, col in zip(rows.tolist(), cols.tolist()):
+                    yield int(ids[row]), int(other_ids[col]), float(distances[row, col])
+
+
+def connected_components(pairs: Iterable[tuple]) -> list[list[int]]:
+    """Group the ids of duplicate pairs into clusters of duplicates."""
+    parent = {}
+
+    def find(id):
+        root = id
+        while parent[root] != root:
+            root = parent[root]
+        while parent[id] != root:
+            parent[id], id = root, parent[id]
+        return root
+
+    for id, other, *_ in pairs:
+        parent.setdefault(id, id)
+        parent.setdefault(other, other)
+        root, other_root = find(id), find(other)
+        if root != other_root:
+            parent[max(root, other_root)] = min(root, other_root)
+
+    components = {}
+    for id in parent:
+        components.setdefault(find(id), []).append(id)
+    return sorted((sorted(ids) for ids in components.values()), key=lambda c: c[0])
+
+
+def find_duplicates(queryset, threshold: float, **kwargs) -> DuplicateFinder:
+    """Return a `DuplicateFinder`, iterate over it to get the duplicate pairs."""
+    return DuplicateFinder(queryset, threshold, **kwargs)
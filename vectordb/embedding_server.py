@@ -0,0 +1,282 @@
+"""A shared embedding process for web workers.
+
+Loading a SentenceTransformer model in every worker costs hundreds of MB per
+process. ``EmbeddingServer`` owns a single copy of the model behind a Unix
+socket and coalesces concurrent requests into batches, while
+``EmbeddingServerEncoder`` is a thin client that can be selected through
+``DEFAULT_EMBEDDING_CLASS``:
+
+    DJANGO_VECTOR_DB = {
+        "DEFAULT_EMBEDDING_CLASS": "vectordb.embedding_server.EmbeddingServerEncoder",
+    }
+
+Start the server with ``python manage.py vectordb_embedding_server``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import socketserver
+import threading
+import time
+
+import numpy as np
+
+from . import ipc
+from .settings import vectordb_settings
+
+logger = logging.getLogger("VectorDB")
+
+OP_EMBED = 1
+OP_PING = 2
+
+
+def get_embedding_server_address():
+    address = vectordb_settings.EMBEDDING_SERVER_ADDRESS
+    if address is None:
+        address = os.path.join(
+            vectordb_settings.DEFAULT_PERSISTENT_DIRECTORY, "embedding.sock"
+        )
+    return ipc.parse_address(address)
+
+
+class _Job:
+    __slots__ = ("texts", "done", "result", "error")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                opcode, payload = ipc.recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+
+            try:
+                if opcode == OP_EMBED:
+                    texts, _ = ipc.unpack_texts(payload)
+                    embeddings = self.server.embedding_server.embed(texts)
+                    ipc.send_frame(self.request, ipc.OP_OK, ipc.pack_array(embeddings))
+                elif opcode == OP_PING:
+                    ipc.send_frame(self.request, ipc.OP_OK)
+                else:
+                    raise ipc.ProtocolError(f"Unknown opcode {opcode}")
+            except (ConnectionError, BrokenPipeError):
+                return
+            except Exception as e:
+                logger.exception("Embedding request failed")
+                ipc.send_frame(self.request, ipc.OP_ERROR, str(e).encode("utf-8"))
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    request_queue_size = 128
+    allow_reuse_address = True
+
+
+class EmbeddingServer:
+    """Serve embeddings from a single encoder to many client processes.
+
+    Requests that arrive while the encoder is busy are queued and merged into
+    one call of up to ``max_batch_size`` texts. ``batch_timeout`` is how long
+    (in seconds) the batcher waits for more texts before encoding a partial
+    batch.
+    """
+
+    def __init__(
+        self,
+        address,
+        encoder,
+        max_batch_size: int | None = None,
+        batch_timeout: float | None = None,
+    ):
+        self.address = ipc.parse_address(address)
+        self.encoder = encoder
+        self.max_batch_size = (
+            max_batch_size or vectordb_settings.EMBEDDING_SERVER_MAX_BATCH_SIZE
+        )
+        self.batch_timeout = (
+            batch_timeout
+            if batch_timeout is not None
+            else vectordb_settings.EMBEDDING_SERVER_BATCH_TIMEOUT
+        )
+        self._jobs = queue.Queue()
+        self._server = None
+        self._batcher = None
+        self._stopped = threading.Event()
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        job = _Job(texts)
+        self._jobs.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _next_batch(self) -> list[_Job]:
+        job = self._jobs.get()
+        if job is None:
+            return []
+        batch = [job]
+        size = len(job.texts)
+        deadline = time.monotonic() + self.batch_timeout
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._jobs.get(timeout=max(remaining, 0))
+            except queue.Empty:
+                break
+            if job is None:
+                self._jobs.put(None)
+                break
+            batch.append(job)
+            size += len(job.texts)
+        return batch
+
+    def _run_batcher(self):
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            if not batch:
+                break
+            texts = [text for job in batch for text in job.texts]
+            try:
+                embeddings = np.asarray(self.encoder(texts), dtype=np.float32)
+                embeddings = embeddings.reshape(len(texts), -1)
+            except Exception as e:
+                for job in batch:
+                    job.error = e
+                    job.done.set()
+                continue
+
+            start = 0
+            for job in batch:
+                job.result = embeddings[start : start + len(job.texts)]
+                start += len(job.texts)
+                job.done.set()
+
+    def start(self):
+        """Bind the socket and start serving in background threads."""
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            os.makedirs(os.path.dirname(self.address) or ".", exist_ok=True)
+            self._server = _UnixServer(self.address, _EmbeddingRequestHandler)
+        else:
+            self._server = _TCPServer(self.address, _EmbeddingRequestHandler)
+        self._server.embedding_server = self
+
+        self._batcher = threading.Thread(
+            target=self._run_batcher, name="vectordb-embedding-batcher", daemon=True
+        )
+        self._batcher.start()
+        threading.Thread(
+            target=self._server.serve_forever,
+            name="vectordb-embedding-server",
+            daemon=True,
+        ).start()
+        return self
+
+    def serve_forever(self):
+        self.start()
+        try:
+            self._stopped.wait()
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stopped.set()
+        self._jobs.put(None)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.unlink(self.address)
+
+
+class EmbeddingServerEncoder:
+    """Embedding function that delegates to a running ``EmbeddingServer``.
+
+    The connection is opened lazily on the first call, so creating the encoder
+    (which happens when the ``Vector`` model is imported) costs nothing.
+    """
+
+    def __init__(self, model_name: str | None = None, address=None, timeout=None):
+        self.model_name = model_name
+        self.address = (
+            ipc.parse_address(address)
+            if address is not None
+            else get_embedding_server_address()
+        )
+        self.timeout = (
+            timeout
+            if timeout is not None
+            else vectordb_settings.EMBEDDING_SERVER_TIMEOUT
+        )
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            try:
+                sock = ipc.connect(self.address, timeout=self.timeout)
+            except OSError as e:
+                raise ConnectionError(
+                    f"Could not connect to the embedding server at {self.address}. "
+                    "Start it with `python manage.py vectordb_embedding_server`."
+                ) from e
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _request(self, opcode: int, payload: bytes = b"") -> bytes:
+        # A pooled connection may have been closed by a server restart,
+        # retry once on a fresh connection before giving up.
+        for attempt in range(2):
+            sock = self._connection()
+            try:
+                ipc.send_frame(sock, opcode, payload)
+                status, response = ipc.recv_frame(sock)
+                break
+            except (ConnectionError, OSError):
+                self._close()
+                if attempt:
+                    raise
+        if status == ipc.OP_ERROR:
+            raise RuntimeError(
+                f"Embedding server error: {response.decode('utf-8', 'replace')}"
+            )
+        return response
+
+    def ping(self) -> bool:
+        self._request(OP_PING)
+        return True
+
+    def __call__(self, texts: str | list[str]) -> np.ndarray:
+        if isinstance(texts, str):
+            return self([texts])[0]
+        texts = list(texts)
+        if not texts:
+            return np.empty(
+                (0, vectordb_settings.DEFAULT_EMBEDDING_DIMENSION), dtype=np.float32
+            )
+        embeddings, _ = ipc.unpack_array(self._request(OP_EMBED, ipc.pack_texts(texts)))
+        return embeddings
@@ -0,0 +1,168 @@
+"""Storage formats of `Vector.embedding`.
+
+Embeddings are stored as raw float32 bytes, or, with the
+``EMBEDDING_STORAGE_DTYPE`` setting, in a compact format described by an
+8 byte header:
+
+- 2 bytes of magic, ``b"\\x93V"``
+- 1 byte for the dtype, see `DTYPES`
+- 1 reserved byte
+- the dimension as a little-endian uint32
+
+followed by the values, float16 or int8. int8 values are prefixed by the
+float32 scale of the vector. Raw float32 bytes have no header, so the rows
+written before a format change can still be read, and ``manage.py
+vectordb_reencode`` converts them in place.
+"""
+
+from __future__ import annotations
+
+import struct
+
+import numpy as np
+
+from .settings import vectordb_settings
+
+MAGIC = b"\x93V"
+HEADER = struct.Struct("<2sBxI")
+
+# storage dtype: (code in the header, numpy dtype of the values)
+DTYPES = {
+    "float16": (1, np.dtype("<f2")),
+    "int8": (2, np.dtype("i1")),
+}
+CODES = {code: name for name, (code, _) in DTYPES.items()}
+SCALE = struct.Struct("<f")
+
+
+def _parse_header(data) -> tuple[str, int] | None:
+    """Return the ``(dtype, dim)`` of an encoded embedding, None for float32."""
+    if len(data) < HEADER.size or bytes(data[:2]) != MAGIC:
+        return None
+    _, code, dim = HEADER.unpack_from(data)
+    dtype = CODES.get(code)
+    if dtype is None:
+        return None
+    scale_size = SCALE.size if dtype == "int8" else 0
+    if len(data) != HEADER.size + scale_size + dim * DTYPES[dtype][1].itemsize:
+        # raw float32 bytes that happen to start like a header
+        return None
+    return dtype, dim
+
+
+def encode_embedding(embedding, dtype: str | None = None) -> bytes:
+    """Encode an embedding in the ``dtype`` storage format.
+
+    Args:
+        embedding: A one dimensional array.
+        dtype (str, optional): "float32", "float16" or "int8". Defaults to the
+            EMBEDDING_STORAGE_DTYPE setting.
+    """
+    dtype = dtype or vectordb_settings.EMBEDDING_STORAGE_DTYPE
+    embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    if dtype == "float32":
+        return embedding.tobytes()
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown embedding storage dtype {dtype}")
+
+    code, numpy_dtype = DTYPES[dtype]
+    header = HEADER.pack(MAGIC, code, len(embedding))
+    if dtype == "float16":
+        return header + embedding.astype(numpy_dtype).tobytes()
+    # symmetric quantization, the largest value maps to 127
+    scale = float(np.abs(embedding).max(initial=0.0)) / 127 or 1.0
+    values = np.clip(np.rint(embedding / scale), -127, 127).astype(numpy_dtype)
+    return header + SCALE.pack(scale) + values.tobytes()
+
+
+def embedding_dtype(data) -> str:
+    """Return the storage format of an encoded embedding."""
+    header = _parse_header(data)
+    return "float32" if header is None else header[0]
+
+
+def decode_embedding(data) -> np.ndarray:
+    """Decode an embedding as a float32 array, without a copy for float32."""
+    header = _parse_header(data)
+    if header is None:
+        return np.frombuffer(data, dtype=np.float32)
+    return _decode_same_format([bytes(data)])[0]
+
+
+def decode_embeddings(blobs) -> np.ndarray:
+    """Decode a sequence of encoded embeddings as a float32 matrix.
+
+    The embeddings stored in the same format are decoded with one numpy
+    operation on their concatenated bytes.
+    """
+    blobs = [bytes(blob) for blob in blobs]
+    if not blobs:
+        return np.empty((0, 0), dtype=np.float32)
+    groups = {}
+    for row, blob in enumerate(blobs):
+        groups.setdefault((len(blob), _parse_header(blob)), []).append(row)
+    if len(groups) <= 1:
+        return _decode_same_format(blobs)
+
+    # a mix of formats, e.g. while the rows are being re-encoded
+    embeddings = None
+    for rows in groups.values():
+        decoded = _decode_same_format([blobs[row] for row in rows])
+        if embeddings is None:
+            embeddings = np.empty((len(blobs), decoded.shape[1]), dtype=np.float32)
+        embeddings[rows] = decoded
+    return embeddings
+
+
+def _decode_same_format(blobs: list[bytes]) -> np.ndarray:
+    data = b"".join(blobs)
+    header = _parse_header(blobs[0]) if blobs else None
+    if header is None:
+        return np.frombuffer(data, dtype=np.float32).reshape(len(blobs), -1)
+
+    dtype, dim = header
+    fields = [("header", f"V{HEADER.size}")]
+    if dtype == "int8":
+        fields.append(("scale", "<f4"))
+    fields.append(("values", DTYPES[dtype][1], (dim,)))
+    records = np.frombuffer(data, dtype=np.dtype(fields))
+    embeddings = records["values"].astype(np.float32)
+    if dtype == "int8":
+        embeddings *= records["scale"][:, None]
+    return embeddings
+
+
+def reencode_embeddings(
+    manager, dtype: str | None = None, chunk_size: int = 1000
+) -> tuple[int, int]:
+    """Convert the stored embeddings to the ``dtype`` storage format.
+
+    The vectors are read and written back in chunks of ``chunk_size`` rows,
+    the ones already in the format are left as they are.
+
+    Returns:
+        tuple: The number of vectors checked and of vectors re-encoded.
+    """
+    dtype = dtype or vectordb_settings.EMBEDDING_STORAGE_DTYPE
+    if dtype != "float32" and dtype not in DTYPES:
+        raise ValueError(f"Unknown embedding storage dtype {dtype}")
+
+    vectors = manager.filter(embedding__isnull=False).order_by("id")
+    checked = reencoded = 0
+    last_id = None
+    while True:
+        chunk = vectors if last_id is None else vectors.filter(id__gt=last_id)
+        rows = list(chunk.values_list("id", "embedding")[:chunk_size])
+        if not rows:
+            return checked, reencoded
+        last_id = rows[-1][0]
+        checked += len(rows)
+
+        to_update = []
+        for id, data in rows:
+            if embedding_dtype(data) != dtype:
+                embedding = encode_embedding(decode_embedding(data), dtype)
+                to_update.append(manager.model(id=id, embedding=embedding))
+        if to_update:
+            manager.bulk_update(to_update, ["embedding"])
+            reencoded += len(to_update)
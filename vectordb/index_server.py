@@ -0,0 +1,349 @@
+"""A shared index process for many Django processes.
+
+Every process holding its own index multiplies the index memory and build
+time by the number of web workers. ``IndexServer`` owns a single index behind
+a Unix or TCP socket and ``RemoteIndex`` is a client that stands in for it,
+selected with the ``INDEX_SERVER`` setting:
+
+    DJANGO_VECTOR_DB = {
+        "INDEX_SERVER": True,
+    }
+
+Start the server with ``python manage.py vectordb_serve``. The manager then
+sends its index writes and searches to the server, and a search of several
+queries goes over the wire as a single batch. Messages use the framing of
+`vectordb.ipc`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socketserver
+import struct
+import threading
+
+import numpy as np
+
+from . import ipc
+from .ann import AbstractIndex, ConcurrentIndex
+from .ann.indexes import HNSWIndex, HSWNLibIndex
+from .settings import vectordb_settings
+
+logger = logging.getLogger("VectorDB")
+
+OP_ADD = 1
+OP_UPDATE = 2
+OP_DELETE = 3
+OP_SEARCH = 4
+OP_GET_EMBEDDINGS = 5
+OP_GET_IDS = 6
+OP_INFO = 7
+OP_RESET = 8
+OP_PING = 9
+OP_PERSIST = 10
+
+# k, ef (0 for the index default) and which of the ids filters follow
+SEARCH_HEADER = struct.Struct("!IIB")
+HAS_IDS_IN = 1
+HAS_IDS_NOT_IN = 2
+# dim, size and max_elements, then the space
+INFO_HEADER = struct.Struct("!IQQ")
+
+
+def get_index_server_address():
+    address = vectordb_settings.INDEX_SERVER_ADDRESS
+    if address is None:
+        address = os.path.join(
+            vectordb_settings.DEFAULT_PERSISTENT_DIRECTORY, "index.sock"
+        )
+    return ipc.parse_address(address)
+
+
+def _pack_search(query, k, ids_in=None, ids_not_in=None, ef=None) -> bytes:
+    flags = (HAS_IDS_IN if ids_in is not None else 0) | (
+        HAS_IDS_NOT_IN if ids_not_in is not None else 0
+    )
+    parts = [SEARCH_HEADER.pack(k, ef or 0, flags), ipc.pack_array(query)]
+    for ids in (ids_in, ids_not_in):
+        if ids is not None:
+            parts.append(ipc.pack_ids(np.fromiter(ids, dtype=np.int64)))
+    return b"".join(parts)
+
+
+def _unpack_search(payload: bytes) -> tuple[np.ndarray, int, dict]:
+    k, ef, flags = SEARCH_HEADER.unpack_from(payload)
+    query, offset = ipc.unpack_array(payload, SEARCH_HEADER.size)
+    kwargs = {}
+    if ef:
+        kwargs["ef"] = ef
+    for flag, name in ((HAS_IDS_IN, "ids__in"), (HAS_IDS_NOT_IN, "ids__not_in")):
+        if flags & flag:
+            ids, offset = ipc.unpack_ids(payload, offset)
+            kwargs[name] = set(ids.tolist())
+    return query, k, kwargs
+
+
+def _unpack_writes(payload: bytes) -> tuple[np.ndarray, np.ndarray]:
+    ids, offset = ipc.unpack_ids(payload)
+    embeddings, _ = ipc.unpack_array(payload, offset)
+    return embeddings, ids
+
+
+class _IndexRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                opcode, payload = ipc.recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+
+            try:
+                response = self.server.index_server.dispatch(opcode, payload)
+                ipc.send_frame(self.request, ipc.OP_OK, response)
+            except (ConnectionError, BrokenPipeError):
+                return
+            except Exception as e:
+                logger.exception("Index request failed")
+                ipc.send_frame(self.request, ipc.OP_ERROR, str(e).encode("utf-8"))
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    request_queue_size = 128
+    allow_reuse_address = True
+
+
+class IndexServer:
+    """Serve the writes and searches of one index to many client processes.
+
+    Requests are handled by one thread per connection. hnswlib cannot resize
+    an index while it is searched, so an `HNSWIndex` is wrapped in a
+    `ConcurrentIndex`: searches run in parallel and writes are applied by a
+    single writer thread. A `ShardedIndex` serializes the calls to its
+    shards itself.
+    """
+
+    def __init__(self, address, index, max_pending=None):
+        self.address = ipc.parse_address(address)
+        if isinstance(index, HNSWIndex):
+            if max_pending is None:
+                max_pending = vectordb_settings.INDEX_WRITE_QUEUE_SIZE
+            index = ConcurrentIndex(
+                index, max_pending=max_pending, should_not_cache=True
+            )
+        self.index = index
+        self._server = None
+        self._stopped = threading.Event()
+
+    def dispatch(self, opcode: int, payload: bytes) -> bytes:
+        if opcode == OP_SEARCH:
+            query, k, kwargs = _unpack_search(payload)
+            labels, distances = self.index.search(query, k, **kwargs)
+            return ipc.pack_ids(labels) + ipc.pack_array(distances)
+        if opcode == OP_ADD:
+            self.index.add(*_unpack_writes(payload))
+        elif opcode == OP_UPDATE:
+            self.index.update(*_unpack_writes(payload))
+        elif opcode == OP_DELETE:
+            self.index.delete(ipc.unpack_ids(payload)[0].tolist())
+        elif opcode == OP_GET_EMBEDDINGS:
+            ids, embeddings = self.index.get_embeddings(ipc.unpack_ids(payload)[0])
+            return ipc.pack_ids(ids) + ipc.pack_array(
+                embeddings.reshape(len(ids), self.index.dim)
+            )
+        elif opcode == OP_GET_IDS:
+            return ipc.pack_ids(self.index.get_ids())
+        elif opcode == OP_INFO:
+            index = self.index
+            return INFO_HEADER.pack(
+                index.dim, index.size, index.max_elements
+            ) + index.space.encode("utf-8")
+        elif opcode == OP_RESET:
+            self.index.reset()
+        elif opcode == OP_PERSIST:
+            self.index.persist(os.fsdecode(payload))
+        elif opcode != OP_PING:
+            raise ipc.ProtocolError(f"Unknown opcode {opcode}")
+        return b""
+
+    def start(self):
+        """Bind the socket and start serving in a background thread."""
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            os.makedirs(os.path.dirname(self.address) or ".", exist_ok=True)
+            self._server = _UnixServer(self.address, _IndexRequestHandler)
+        else:
+            self._server = _TCPServer(self.address, _IndexRequestHandler)
+        self._server.index_server = self
+
+        threading.Thread(
+            target=self._server.serve_forever,
+            name="vectordb-index-server",
+            daemon=True,
+        ).start()
+        return self
+
+    def serve_forever(self):
+        self.start()
+        try:
+            self._stopped.wait()
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.unlink(self.address)
+
+
+class RemoteIndex(AbstractIndex):
+    """Index that forwards every call to a running ``IndexServer``.
+
+    Each thread uses its own connection, opened on its first call.
+    """
+
+    def __init__(self, address=None, timeout=None):
+        self.address = (
+            ipc.parse_address(address)
+            if address is not None
+            else get_index_server_address()
+        )
+        self.timeout = (
+            timeout if timeout is not None else vectordb_settings.INDEX_SERVER_TIMEOUT
+        )
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            try:
+                sock = ipc.connect(self.address, timeout=self.timeout)
+            except OSError as e:
+                raise ConnectionError(
+                    f"Could not connect to the index server at {self.address}. "
+                    "Start it with `python manage.py vectordb_serve`."
+                ) from e
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _request(self, opcode: int, payload: bytes = b"") -> bytes:
+        # A pooled connection may have been closed by a server restart,
+        # retry once on a fresh connection before giving up. Timeouts are not
+        # retried, the server may still apply the request.
+        for attempt in range(2):
+            sock = self._connection()
+            try:
+                ipc.send_frame(sock, opcode, payload)
+                status, response = ipc.recv_frame(sock)
+                break
+            except ConnectionError:
+                self._close()
+                if attempt:
+                    raise
+            except OSError:
+                # the response may still arrive, the connection is unusable
+                self._close()
+                raise
+        if status == ipc.OP_ERROR:
+            raise RuntimeError(
+                f"Index server error: {response.decode('utf-8', 'replace')}"
+            )
+        return response
+
+    def __call__(self, *args, **kwargs):
+        return self.search(*args, **kwargs)
+
+    def ping(self) -> bool:
+        self._request(OP_PING)
+        return True
+
+    def info(self) -> dict:
+        response = self._request(OP_INFO)
+        dim, size, max_elements = INFO_HEADER.unpack_from(response)
+        return {
+            "dim": dim,
+            "size": size,
+            "max_elements": max_elements,
+            "space": response[INFO_HEADER.size :].decode("utf-8"),
+        }
+
+    @property
+    def size(self):
+        return self.info()["size"]
+
+    @property
+    def dim(self):
+        return self.info()["dim"]
+
+    @property
+    def space(self):
+        return self.info()["space"]
+
+    def add(self, embeddings, ids):
+        self._request(OP_ADD, ipc.pack_ids(ids) + ipc.pack_array(embeddings))
+        return self
+
+    def update(self, embeddings, ids):
+        self._request(OP_UPDATE, ipc.pack_ids(ids) + ipc.pack_array(embeddings))
+        return self
+
+    def delete(self, ids):
+        self._request(OP_DELETE, ipc.pack_ids(ids))
+        return self
+
+    def search(self, query, k=10, **kwargs):
+        """Search like `HNSWIndex.search`, several queries in one request."""
+        payload = _pack_search(
+            query,
+            k,
+            ids_in=kwargs.get("ids__in", None),
+            ids_not_in=kwargs.get("ids__not_in", None),
+            ef=kwargs.get("ef", None),
+        )
+        response = self._request(OP_SEARCH, payload)
+        labels, offset = ipc.unpack_ids(response)
+        distances, _ = ipc.unpack_array(response, offset)
+        return labels.astype(np.uint64).reshape(distances.shape), distances
+
+    # the range search only calls search
+    range_search = HSWNLibIndex.range_search
+
+    def get_embeddings(self, ids):
+        response = self._request(OP_GET_EMBEDDINGS, ipc.pack_ids(ids))
+        found, offset = ipc.unpack_ids(response)
+        embeddings, _ = ipc.unpack_array(response, offset)
+        return found, embeddings
+
+    def get_ids(self) -> np.ndarray:
+        return ipc.unpack_ids(self._request(OP_GET_IDS))[0]
+
+    def persist(self, directory):
+        """Have the server persist its index to ``directory``, on its host."""
+        self._request(OP_PERSIST, os.fsencode(directory))
+        return self
+
+    @classmethod
+    def load(cls, address):
+        """Return a client for the server at ``address``, which owns the index."""
+        return cls(address=address, should_not_cache=True)
+
+    def reset(self):
+        self._request(OP_RESET)
+        return self
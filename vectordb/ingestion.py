@@ -0,0 +1,337 @@
+"""Background ingestion of vectors.
+
+With ``BACKGROUND_INGESTION`` enabled, ``add_text`` and ``add_instance`` store
+the vector with ``status="pending"`` and no embedding and return right away.
+The database row is the durable queue entry: a worker thread embeds the
+pending vectors in batches, stores the embeddings (``"embedded"``) and adds
+them to the ANN index (``"indexed"``). Pending vectors are not searchable.
+
+The ids of new vectors are handed to the worker through a bounded in-memory
+queue. When the queue is full writers wait up to ``INGESTION_ENQUEUE_TIMEOUT``
+seconds, after which the id is left for the worker to pick up from the
+database. The worker also scans the database for pending vectors when it
+starts and whenever it is idle, so nothing is lost when the process restarts
+or the queue overflows. ``manage.py vectordb_ingest`` drains them on demand.
+
+With Celery installed and configured the same pending rows are embedded by
+the batch tasks in `vectordb.tasks` instead of the worker thread.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import Iterable
+
+import numpy as np
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    close_old_connections,
+    connections,
+    transaction,
+)
+from django.utils import timezone
+
+from .encoding import encode_embedding
+from .models import Vector
+from .settings import vectordb_settings
+
+logger = logging.getLogger("VectorDB")
+
+
+def _timer():
+    start = time.perf_counter()
+    return lambda: time.perf_counter() - start
+
+
+def embed_batch(ids: Iterable[int] | None = None, limit: int | None = None) -> dict:
+    """Embed, store and index a batch of pending vectors.
+
+    The texts are embedded with one call to the embedding function, written
+    with one ``bulk_update`` and added to the ANN index at once.
+
+    Args:
+        ids (Iterable[int], optional): Only process these vectors. Defaults to
+            every pending vector.
+        limit (int, optional): Maximum number of vectors to process.
+
+    Returns:
+        dict: The number of vectors embedded and the seconds spent embedding,
+            writing and indexing them.
+    """
+    manager = Vector.objects
+    result = {"count": 0, "embed_time": 0.0, "write_time": 0.0, "index_time": 0.0}
+
+    pending = manager.filter(status=Vector.Status.PENDING)
+    if ids is not None:
+        pending = pending.filter(id__in=list(ids))
+    pending = pending.only("id", "text").order_by("id")
+    if limit is not None:
+        pending = pending[:limit]
+
+    vectors = list(pending)
+    if not vectors:
+        return result
+
+    elapsed = _timer()
+    embeddings = np.asarray(
+        manager.embedding_fn([vector.text for vector in vectors]), dtype=np.float32
+    ).reshape(len(vectors), -1)
+    result["embed_time"] = elapsed()
+
+    elapsed = _timer()
+    now = timezone.now()
+    for vector, embedding in zip(vectors, embeddings):
+        vector.embedding = encode_embedding(embedding)
+        vector.status = Vector.Status.EMBEDDED
+        vector.updated_at = now
+    manager.bulk_update(vectors, ["embedding", "status", "updated_at"])
+    result["write_time"] = elapsed()
+
+    # bulk_update has handed the embeddings to the index writer, apply them.
+    # Without an index in this process the vectors stay embedded, and when
+    # the index raises they stay embedded for `vectordb_check --repair`.
+    elapsed = _timer()
+    if manager.has_index_writes():
+        manager.flush_index()
+        ids = [vector.id for vector in vectors]
+        manager.filter(id__in=ids, status=Vector.Status.EMBEDDED).update(
+            status=Vector.Status.INDEXED
+        )
+    result["index_time"] = elapsed()
+
+    result["count"] = len(vectors)
+    return result
+
+
+def index_batch(ids: Iterable[int]) -> dict:
+    """Add already embedded vectors to the ANN index with a single call.
+
+    Returns:
+        dict: The number of vectors indexed and the seconds it took.
+    """
+    from .queryset import _candidates_from_rows
+
+    manager = Vector.objects
+    elapsed = _timer()
+    if not manager.has_index_writes():
+        # no index in this process, the vectors stay embedded
+        return {"count": 0, "index_time": elapsed()}
+    rows = list(
+        manager.filter(id__in=list(ids))
+        .exclude(status=Vector.Status.PENDING)
+        .values_list("id", "embedding")
+    )
+    if rows:
+        ids, embeddings = _candidates_from_rows(rows)
+        manager.index_add(embeddings, ids)
+        manager.flush_index()
+        manager.filter(id__in=ids.tolist(), status=Vector.Status.EMBEDDED).update(
+            status=Vector.Status.INDEXED
+        )
+    return {"count": len(rows), "index_time": elapsed()}
+
+
+def embed_pending(ids: Iterable[int] | None = None, limit: int | None = None) -> int:
+    """Like `embed_batch` but only return the number of vectors embedded."""
+    return embed_batch(ids, limit)["count"]
+
+
+def sweep_pending(
+    chunk_size: int | None = None, max_chunks: int | None = None
+) -> list[dict]:
+    """Embed the pending vectors in chunks of ``chunk_size``, oldest first.
+
+    Every pending vector is visited once, so vectors that fail to embed do
+    not stall the sweep.
+
+    Returns:
+        list[dict]: The `embed_batch` result of every chunk.
+    """
+    chunk_size = chunk_size or vectordb_settings.INGESTION_BATCH_SIZE
+    pending = Vector.objects.filter(status=Vector.Status.PENDING).order_by("id")
+    results = []
+    last_id = None
+    while max_chunks is None or len(results) < max_chunks:
+        chunk = pending if last_id is None else pending.filter(id__gt=last_id)
+        ids = list(chunk.values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            break
+        results.append(embed_batch(ids))
+        last_id = ids[-1]
+    return results
+
+
+def drain_pending(batch_size: int | None = None) -> int:
+    """Embed every pending vector, ``batch_size`` at a time."""
+    return sum(result["count"] for result in sweep_pending(batch_size))
+
+
+class IngestionWorker:
+    """A daemon thread that embeds pending vectors in batches."""
+
+    def __init__(
+        self,
+        batch_size: int | None = None,
+        queue_size: int | None = None,
+        poll_interval: float | None = None,
+    ):
+        self.batch_size = batch_size or vectordb_settings.INGESTION_BATCH_SIZE
+        self.poll_interval = (
+            poll_interval
+            if poll_interval is not None
+            else vectordb_settings.INGESTION_POLL_INTERVAL
+        )
+        self.queue = queue.Queue(
+            maxsize=queue_size or vectordb_settings.INGESTION_QUEUE_SIZE
+        )
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if not self.is_alive:
+                self._stopped.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="vectordb-ingestion", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = None):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def enqueue(self, ids: Iterable[int], timeout: float | None = None) -> bool:
+        """Hand vector ids to the worker.
+
+        Blocks for at most ``timeout`` seconds while the queue is full.
+
+        Returns:
+            bool: False when the queue stayed full. The remaining vectors stay
+                pending in the database and are picked up by the next scan.
+        """
+        if timeout is None:
+            timeout = vectordb_settings.INGESTION_ENQUEUE_TIMEOUT
+        deadline = time.monotonic() + timeout
+        for id in ids:
+            try:
+                self.queue.put(id, timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                logger.warning(
+                    "Ingestion queue is full, pending vectors will be picked up "
+                    "from the database"
+                )
+                return False
+        return True
+
+    def _next_batch(self) -> list[int]:
+        try:
+            ids = [self.queue.get(timeout=self.poll_interval)]
+        except queue.Empty:
+            return []
+        while len(ids) < self.batch_size:
+            try:
+                ids.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return ids
+
+    def _process(self, ids: list[int] | None):
+        close_old_connections()
+        try:
+            if ids:
+                embed_pending(ids)
+            else:
+                # recover the vectors left behind by a restart or a full queue
+                drain_pending(self.batch_size)
+        except Exception:
+            logger.exception("Failed to embed pending vectors")
+            # the vectors stay pending, back off before the next attempt
+            self._stopped.wait(self.poll_interval)
+        finally:
+            close_old_connections()
+
+    def _run(self):
+        self._process(None)
+        while not self._stopped.is_set():
+            self._process(self._next_batch())
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_ingestion_worker() -> IngestionWorker:
+    """Return the process wide ingestion worker, starting it on first use."""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = IngestionWorker()
+    return _worker.start()
+
+
+class _PendingBatch:
+    """The ids of the vectors created in the current transaction."""
+
+    def __init__(self, using: str):
+        self.using = using
+        self.ids = []
+
+    def flush(self):
+        if _local.__dict__.get("batches", {}).get(self.using) is self:
+            del _local.batches[self.using]
+        dispatch_pending(self.ids)
+
+
+_local = threading.local()
+
+
+def enqueue_pending(vector: Vector, using: str | None = None):
+    """Queue ``vector`` once the current transaction commits.
+
+    The vectors created in one transaction are handed over together, so they
+    are embedded in as few batches as possible.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    connection = connections[using]
+    batches = _local.__dict__.setdefault("batches", {})
+    batch = batches.get(using)
+
+    # a rolled back transaction drops its on_commit callbacks
+    if batch is not None and not any(
+        entry[1] == batch.flush for entry in connection.run_on_commit
+    ):
+        batch = None
+
+    if batch is not None:
+        batch.ids.append(vector.id)
+        return
+
+    batch = _PendingBatch(using)
+    batch.ids.append(vector.id)
+    if connection.in_atomic_block:
+        batches[using] = batch
+    transaction.on_commit(batch.flush, using=using)
+
+
+def dispatch_pending(ids: list[int]):
+    """Hand committed pending vectors to the worker or to Celery."""
+    if vectordb_settings.BACKGROUND_INGESTION:
+        get_ingestion_worker().enqueue(ids)
+        return
+
+    from . import tasks
+
+    batch_size = vectordb_settings.INGESTION_BATCH_SIZE
+    for start in range(0, len(ids), batch_size):
+        tasks.embed_vectors.delay(ids[start : start + batch_size])
@@ -0,0 +1,127 @@
+"""Small binary framing used by the vectordb sidecar processes.
+
+Every message is a frame made of a one byte opcode, a four byte payload length
+and the payload itself. Arrays travel as raw little-endian float32 preceded by
+their shape, so neither side has to parse JSON to move embeddings around.
+"""
+
+from __future__ import annotations
+
+import socket
+import struct
+
+import numpy as np
+
+FRAME_HEADER = struct.Struct("!BI")
+ARRAY_HEADER = struct.Struct("!II")
+UINT32 = struct.Struct("!I")
+
+OP_OK = 0
+OP_ERROR = 255
+
+MAX_FRAME_SIZE = 1 << 31
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ConnectionError("Connection closed by peer")
+        received += n
+    return bytes(buffer)
+
+
+def send_frame(sock: socket.socket, opcode: int, payload: bytes = b"") -> None:
+    sock.sendall(FRAME_HEADER.pack(opcode, len(payload)) + payload)
+
+
+def recv_frame(sock: socket.socket) -> tuple[int, bytes]:
+    opcode, size = FRAME_HEADER.unpack(_recv_exactly(sock, FRAME_HEADER.size))
+    if size > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Frame of {size} bytes exceeds the maximum frame size")
+    return opcode, _recv_exactly(sock, size) if size else b""
+
+
+def pack_array(array: np.ndarray) -> bytes:
+    array = np.ascontiguousarray(array, dtype="<f4")
+    if array.ndim == 1:
+        array = array.reshape(1, -1)
+    n, d = array.shape
+    return ARRAY_HEADER.pack(n, d) + array.tobytes()
+
+
+def unpack_array(payload: bytes, offset: int = 0) -> tuple[np.ndarray, int]:
+    n, d = ARRAY_HEADER.unpack_from(payload, offset)
+    offset += ARRAY_HEADER.size
+    array = np.frombuffer(payload, dtype="<f4", count=n * d, offset=offset)
+    return array.reshape(n, d), offset + n * d * 4
+
+
+def pack_ids(ids) -> bytes:
+    ids = np.ascontiguousarray(ids, dtype="<i8").ravel()
+    return UINT32.pack(len(ids)) + ids.tobytes()
+
+
+def unpack_ids(payload: bytes, offset: int = 0) -> tuple[np.ndarray, int]:
+    (n,) = UINT32.unpack_from(payload, offset)
+    offset += UINT32.size
+    ids = np.frombuffer(payload, dtype="<i8", count=n, offset=offset)
+    return ids, offset + n * 8
+
+
+def pack_texts(texts: list[str]) -> bytes:
+    parts = [UINT32.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(UINT32.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def unpack_texts(payload: bytes, offset: int = 0) -> tuple[list[str], int]:
+    (count,) = UINT32.unpack_from(payload, offset)
+    offset += UINT32.size
+    texts = []
+    for _ in range(count):
+        (size,) = UINT32.unpack_from(payload, offset)
+        offset += UINT32.size
+        texts.append(payload[offset : offset + size].decode("utf-8"))
+        offset += size
+    return texts, offset
+
+
+def connect(address, timeout: float | None = None) -> socket.socket:
+    """Connect to a Unix socket path or a ``(host, port)`` TCP address."""
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def parse_address(value):
+    """Turn ``"host:port"`` into a TCP address, anything else is a socket path."""
+    if isinstance(value, (tuple, list)):
+        return (value[0], int(value[1]))
+    if value.startswith("tcp://"):
+        value = value[len("tcp://") :]
+    elif value.startswith("unix://"):
+        return value[len("unix://") :]
+    host, sep, port = value.rpartition(":")
+    if sep and port.isdigit() and "/" not in value:
+        return (host or "127.0.0.1", int(port))
+    return value
@@ -0,0 +1,109 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vectordb.ann.indexes import HNSWIndex
+from vectordb.consistency import check_index
+from vectordb.index_server import RemoteIndex
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+from vectordb.snapshots import current_version, load_snapshot, publish_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks that the shared vector index (the index server, the published "
+        "snapshot or the persisted index) is consistent with the database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Add the missing and stale vectors and delete the extra ones, "
+            "then save the repaired index.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of vectors compared at once.",
+        )
+        parser.add_argument(
+            "--show-ids",
+            action="store_true",
+            help="List the ids of the vectors that drifted.",
+        )
+
+    def handle(self, *args, **options):
+        index, description, save = self._shared_index()
+        self.stdout.write(f"Checking {description}.")
+        report = check_index(
+            Vector.objects,
+            index=index,
+            repair=options["repair"],
+            chunk_size=options["chunk_size"],
+        )
+
+        if options["show_ids"]:
+            for name in ("missing", "extra", "stale"):
+                ids = getattr(report, name)
+                if ids:
+                    self.stdout.write(f"{name}: {', '.join(map(str, ids))}")
+
+        if report.is_consistent:
+            self.stdout.write(self.style.SUCCESS(f"Index is consistent. {report}."))
+        elif report.repaired:
+            saved = save()
+            self.stdout.write(self.style.SUCCESS(f"Index repaired. {report}."))
+            if saved:
+                self.stdout.write(saved)
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Index has drifted. {report}. Run with --repair to fix it."
+                )
+            )
+
+    def _shared_index(self):
+        """Return the index the other processes use, its name and how to save it.
+
+        An index built by this command would match the database by
+        construction, so only an index shared with other processes is
+        checked.
+        """
+        if vectordb_settings.INDEX_SERVER:
+            # the repairs are applied to the served index directly
+            return RemoteIndex(should_not_cache=True), "the index server", lambda: None
+
+        if vectordb_settings.INDEX_SNAPSHOTS:
+            version = current_version()
+            if version is None:
+                raise CommandError(
+                    "No index snapshot published, "
+                    "run `python manage.py vectordb_snapshot` first."
+                )
+            index = load_snapshot(version)
+
+            def save():
+                # the workers swap in the repaired index on their next poll
+                return f"Published snapshot {publish_snapshot(index)}."
+
+            return index, f"index snapshot {version}", save
+
+        path = Vector.objects.persistent_path
+        if os.path.exists(path):
+            index = HNSWIndex.load(path)
+
+            def save():
+                index.persist(path)
+                return f"Saved the index to {path}."
+
+            return index, f"the index persisted at {path}", save
+
+        raise CommandError(
+            "There is no shared index to check: every process builds its own "
+            "index from the database. Enable INDEX_SERVER or INDEX_SNAPSHOTS, "
+            f"or persist the index to {path}, or call "
+            "Vector.objects.check_index() in the process that holds the index."
+        )
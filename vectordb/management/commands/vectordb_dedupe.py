@@ -0,0 +1,96 @@
+import csv
+import sys
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+
+from vectordb.dedupe import connected_components, find_duplicates
+from vectordb.models import Vector
+
+
+class Command(BaseCommand):
+    help = "Finds near-duplicate vectors"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            required=True,
+            help="Maximum distance between duplicates, in the index space.",
+        )
+        parser.add_argument(
+            "--exact",
+            action="store_true",
+            help="Compare every pair of vectors instead of using the index.",
+        )
+        parser.add_argument(
+            "-k",
+            type=int,
+            default=10,
+            help="Neighbours looked at per vector when using the index.",
+        )
+        parser.add_argument(
+            "--block-size",
+            type=int,
+            default=1024,
+            help="Number of vectors read and compared at once.",
+        )
+        parser.add_argument(
+            "--content-type",
+            default=None,
+            help="Only compare the vectors of this model, as app_label.model.",
+        )
+        parser.add_argument(
+            "--components",
+            action="store_true",
+            help="Write the groups of duplicates instead of the pairs.",
+        )
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="CSV file to write to, defaults to stdout.",
+        )
+
+    def handle(self, *args, **options):
+        vectors = Vector.objects.all()
+        if options["content_type"]:
+            try:
+                app_label, model = options["content_type"].lower().split(".")
+                content_type = ContentType.objects.get_by_natural_key(app_label, model)
+            except (ValueError, ContentType.DoesNotExist):
+                raise CommandError(
+                    f"Unknown content type {options['content_type']}, "
+                    "expected app_label.model"
+                )
+            vectors = vectors.filter(content_type=content_type)
+
+        finder = find_duplicates(
+            vectors,
+            options["threshold"],
+            k=options["k"],
+            exact=options["exact"],
+            block_size=options["block_size"],
+        )
+
+        output = open(options["output"], "w", newline="") if options["output"] else None
+        try:
+            writer = csv.writer(output or sys.stdout)
+            if options["components"]:
+                writer.writerow(["component", "vector_id"])
+                for number, ids in enumerate(connected_components(finder)):
+                    writer.writerows([number, id] for id in ids)
+            else:
+                writer.writerow(["vector_id", "duplicate_id", "distance"])
+                writer.writerows(finder)
+        finally:
+            if output is not None:
+                output.close()
+
+        self.stderr.write(
+            self.style.SUCCESS(
+                f"Scanned {finder.vectors_scanned} vectors and found "
+                f"{finder.duplicates_found} duplicate pairs in "
+                f"{finder.elapsed:.2f}s ({finder.pairs_per_second:,.0f} pairs "
+                "compared per second)."
+            )
+        )
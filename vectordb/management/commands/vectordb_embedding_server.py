@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from vectordb.embedding_server import EmbeddingServer, get_embedding_server_address
+from vectordb.settings import vectordb_settings
+
+
+class Command(BaseCommand):
+    help = "Run a shared embedding server that web workers connect to"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--address",
+            help="Unix socket path or host:port to listen on. "
+            "Defaults to the EMBEDDING_SERVER_ADDRESS setting.",
+        )
+        parser.add_argument("--max-batch-size", type=int, default=None)
+        parser.add_argument(
+            "--batch-timeout",
+            type=float,
+            default=None,
+            help="Seconds to wait for more requests before encoding a batch.",
+        )
+
+    def handle(self, *args, **options):
+        address = options["address"] or get_embedding_server_address()
+
+        encoder = vectordb_settings.EMBEDDING_SERVER_ENCODER_CLASS(
+            model_name=vectordb_settings.DEFAULT_EMBEDDING_MODEL
+        )
+        server = EmbeddingServer(
+            address,
+            encoder,
+            max_batch_size=options["max_batch_size"],
+            batch_timeout=options["batch_timeout"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Serving {vectordb_settings.DEFAULT_EMBEDDING_MODEL} embeddings "
+                f"on {address}"
+            )
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Embedding server stopped."))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from vectordb.ingestion import IngestionWorker, drain_pending
+from vectordb.models import Vector
+
+
+class Command(BaseCommand):
+    help = "Embeds and indexes the vectors waiting for the background ingestion"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Number of vectors embedded at once.",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Keep running and embed new pending vectors as they arrive.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if options["watch"]:
+            worker = IngestionWorker(batch_size=batch_size).start()
+            self.stdout.write("Watching for pending vectors, press Ctrl+C to stop.")
+            try:
+                while worker.is_alive:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                worker.stop()
+            return
+
+        pending = Vector.objects.filter(status=Vector.Status.PENDING).count()
+        self.stdout.write(f"Embedding {pending} pending vectors.")
+        count = drain_pending(batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Embedded {count} vectors."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from vectordb.neighbours import compute_neighbours, refresh_neighbours
+
+
+class Command(BaseCommand):
+    help = "Precomputes the nearest neighbours used by related_objects"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recompute the neighbours of every vector.",
+        )
+        parser.add_argument(
+            "-k",
+            type=int,
+            default=None,
+            help="Number of neighbours, defaults to the NEIGHBOURS_K setting.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=256,
+            help="Number of vectors searched at once.",
+        )
+
+    def handle(self, *args, **options):
+        if options["full"]:
+            count = compute_neighbours(k=options["k"], batch_size=options["batch_size"])
+        else:
+            count = refresh_neighbours(k=options["k"], batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated the neighbours of {count} vectors.")
+        )
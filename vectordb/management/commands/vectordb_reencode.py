@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from vectordb.encoding import DTYPES, reencode_embeddings
+from vectordb.models import Vector
+
+
+class Command(BaseCommand):
+    help = "Converts the stored embeddings to another storage format"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dtype",
+            choices=["float32", *DTYPES],
+            default=None,
+            help="Storage format, defaults to the EMBEDDING_STORAGE_DTYPE setting.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of vectors converted at once.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            checked, reencoded = reencode_embeddings(
+                Vector.objects, options["dtype"], options["chunk_size"]
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            self.style.SUCCESS(f"{reencoded} of {checked} vectors re-encoded.")
+        )
@@ -22,8 +22,6 @@ class Command(BaseCommand):
         # Check if the user wants to continue
         if user_input.lower() == "yes":
             self.stdout.write(self.style.SUCCESS("Resetting the vector database..."))
-            Vector.objects.all().delete()
-            if Vector.objects.index:
-                Vector.objects.index.reset()
+            Vector.objects.reset()
         else:
             self.stdout.write(self.style.WARNING("Reset was canceled."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from vectordb.index_server import IndexServer, get_index_server_address
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+from vectordb.snapshots import current_version, load_snapshot
+from vectordb.utils import build_index
+
+
+class Command(BaseCommand):
+    help = "Run a shared index server that Django processes connect to"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--address",
+            help="Unix socket path or host:port to listen on. "
+            "Defaults to the INDEX_SERVER_ADDRESS setting.",
+        )
+
+    def handle(self, *args, **options):
+        address = options["address"] or get_index_server_address()
+
+        version = current_version() if vectordb_settings.INDEX_SNAPSHOTS else None
+        if version is not None:
+            self.stdout.write(f"Loading index snapshot {version}.")
+            index = load_snapshot(version)
+        else:
+            self.stdout.write("Building the index from the database.")
+            index = build_index(Vector.objects)
+
+        server = IndexServer(address, index)
+        self.stdout.write(
+            self.style.SUCCESS(f"Serving an index of {index.size} vectors on {address}")
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Index server stopped."))
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from vectordb.models import Vector
+from vectordb.snapshots import publish_snapshot
+from vectordb.utils import build_index
+
+
+class Command(BaseCommand):
+    help = "Builds the index and publishes it as the snapshot loaded by the workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Keep running and publish a new snapshot every INTERVAL seconds.",
+        )
+        parser.add_argument(
+            "--keep",
+            type=int,
+            default=2,
+            help="Number of snapshots kept on disk.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        try:
+            while True:
+                self._publish(options["keep"])
+                if interval is None:
+                    return
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+    def _publish(self, keep):
+        start = time.perf_counter()
+        index = build_index(Vector.objects)
+        version = publish_snapshot(index, keep=keep)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Published snapshot {version} of {index.size} vectors "
+                f"in {time.perf_counter() - start:.1f}s."
+            )
+        )
@@ -2,13 +2,26 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
+from contextlib import contextmanager
 
-from django.db import models
+from django.core.management.color import no_style
+from django.db import connections, models, transaction
 
+from .ann.buffer import BufferedIndexWriter
+from .ann.concurrent import ConcurrentIndex
 from .ann.indexes import HNSWIndex
+from .ann.sharded import ShardedIndex
+from .ann.singleton import SingletonMeta
+from .cache import invalidate_search_cache
+from .index_server import RemoteIndex
+from .matrix import EmbeddingMatrix
 from .queryset import VectorQuerySet
+from .registry import get_index_registry
 from .settings import vectordb_settings
+from .snapshots import SnapshotReader, current_version, load_snapshot
 from .utils import (
+    build_index,
     create_vector_from_instance,
     create_vector_from_text,
     get_embedding_function,
@@ -24,9 +37,15 @@ if not os.path.exists(os.path.dirname(vectordb_settings.DEFAULT_PERSISTENT_DIREC
 
 
 class VectorManager(models.Manager):
+    # the name of the index in the registry of the process
+    index_name = "vectordb"
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.index = None
+        self._index_lock = threading.Lock()
+        self._index_writer = None
+        self.matrix = None
+        self.snapshots = None
         self.persistent_path = os.path.join(
             vectordb_settings.DEFAULT_PERSISTENT_DIRECTORY, "vector.index"
         )  # TODO: refactor coz this depends on internal knowledge of the index class
@@ -35,11 +54,253 @@ class VectorManager(models.Manager):
         self.embedding_dim = embedding_dim
         self.embedding_fn = embedding_fn
 
-        if os.path.exists(self.persistent_path):
-            self.index = HNSWIndex.load(self.persistent_path)
+        if (
+            not vectordb_settings.INDEX_SNAPSHOTS
+            and not vectordb_settings.INDEX_SERVER
+            and os.path.exists(self.persistent_path)
+        ):
+            with SingletonMeta.uncached():
+                index = HNSWIndex.load(self.persistent_path)
+            if vectordb_settings.CONCURRENT_INDEX:
+                index = ConcurrentIndex(
+                    index,
+                    max_pending=vectordb_settings.INDEX_WRITE_QUEUE_SIZE,
+                    should_not_cache=True,
+                )
+            self.index = index
+
+    @property
+    def index(self):
+        """The index held in the registry of the process, None until built.
+
+        The registry evicts it beyond INDEX_MEMORY_BUDGET bytes, see
+        `vectordb.registry`, and `get_index` builds it again.
+        """
+        return get_index_registry().peek(self.index_name)
+
+    @index.setter
+    def index(self, index):
+        registry = get_index_registry()
+        if index is None:
+            registry.pop(self.index_name)
+        else:
+            registry.put(self.index_name, index, persist=False)
 
     def get_queryset(self):
-        return VectorQuerySet(self.model, using=self._db)
+        # the embeddings are only read by the index and the search, through
+        # values_list, keep them out of the rows loaded as instances
+        return VectorQuerySet(self.model, using=self._db).defer("embedding")
+
+    def get_index(self, flush: bool | None = None):
+        """Return the ANN index, building it from the database on first use.
+
+        Args:
+            flush (bool, optional): Apply the buffered index writes first so
+                that the index reflects every write made so far. Defaults to
+                the INDEX_FLUSH_ON_SEARCH setting.
+
+        With INDEX_SERVER enabled, the index is a proxy to the index server,
+        see `vectordb.index_server`. With INDEX_SNAPSHOTS enabled, the
+        published snapshot is loaded and swapped in when a new one is
+        published, see `vectordb.snapshots`.
+        """
+        if vectordb_settings.INDEX_SNAPSHOTS:
+            self._swap_snapshot()
+        index = get_index_registry().get(
+            self.index_name, create=self._create_index, persist=False
+        )
+        self._flush_for_search(flush)
+        return index
+
+    @contextmanager
+    def use_index(self, flush: bool | None = None):
+        """Like `get_index`, the index is not evicted or closed in the block.
+
+        Searches use the index in a ``with`` block, so that the registry
+        waits for them before it evicts or replaces it.
+        """
+        if vectordb_settings.INDEX_SNAPSHOTS:
+            self._swap_snapshot()
+        with get_index_registry().hold(
+            self.index_name, create=self._create_index, persist=False
+        ) as index:
+            self._flush_for_search(flush)
+            yield index
+
+    def _create_index(self):
+        if vectordb_settings.INDEX_SERVER:
+            return RemoteIndex()
+        if vectordb_settings.INDEX_SNAPSHOTS:
+            version = current_version(self.snapshots.directory)
+            if version is not None:
+                # evicted from the registry, load the published snapshot again
+                self.snapshots.version = version
+                return load_snapshot(version, self.snapshots.directory)
+            logger.warning("No index snapshot published, building the index")
+        return build_index(self)
+
+    def _flush_for_search(self, flush: bool | None):
+        if flush is None:
+            flush = vectordb_settings.INDEX_FLUSH_ON_SEARCH
+        if flush:
+            self.flush_index()
+        else:
+            self.flush_due_index_writes()
+
+    def _swap_snapshot(self):
+        if self.snapshots is None:
+            with self._index_lock:
+                if self.snapshots is None:
+                    self.snapshots = SnapshotReader()
+        with SingletonMeta.uncached():
+            index = self.snapshots.poll()
+        if index is not None:
+            # searches holding the previous index finish on it
+            self.index = index
+
+    def get_matrix(self) -> EmbeddingMatrix | None:
+        """Return the embedding matrix, see `vectordb.matrix`.
+
+        It is built from the database on first use. Returns None unless the
+        EMBEDDING_MATRIX setting is enabled.
+        """
+        if not vectordb_settings.EMBEDDING_MATRIX:
+            return None
+        if self.matrix is None:
+            with self._index_lock:
+                if self.matrix is None:
+                    matrix = EmbeddingMatrix(
+                        os.path.join(
+                            vectordb_settings.DEFAULT_PERSISTENT_DIRECTORY, "matrix"
+                        ),
+                        vectordb_settings.DEFAULT_EMBEDDING_DIMENSION,
+                    )
+                    if not matrix.exists:
+                        matrix.rebuild(self)
+                    self.matrix = matrix
+        return self.matrix
+
+    # Index maintenance. These are no-ops until the index has been built and
+    # are used by the signal handlers and by bulk writes that bypass signals.
+    # The writes are buffered and applied to the index in bulk, and written
+    # to the embedding matrix right away. Index snapshots are read-only,
+    # the writes reach them with the next published snapshot.
+
+    def has_index_writes(self) -> bool:
+        """Whether the index maintenance methods have anything to update."""
+        if vectordb_settings.INDEX_SERVER or vectordb_settings.EMBEDDING_MATRIX:
+            return True
+        return self.index is not None and not vectordb_settings.INDEX_SNAPSHOTS
+
+    def _get_index_writer(self):
+        if vectordb_settings.INDEX_SERVER:
+            # the server always holds an index, it gets every write
+            self.get_index(flush=False)
+        elif vectordb_settings.INDEX_SNAPSHOTS:
+            return None
+        index = self.index
+        if index is None:
+            # built again from the database, buffered writes included
+            self._index_writer = None
+            return None
+        writer = self._index_writer
+        if writer is None or writer.index is not index:
+            with self._index_lock:
+                writer = self._index_writer
+                if writer is None or writer.index is not index:
+                    # a new index is built from the database, the writes
+                    # buffered for the previous one are already in it
+                    writer = BufferedIndexWriter(
+                        index,
+                        max_size=vectordb_settings.INDEX_WRITE_BUFFER_SIZE,
+                        max_delay=vectordb_settings.INDEX_WRITE_BUFFER_DELAY,
+                        # these indexes can be written while they are searched
+                        background=isinstance(
+                            index, (ConcurrentIndex, RemoteIndex, ShardedIndex)
+                        ),
+                    )
+                    self._index_writer = writer
+        return writer
+
+    def index_add(self, embeddings, ids):
+        invalidate_search_cache()
+        writer = self._get_index_writer()
+        if writer is not None and len(ids):
+            writer.add(embeddings, ids)
+        matrix = self.get_matrix()
+        if matrix is not None and len(ids):
+            matrix.write(embeddings, ids)
+
+    def index_update(self, embeddings, ids):
+        invalidate_search_cache()
+        writer = self._get_index_writer()
+        if writer is not None and len(ids):
+            writer.update(embeddings, ids)
+        matrix = self.get_matrix()
+        if matrix is not None and len(ids):
+            matrix.write(embeddings, ids)
+
+    def index_delete(self, ids):
+        invalidate_search_cache()
+        writer = self._get_index_writer()
+        if writer is not None and len(ids):
+            writer.delete(ids)
+        matrix = self.get_matrix()
+        if matrix is not None and len(ids):
+            matrix.delete(ids)
+
+    def flush_index(self) -> int:
+        """Apply the buffered writes to the index."""
+        writer = self._get_index_writer()
+        return writer.flush() if writer is not None else 0
+
+    def flush_due_index_writes(self) -> int:
+        """Apply the buffered writes once INDEX_WRITE_BUFFER_DELAY has passed."""
+        writer = self._index_writer
+        return writer.flush_due() if writer is not None else 0
+
+    def check_index(self, repair: bool = False, chunk_size: int = 1000):
+        """Compare the index with the database, see `vectordb.consistency`."""
+        from .consistency import check_index
+
+        return check_index(self, chunk_size=chunk_size, repair=repair)
+
+    def reset(self):
+        """Delete every vector and clear the index.
+
+        vectordb's own tables are truncated, which is much faster than
+        deleting the rows one by one but does not send any signals. When
+        other models point at the vectors, the rows are deleted through the
+        ORM instead so that their on_delete rules apply.
+        """
+        from .models import VectorNeighbour
+
+        own_models = {self.model, VectorNeighbour}
+        # the relations the ORM follows on delete, hidden ones included
+        related_models = {
+            field.related_model
+            for field in self.model._meta.get_fields(include_hidden=True)
+            if field.auto_created
+            and not field.concrete
+            and (field.one_to_one or field.one_to_many)
+        }
+        if related_models - own_models:
+            self.get_queryset().delete()
+        else:
+            connection = connections[self.db]
+            # the neighbours reference the vectors, they are flushed together
+            tables = [VectorNeighbour._meta.db_table, self.model._meta.db_table]
+            sql_list = connection.ops.sql_flush(no_style(), tables)
+            with transaction.atomic(using=self.db):
+                connection.ops.execute_sql_flush(sql_list)
+        invalidate_search_cache()
+        with self._index_lock:
+            if self.index is not None:
+                self.index.reset()
+            self._index_writer = None
+        matrix = self.get_matrix()
+        if matrix is not None:
+            matrix.clear()
 
     def add_text(self, id, text, metadata, embedding=None):
         """Add a text to the database and the index."""
@@ -55,11 +316,17 @@ class VectorManager(models.Manager):
 
     def add_texts(self, ids, texts, metadata, embeddings=None):
         if embeddings is None:
-            embeddings = self.embedding_fn(texts)
-        vectors = [
-            self.add_text(id, text, meta, embedding)
-            for id, text, meta, embedding in zip(ids, texts, metadata, embeddings)
-        ]
+            if vectordb_settings.BACKGROUND_INGESTION:
+                # stored as pending and embedded by the ingestion worker
+                embeddings = [None] * len(texts)
+            else:
+                embeddings = self.embedding_fn(texts)
+        # one transaction, so that background ingestion gets a single batch
+        with transaction.atomic(using=self.db):
+            vectors = [
+                self.add_text(id, text, meta, embedding)
+                for id, text, meta, embedding in zip(ids, texts, metadata, embeddings)
+            ]
         return vectors
 
     def add_instance(self, instance):
@@ -70,3 +337,21 @@ class VectorManager(models.Manager):
 
     def search(self, *args, **kwargs):
         return self.get_queryset().search(*args, **kwargs)
+
+    async def asearch(self, *args, **kwargs):
+        return await self.get_queryset().asearch(*args, **kwargs)
+
+    def with_embeddings(self):
+        return self.get_queryset().with_embeddings()
+
+    def search_page(self, *args, **kwargs):
+        return self.get_queryset().search_page(*args, **kwargs)
+
+    def iter_search(self, *args, **kwargs):
+        return self.get_queryset().iter_search(*args, **kwargs)
+
+    async def arelated_text(self, *args, **kwargs):
+        return await self.get_queryset().arelated_text(*args, **kwargs)
+
+    async def arelated_objects(self, *args, **kwargs):
+        return await self.get_queryset().arelated_objects(*args, **kwargs)
@@ -0,0 +1,289 @@
+"""A memory-mapped copy of the embeddings next to the database.
+
+Reading embeddings from the database means reading and concatenating one
+blob per row. With ``EMBEDDING_MATRIX`` enabled, every embedding written to
+the database is also written to a raw float32 matrix under
+``DEFAULT_PERSISTENT_DIRECTORY/matrix``, with a file holding the id of each
+row. Exact searches and index rebuilds read the matrix with `np.memmap`
+instead, and all the processes reading it share its pages through the OS
+page cache.
+
+New embeddings are appended, updated ones are overwritten in place and
+deleted rows have their id set to -1 until the next `rebuild`. Writes from
+several processes are serialized with a file lock.
+
+Rows are looked up by id with `np.searchsorted` in a third memory-mapped
+file holding the ids in sorted order next to their rows, shared by the
+processes like the matrix itself. Rows appended since it was last sorted
+are looked up in a small per-process dict, until the writer sorts them in
+once there are more than ``MAX_UNSORTED_ROWS``.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from .encoding import decode_embeddings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover, windows
+    fcntl = None
+
+DELETED = -1
+
+# rows appended before the sorted ids are written again
+MAX_UNSORTED_ROWS = 1024
+
+
+class EmbeddingMatrix:
+    """An append-only float32 matrix of embeddings and the ids of its rows."""
+
+    def __init__(self, directory: str, dim: int):
+        self.directory = directory
+        self.dim = dim
+        self.embeddings_path = os.path.join(directory, "embeddings.f32")
+        self.ids_path = os.path.join(directory, "embeddings.ids")
+        # a header row with the number of rows sorted, then (id, row) pairs
+        self.sorted_path = os.path.join(directory, "embeddings.sorted")
+        self.lock_path = os.path.join(directory, "embeddings.lock")
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._inode = None
+        self._n_rows = 0
+        self._ids = np.empty(0, dtype=np.int64)
+        self._embeddings = np.empty((0, dim), dtype=np.float32)
+        self._sorted_inode = None
+        self._n_sorted = 0
+        self._sorted = np.empty((0, 2), dtype=np.int64)
+        # the rows appended since the ids were sorted
+        self._unsorted = {}
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.ids_path)
+
+    def __len__(self):
+        self.refresh()
+        return int(np.count_nonzero(self._ids != DELETED))
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """Map the rows written since the last call, by any process."""
+        with self._lock:
+            stat = _stat(self.ids_path)
+            inode = stat.st_ino if stat is not None else None
+            n_rows = stat.st_size // 8 if stat is not None else 0
+            if inode != self._inode:
+                # rebuilt, the rows have moved
+                self._inode, self._n_rows = inode, 0
+                self._unsorted = {}
+            sorted_stat = _stat(self.sorted_path)
+            sorted_inode = sorted_stat.st_ino if sorted_stat is not None else None
+            if sorted_inode != self._sorted_inode:
+                self._map_sorted(sorted_stat)
+            elif n_rows == self._n_rows and len(self._ids) == n_rows:
+                return
+
+            if n_rows:
+                self._ids = np.memmap(self.ids_path, "<i8", mode="r", shape=(n_rows,))
+                self._embeddings = np.memmap(
+                    self.embeddings_path, "<f4", mode="r", shape=(n_rows, self.dim)
+                )
+            else:
+                self._ids = np.empty(0, dtype=np.int64)
+                self._embeddings = np.empty((0, self.dim), dtype=np.float32)
+            start = max(self._n_rows, self._n_sorted)
+            new_ids = self._ids[start:n_rows].tolist()
+            for row, id in enumerate(new_ids, start=start):
+                if id != DELETED:
+                    self._unsorted[id] = row
+            self._n_rows = n_rows
+
+    def _map_sorted(self, stat):
+        self._sorted_inode = stat.st_ino if stat is not None else None
+        if stat is not None and stat.st_size >= 16:
+            pairs = np.memmap(
+                self.sorted_path, "<i8", mode="r", shape=(stat.st_size // 16, 2)
+            )
+            self._n_sorted, self._sorted = int(pairs[0, 0]), pairs[1:]
+        else:
+            self._n_sorted, self._sorted = 0, np.empty((0, 2), dtype=np.int64)
+        # the rows after the sorted ones are mapped again
+        self._n_rows, self._unsorted = 0, {}
+
+    def _rows_of(self, ids: np.ndarray) -> np.ndarray:
+        """Return the row of every id, -1 for the ids not in the matrix."""
+        rows = np.full(len(ids), -1, dtype=np.int64)
+        if len(self._sorted) and len(ids):
+            sorted_ids = self._sorted[:, 0]
+            positions = np.searchsorted(sorted_ids, ids)
+            positions = np.minimum(positions, len(sorted_ids) - 1)
+            found = sorted_ids[positions] == ids
+            rows[found] = self._sorted[positions[found], 1]
+        if self._unsorted:
+            for i, id in enumerate(ids.tolist()):
+                row = self._unsorted.get(id)
+                if row is not None:
+                    rows[i] = row
+        # another process may have deleted them since
+        valid = (rows >= 0) & (rows < self._n_rows)
+        valid[valid] = self._ids[rows[valid]] == ids[valid]
+        rows[~valid] = -1
+        return rows
+
+    def _sort_ids(self):
+        """Write the sorted ids of every row, with the file lock held."""
+        ids = np.asarray(self._ids)
+        rows = np.flatnonzero(ids != DELETED)
+        order = np.argsort(ids[rows], kind="stable")
+        _write_sorted(self.sorted_path, ids[rows[order]], rows[order], len(ids))
+        self.refresh()
+
+    def write(self, embeddings, ids):
+        """Add or replace the embeddings of ``ids``."""
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if not len(ids):
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        # the last write of an id wins
+        latest = dict(zip(ids.tolist(), embeddings))
+
+        with self._lock, self._file_lock():
+            self.refresh()
+            rows = self._rows_of(np.fromiter(latest, dtype=np.int64, count=len(latest)))
+            replaced, appended = {}, {}
+            for row, (id, embedding) in zip(rows.tolist(), latest.items()):
+                if row < 0:
+                    appended[id] = embedding
+                else:
+                    replaced[row] = embedding
+            if replaced:
+                with open(self.embeddings_path, "r+b") as f:
+                    for row, embedding in replaced.items():
+                        f.seek(row * self.dim * 4)
+                        f.write(embedding.tobytes())
+            if appended:
+                # the embeddings go first, the ids file sets the number of rows
+                with open(self.embeddings_path, "ab") as f:
+                    f.write(np.stack(list(appended.values())).tobytes())
+                with open(self.ids_path, "ab") as f:
+                    f.write(np.fromiter(appended, dtype="<i8").tobytes())
+            self.refresh()
+            if len(self._unsorted) > MAX_UNSORTED_ROWS:
+                self._sort_ids()
+
+    def delete(self, ids):
+        with self._lock, self._file_lock():
+            self.refresh()
+            if not self._n_rows:
+                return
+            ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+            rows = self._rows_of(ids)
+            with open(self.ids_path, "r+b") as f:
+                for id, row in zip(ids.tolist(), rows.tolist()):
+                    if row >= 0:
+                        f.seek(row * 8)
+                        f.write(np.int64(DELETED).tobytes())
+                        self._unsorted.pop(id, None)
+
+    def get(self, ids):
+        """Return ``(ids, embeddings)`` for the ``ids`` found in the matrix."""
+        self.refresh()
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        rows = self._rows_of(ids)
+        found = rows >= 0
+        return ids[found], np.asarray(self._embeddings[rows[found]], dtype=np.float32)
+
+    def all(self):
+        """Return ``(ids, embeddings)`` of every row.
+
+        Without deleted rows these are views of the memory-mapped files, no
+        data is copied.
+        """
+        self.refresh()
+        live = self._ids != DELETED
+        if live.all():
+            return self._ids, self._embeddings
+        return np.asarray(self._ids[live]), np.asarray(self._embeddings[live])
+
+    def clear(self):
+        self.rebuild(None)
+
+    def rebuild(self, manager, chunk_size: int = 1000) -> int:
+        """Write the embeddings of ``manager`` to a new matrix.
+
+        The new files replace the old ones at once, the processes reading
+        the old ones switch on their next read.
+
+        Returns:
+            int: The number of rows written.
+        """
+        written = 0
+        with self._lock, self._file_lock():
+            embeddings_tmp = self.embeddings_path + ".tmp"
+            ids_tmp = self.ids_path + ".tmp"
+            with open(embeddings_tmp, "wb") as embeddings_file, open(
+                ids_tmp, "wb"
+            ) as ids_file:
+                if manager is not None:
+                    for ids, embeddings in _iter_embeddings(manager, chunk_size):
+                        embeddings_file.write(embeddings.astype("<f4").tobytes())
+                        ids_file.write(ids.astype("<i8").tobytes())
+                        written += len(ids)
+            # the rows are written in id order
+            ids = np.fromfile(ids_tmp, dtype="<i8")
+            _write_sorted(self.sorted_path, ids, np.arange(written), written)
+            os.replace(embeddings_tmp, self.embeddings_path)
+            os.replace(ids_tmp, self.ids_path)
+            self.refresh()
+        return written
+
+
+def _stat(path: str):
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def _write_sorted(path: str, ids: np.ndarray, rows: np.ndarray, n_rows: int):
+    pairs = np.empty((len(ids) + 1, 2), dtype="<i8")
+    pairs[0] = n_rows, 0
+    pairs[1:, 0] = ids
+    pairs[1:, 1] = rows
+    # replaced at once, the readers map the new file on their next refresh
+    with open(path + ".tmp", "wb") as f:
+        f.write(pairs.tobytes())
+    os.replace(path + ".tmp", path)
+
+
+def _iter_embeddings(manager, chunk_size: int):
+    vectors = manager.filter(embedding__isnull=False).exclude(
+        status=manager.model.Status.PENDING
+    )
+    vectors = vectors.order_by("id")
+    last_id = None
+    while True:
+        chunk = vectors if last_id is None else vectors.filter(id__gt=last_id)
+        rows = list(chunk.values_list("id", "embedding")[:chunk_size])
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        yield ids, decode_embeddings([row[1] for row in rows])
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+import vectordb.models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("vectordb", "0002_vector_created_at_vector_updated_at_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="vector",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("embedded", "Embedded"),
+                    ("indexed", "Indexed"),
+                ],
+                db_index=True,
+                default="indexed",
+                max_length=16,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="vector",
+            name="embedding",
+            field=models.BinaryField(
+                null=True, validators=[vectordb.models.validate_embedding]
+            ),
+        ),
+    ]
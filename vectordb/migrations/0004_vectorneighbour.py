@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("vectordb", "0003_vector_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VectorNeighbour",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("distance", models.FloatField()),
+                ("computed_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "neighbour",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="neighbour_links",
+                        to="vectordb.vector",
+                    ),
+                ),
+                (
+                    "vector",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="neighbours",
+                        to="vectordb.vector",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["vector", "rank"],
+                "unique_together": {("vector", "rank")},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("vectordb", "0004_vectorneighbour"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="vectorneighbour",
+            name="computed_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
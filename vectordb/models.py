@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-import numpy as np
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 
+from .encoding import decode_embedding, encode_embedding
 from .manager import VectorManager
 
 
@@ -20,10 +21,20 @@ def validate_embedding(value):
 class Vector(models.Model):
     """A vector db model that can be used to store embeddings for any Django model."""
 
+    class Status(models.TextChoices):
+        # queued for the background ingestion, no embedding yet
+        PENDING = "pending"
+        # embedded but not yet added to the ANN index
+        EMBEDDED = "embedded"
+        INDEXED = "indexed"
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    embedding = models.BinaryField(validators=[validate_embedding])
+    embedding = models.BinaryField(null=True, validators=[validate_embedding])
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.INDEXED, db_index=True
+    )
     text = models.TextField()
     metadata = models.JSONField(null=True, blank=True)
     object_id = models.CharField(max_length=255, null=True, blank=True)
@@ -42,17 +53,43 @@ class Vector(models.Model):
 
     @property
     def vector(self):
-        return np.frombuffer(self.embedding, dtype=np.float32)
+        """The embedding as an array, read from the database if it was deferred."""
+        return decode_embedding(self.embedding)
 
     def save(self, *args, **kwargs):
-        if self.embedding is None:
-            self.embedding = Vector.objects.embedding_fn(self.text).tobytes()
+        if "embedding" in self.get_deferred_fields():
+            # loaded without its embedding, which is kept as is
+            pass
+        elif self.embedding is None and self.status != Vector.Status.PENDING:
+            self.embedding = encode_embedding(Vector.objects.embedding_fn(self.text))
         return super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Vector {self.id} with metadata {self.metadata}"
 
 
+class VectorNeighbour(models.Model):
+    """A precomputed nearest neighbour of a vector, see vectordb.neighbours."""
+
+    vector = models.ForeignKey(
+        Vector, on_delete=models.CASCADE, related_name="neighbours"
+    )
+    neighbour = models.ForeignKey(
+        Vector, on_delete=models.CASCADE, related_name="neighbour_links"
+    )
+    rank = models.PositiveSmallIntegerField()
+    distance = models.FloatField()
+    # when the vectors were read, see vectordb.neighbours.refresh_neighbours
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ["vector", "rank"]
+        ordering = ["vector", "rank"]
+
+    def __str__(self):
+        return f"Neighbour {self.rank} of vector {self.vector_id}"
+
+
 class SampleModel(models.Model):
     """A sample model to demonstrate how to use Vector model."""
 
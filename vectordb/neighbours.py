@@ -0,0 +1,250 @@
+"""Precomputed nearest neighbours.
+
+`related_objects` searches the vectors of the object's content type for
+every call, yet the related items of an object rarely change. With
+``USE_PRECOMPUTED_NEIGHBOURS`` enabled it instead reads the ``NEIGHBOURS_K``
+nearest neighbours of the object from the `VectorNeighbour` table with a
+single query, and falls back to a live search when they have not been
+computed.
+
+`compute_neighbours` fills the table, one content type at a time, with
+batched multi-query searches. `refresh_neighbours` recomputes only the
+vectors that changed since the last run and the vectors near them.
+``manage.py vectordb_neighbours`` runs either of them.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Iterable
+
+import numpy as np
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from .ann.indexes import BFIndex, HNSWIndex
+from .models import Vector, VectorNeighbour
+from .queryset import _candidates_from_rows, _chunks
+from .settings import vectordb_settings
+
+logger = logging.getLogger("VectorDB")
+
+
+def _build_index(ids: np.ndarray, embeddings: np.ndarray):
+    if len(ids) <= vectordb_settings.DEFAULT_MAX_BRUTEFORCE_N:
+        index_class = BFIndex
+    else:
+        index_class = HNSWIndex
+    index = index_class(
+        max_elements=len(ids),
+        dim=embeddings.shape[1],
+        space=vectordb_settings.DEFAULT_EMBEDDING_SPACE,
+        should_not_cache=True,
+    )
+    index.add(embeddings, ids)
+    return index
+
+
+def _partitions(vector_ids=None):
+    """Return the content types holding ``vector_ids``, or all of them."""
+    vectors = Vector.objects.exclude(status=Vector.Status.PENDING)
+    if vector_ids is not None:
+        content_types = set()
+        for chunk in _chunks(list(vector_ids)):
+            content_types.update(
+                vectors.filter(id__in=chunk).values_list("content_type_id", flat=True)
+            )
+    else:
+        content_types = set(vectors.values_list("content_type_id", flat=True))
+    return sorted(content_types, key=lambda id: (id is None, id))
+
+
+def _load_partition(content_type_id):
+    """Return the ids, embeddings and index of the vectors of a content type.
+
+    Returns:
+        tuple: None when the content type holds fewer than two vectors.
+    """
+    rows = list(
+        Vector.objects.exclude(status=Vector.Status.PENDING)
+        .filter(content_type_id=content_type_id)
+        .values_list("id", "embedding")
+    )
+    if len(rows) < 2:
+        return None
+    ids, embeddings = _candidates_from_rows(rows)
+    return ids, embeddings, _build_index(ids, embeddings)
+
+
+def _compute_partition(
+    partition, vector_ids, k: int, batch_size: int, computed_at
+) -> tuple[int, set]:
+    """Compute the neighbours of ``vector_ids`` among their content type.
+
+    Args:
+        partition (tuple): The ids, embeddings and index of the content type,
+            see `_load_partition`.
+        computed_at (datetime): When the vectors were read.
+
+    Returns:
+        tuple: The number of vectors updated and the ids of their neighbours.
+    """
+    if partition is None:
+        return 0, set()
+    ids, embeddings, index = partition
+
+    if vector_ids is None:
+        queries = np.arange(len(ids))
+    else:
+        queries = np.flatnonzero(np.isin(ids, np.fromiter(vector_ids, np.int64)))
+
+    # the nearest neighbour of a vector is itself
+    n_neighbours = min(k + 1, len(ids))
+    updated, nearby = 0, set()
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start : start + batch_size]
+        labels, distances = index.search(embeddings[batch], n_neighbours)
+
+        neighbours = []
+        for vector_id, row_labels, row_distances in zip(
+            ids[batch].tolist(), labels.tolist(), distances.tolist()
+        ):
+            rank = 0
+            for label, distance in zip(row_labels, row_distances):
+                if label == vector_id or rank == k:
+                    continue
+                neighbours.append(
+                    VectorNeighbour(
+                        vector_id=vector_id,
+                        neighbour_id=label,
+                        rank=rank,
+                        distance=distance,
+                        computed_at=computed_at,
+                    )
+                )
+                nearby.add(label)
+                rank += 1
+
+        batch_ids = ids[batch].tolist()
+        with transaction.atomic():
+            VectorNeighbour.objects.filter(vector_id__in=batch_ids).delete()
+            VectorNeighbour.objects.bulk_create(neighbours)
+        updated += len(batch)
+    return updated, nearby
+
+
+def compute_neighbours(
+    vector_ids: Iterable[int] | None = None,
+    k: int | None = None,
+    batch_size: int = 256,
+) -> int:
+    """Compute and store the ``k`` nearest neighbours of vectors.
+
+    Args:
+        vector_ids (Iterable[int], optional): The vectors to update. Defaults
+            to every vector.
+        k (int, optional): Defaults to the NEIGHBOURS_K setting.
+        batch_size (int, optional): Number of vectors searched at once.
+
+    Returns:
+        int: The number of vectors updated.
+    """
+    k = k or vectordb_settings.NEIGHBOURS_K
+    if vector_ids is not None:
+        vector_ids = set(vector_ids)
+    updated = 0
+    for content_type_id in _partitions(vector_ids):
+        computed_at = timezone.now()
+        count, _ = _compute_partition(
+            _load_partition(content_type_id), vector_ids, k, batch_size, computed_at
+        )
+        updated += count
+    return updated
+
+
+def refresh_neighbours(since=None, k: int | None = None, batch_size: int = 256) -> int:
+    """Recompute the neighbours affected by the writes made after ``since``.
+
+    These are the vectors created or updated since then, the vectors that
+    had one of them as a neighbour, the vectors near them, and the vectors
+    that lost neighbours because they were deleted.
+
+    Args:
+        since (datetime, optional): Defaults to the time the last run read
+            the vectors, so that the writes made while it ran are not missed.
+
+    Returns:
+        int: The number of vectors updated.
+    """
+    k = k or vectordb_settings.NEIGHBOURS_K
+    if since is None:
+        since = VectorNeighbour.objects.aggregate(last=Max("computed_at"))["last"]
+    if since is None:
+        return compute_neighbours(k=k, batch_size=batch_size)
+
+    # before the changed vectors are read, the writes made from now on are
+    # picked up by the next run
+    computed_at = timezone.now()
+    vectors = Vector.objects.exclude(status=Vector.Status.PENDING)
+    changed = set(vectors.filter(updated_at__gt=since).values_list("id", flat=True))
+    # vectors with fewer than k neighbours lost some to a delete, or have not
+    # been computed yet
+    changed.update(
+        vectors.annotate(n_neighbours=Count("neighbours"))
+        .filter(n_neighbours__lt=k)
+        .values_list("id", flat=True)
+    )
+    if not changed:
+        return 0
+
+    affected = set(changed)
+    for chunk in _chunks(list(changed)):
+        affected.update(
+            VectorNeighbour.objects.filter(neighbour_id__in=chunk).values_list(
+                "vector_id", flat=True
+            )
+        )
+
+    updated = 0
+    for content_type_id in _partitions(affected):
+        partition = _load_partition(content_type_id)
+        count, nearby = _compute_partition(
+            partition, affected, k, batch_size, computed_at
+        )
+        updated += count
+        # a new or moved vector can be closer than the current neighbours of
+        # the vectors around it
+        nearby -= affected
+        if nearby:
+            count, _ = _compute_partition(partition, nearby, k, batch_size, computed_at)
+            updated += count
+    return updated
+
+
+def get_neighbours(queryset, model_object, k: int, max_distance=None):
+    """Return the stored neighbours of ``model_object`` or None on a miss.
+
+    The neighbours are read with a single query, as a queryset of vectors
+    annotated with their distance like the results of a live search. With
+    ``max_distance`` only the neighbours within it are returned.
+    """
+    if k > vectordb_settings.NEIGHBOURS_K:
+        return None
+    content_type = ContentType.objects.get_for_model(model_object)
+    # a single filter call, so that every condition applies to the same link
+    filters = {
+        "neighbour_links__vector__content_type": content_type,
+        "neighbour_links__vector__object_id": model_object.pk,
+        "neighbour_links__rank__lt": k,
+    }
+    if max_distance is not None:
+        filters["neighbour_links__distance__lte"] = max_distance
+    results = (
+        queryset.filter(**filters)
+        .annotate(distance=F("neighbour_links__distance"))
+        .order_by("neighbour_links__rank")
+    )
+    # evaluate it now, the result cache is kept for the caller
+    return results if results else None
@@ -3,10 +3,25 @@ from __future__ import annotations
 import numpy as np
 from django.conf import settings
 
+from ..batching import (
+    BatchedEmbeddingExecutor,
+    agather_batches,
+    aretry_with_backoff,
+    make_batches,
+    retry_with_backoff,
+)
 from ..settings import vectordb_settings
 
 try:
     import openai  # noqa
+
+    # throttled requests, dropped connections, timeouts and 5xx responses
+    _RETRY_ON = (
+        openai.error.RateLimitError,
+        openai.error.APIConnectionError,
+        openai.error.Timeout,
+        openai.error.ServiceUnavailableError,
+    )
 except ImportError:
     openai = None
 
@@ -15,8 +30,24 @@ if not hasattr(settings, "OPENAI_API_KEY"):
     setattr(settings, "OPENAI_API_KEY", vectordb_settings.OPENAI_API_KEY)
 
 
+def _decode_response(response) -> np.ndarray:
+    data = sorted(response["data"], key=lambda item: item["index"])
+    return np.array([item["embedding"] for item in data], dtype=np.float32)
+
+
 class OpenAIEmbeddings:
-    def __init__(self, model_name="text-embedding-ada-002"):
+    # API limits: 2048 inputs and 300k tokens summed across inputs per request
+    max_batch_size = 2048
+    max_batch_tokens = 300_000
+
+    def __init__(
+        self,
+        model_name="text-embedding-ada-002",
+        *,
+        base_url: str | None = None,
+        max_concurrent_requests: int | None = None,
+        max_retries: int | None = None,
+    ):
         if not hasattr(settings, "OPENAI_API_KEY"):
             raise ValueError("OPENAI_API_KEY is not set in Django settings.")
         if openai is None:
@@ -24,15 +55,67 @@ class OpenAIEmbeddings:
                 "OpenAI API is not installed. Please install openai package. Or run `$ pip install openai`"  # noqa
             )
         openai.api_key = settings.OPENAI_API_KEY
+        base_url = base_url or vectordb_settings.OPENAI_BASE_URL
+        if base_url:
+            openai.api_base = base_url
         self.model = model_name
+        self.max_retries = max_retries
+        # the pre-release client keeps a pooled requests session per thread,
+        # so the executor threads reuse their connections between batches
+        self.executor = BatchedEmbeddingExecutor(max_concurrent_requests)
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        texts = [text.replace("\n", " ") for text in texts]
+        response = retry_with_backoff(
+            openai.Embedding.create,
+            input=texts,
+            model=self.model,
+            retry_on=_RETRY_ON,
+            max_retries=self.max_retries,
+        )
+        return _decode_response(response)
+
+    async def _aembed_batch(self, texts: list[str]) -> np.ndarray:
+        texts = [text.replace("\n", " ") for text in texts]
+        response = await aretry_with_backoff(
+            openai.Embedding.acreate,
+            input=texts,
+            model=self.model,
+            retry_on=_RETRY_ON,
+            max_retries=self.max_retries,
+        )
+        return _decode_response(response)
 
     def get_embedding(self, text: str) -> np.ndarray:
-        text = text.replace("\n", " ")
-        response = openai.Embedding.create(input=[text], model=self.model)
-        raw_embedding = response["data"][0]["embedding"]
-        return np.array(raw_embedding, dtype=np.float32)
+        return self._embed_batch([text])[0]
+
+    def get_embeddings(self, texts: list[str]) -> np.ndarray:
+        """Embed ``texts`` in API sized batches sent concurrently.
+
+        Returns:
+            np.ndarray: A contiguous ``(len(texts), dim)`` float32 array.
+        """
+        if not texts:
+            return np.empty(
+                (0, vectordb_settings.DEFAULT_EMBEDDING_DIMENSION), dtype=np.float32
+            )
+        batches = make_batches(texts, self.max_batch_size, self.max_batch_tokens)
+        return self.executor.run(self._embed_batch, texts, batches)
+
+    async def aembed(self, text: str | list[str]) -> np.ndarray:
+        """Async version of `__call__` using the client's ``acreate``."""
+        if not isinstance(text, list):
+            return (await self._aembed_batch([text]))[0]
+        if not text:
+            return np.empty(
+                (0, vectordb_settings.DEFAULT_EMBEDDING_DIMENSION), dtype=np.float32
+            )
+        batches = make_batches(text, self.max_batch_size, self.max_batch_tokens)
+        return await agather_batches(
+            self._aembed_batch, text, batches, self.executor.max_workers
+        )
 
     def __call__(self, text: str | list[str]) -> np.ndarray:
         if isinstance(text, list):
-            return [self.get_embedding(t) for t in text]
+            return self.get_embeddings(text)
         return self.get_embedding(text)
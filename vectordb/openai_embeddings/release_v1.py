@@ -1,14 +1,34 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import weakref
+
 import numpy as np
 from django.conf import settings
 
 try:
+    import httpx
     import openai  # noqa
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
+
+    # throttled requests, dropped connections, timeouts and 5xx responses
+    _RETRY_ON = (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+        openai.InternalServerError,
+    )
 except ImportError:
     openai = None
 
+from ..batching import (
+    BatchedEmbeddingExecutor,
+    agather_batches,
+    aretry_with_backoff,
+    make_batches,
+    retry_with_backoff,
+)
 from ..settings import vectordb_settings
 
 # support those setting the key in vectordb_settings or django settings
@@ -17,8 +37,40 @@ if not hasattr(settings, "OPENAI_API_KEY"):
     setattr(settings, "OPENAI_API_KEY", vectordb_settings.OPENAI_API_KEY)
 
 
+def _retry_after(error) -> float | None:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _decode_embedding(embedding) -> np.ndarray:
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype="<f4")
+    return np.asarray(embedding, dtype=np.float32)
+
+
+def _decode_response(response) -> np.ndarray:
+    data = sorted(response.data, key=lambda item: item.index)
+    return np.stack([_decode_embedding(item.embedding) for item in data])
+
+
 class OpenAIEmbeddings:
-    def __init__(self, model_name="text-embedding-ada-002"):
+    # API limits: 2048 inputs and 300k tokens summed across inputs per request
+    max_batch_size = 2048
+    max_batch_tokens = 300_000
+
+    def __init__(
+        self,
+        model_name="text-embedding-ada-002",
+        *,
+        base_url: str | None = None,
+        max_concurrent_requests: int | None = None,
+        max_retries: int | None = None,
+    ):
         if not hasattr(settings, "OPENAI_API_KEY"):
             raise ValueError("OPENAI_API_KEY is not set in Django settings.")
         if openai is None:
@@ -26,16 +78,107 @@ class OpenAIEmbeddings:
                 "OpenAI API is not installed. Please install openai package. Or run `$ pip install openai`"  # noqa
             )
 
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
         self.model = model_name
+        self.max_retries = max_retries
+        self.executor = BatchedEmbeddingExecutor(max_concurrent_requests)
+
+        # One pooled HTTP client shared by all batches, sized to the number of
+        # concurrent requests. Retries of the errors in _RETRY_ON are handled
+        # by us so that failed batches back off without blocking the others.
+        self.base_url = base_url or vectordb_settings.OPENAI_BASE_URL
+        self.client = OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=self.base_url,
+            max_retries=0,
+            http_client=httpx.Client(
+                limits=self._http_limits(), timeout=httpx.Timeout(60.0, connect=10.0)
+            ),
+        )
+        # async clients are bound to the event loop they were created in
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def _http_limits(self):
+        pool_size = self.executor.max_workers
+        return httpx.Limits(
+            max_connections=pool_size, max_keepalive_connections=pool_size
+        )
+
+    @property
+    def async_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    limits=self._http_limits(),
+                    timeout=httpx.Timeout(60.0, connect=10.0),
+                ),
+            )
+            self._async_clients[loop] = client
+        return client
+
+    def _create(self, texts: list[str]):
+        return self.client.embeddings.create(
+            input=texts, model=self.model, encoding_format="base64"
+        )
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        texts = [text.replace("\n", " ") for text in texts]
+        response = retry_with_backoff(
+            self._create,
+            texts,
+            retry_on=_RETRY_ON,
+            max_retries=self.max_retries,
+            retry_after=_retry_after,
+        )
+        return _decode_response(response)
+
+    async def _aembed_batch(self, texts: list[str]) -> np.ndarray:
+        texts = [text.replace("\n", " ") for text in texts]
+        response = await aretry_with_backoff(
+            self.async_client.embeddings.create,
+            input=texts,
+            model=self.model,
+            encoding_format="base64",
+            retry_on=_RETRY_ON,
+            max_retries=self.max_retries,
+            retry_after=_retry_after,
+        )
+        return _decode_response(response)
 
     def get_embedding(self, text: str) -> np.ndarray:
-        text = text.replace("\n", " ")
-        response = self.client.embeddings.create(input=[text], model=self.model)
-        raw_embedding = response.data[0].embedding
-        return np.array(raw_embedding, dtype=np.float32)
+        return self._embed_batch([text])[0]
+
+    def get_embeddings(self, texts: list[str]) -> np.ndarray:
+        """Embed ``texts`` in API sized batches sent concurrently.
+
+        Returns:
+            np.ndarray: A contiguous ``(len(texts), dim)`` float32 array.
+        """
+        if not texts:
+            return np.empty(
+                (0, vectordb_settings.DEFAULT_EMBEDDING_DIMENSION), dtype=np.float32
+            )
+        batches = make_batches(texts, self.max_batch_size, self.max_batch_tokens)
+        return self.executor.run(self._embed_batch, texts, batches)
+
+    async def aembed(self, text: str | list[str]) -> np.ndarray:
+        """Async version of `__call__` using the native async client."""
+        if not isinstance(text, list):
+            return (await self._aembed_batch([text]))[0]
+        if not text:
+            return np.empty(
+                (0, vectordb_settings.DEFAULT_EMBEDDING_DIMENSION), dtype=np.float32
+            )
+        batches = make_batches(text, self.max_batch_size, self.max_batch_tokens)
+        return await agather_batches(
+            self._aembed_batch, text, batches, self.executor.max_workers
+        )
 
     def __call__(self, text: str | list[str]) -> np.ndarray:
         if isinstance(text, list):
-            return [self.get_embedding(t) for t in text]
+            return self.get_embeddings(text)
         return self.get_embedding(text)
@@ -1,9 +1,138 @@
+import asyncio
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import numpy as np
 import pytest
 
 from ...openai_embeddings import OpenAIEmbeddings
 
 
+class EmbeddingsHandler(BaseHTTPRequestHandler):
+    """A local stand-in for the OpenAI embeddings endpoint."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            throttled = self.server.throttle > 0
+            if throttled:
+                self.server.throttle -= 1
+            else:
+                self.server.requests.append(body["input"])
+
+        if throttled:
+            payload = json.dumps({"error": {"message": "Rate limit reached"}})
+            self.send_response(self.server.throttle_status)
+            self.send_header("Retry-After", "0")
+        else:
+            data = []
+            for i, text in enumerate(body["input"]):
+                embedding = np.array([len(text), 1, 2, 3], dtype="<f4")
+                if body.get("encoding_format") == "base64":
+                    embedding = base64.b64encode(embedding.tobytes()).decode()
+                else:
+                    embedding = embedding.tolist()
+                data.append({"object": "embedding", "index": i, "embedding": embedding})
+            # the order of the items is not guaranteed by the API
+            data.reverse()
+            payload = json.dumps(
+                {
+                    "object": "list",
+                    "data": data,
+                    "model": body["model"],
+                    "usage": {"prompt_tokens": 0, "total_tokens": 0},
+                }
+            )
+            self.send_response(200)
+
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload.encode())
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EmbeddingsHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.throttle = 0
+    server.throttle_status = 429
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def embedding_fn(server, settings):
+    settings.OPENAI_API_KEY = "test"
+    host, port = server.server_address
+    return OpenAIEmbeddings(
+        base_url=f"http://{host}:{port}/v1", max_concurrent_requests=4
+    )
+
+
+def test_embed_single_text(embedding_fn):
+    embedding = embedding_fn("Hello World!")
+    assert isinstance(embedding, np.ndarray)
+    assert embedding.shape == (4,)
+    assert embedding[0] == len("Hello World!")
+
+
+def test_embed_list_is_batched_and_ordered(server, embedding_fn):
+    embedding_fn.max_batch_size = 10
+    texts = ["x" * i for i in range(1, 36)]
+    embeddings = embedding_fn(texts)
+
+    assert embeddings.shape == (35, 4)
+    assert embeddings.dtype == np.float32
+    assert embeddings.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(embeddings[:, 0], np.arange(1, 36))
+    assert sorted(len(request) for request in server.requests) == [5, 10, 10, 10]
+
+
+def test_batches_respect_token_budget(server, embedding_fn):
+    embedding_fn.max_batch_tokens = 100
+    embedding_fn(["y" * 150] * 6)
+    assert all(len(request) <= 2 for request in server.requests)
+
+
+def test_retries_rate_limited_requests(server, embedding_fn):
+    server.throttle = 2
+    embeddings = embedding_fn(["a", "bb"])
+    assert embeddings.shape == (2, 4)
+    assert len(server.requests) == 1
+
+
+def test_retries_server_errors(server, embedding_fn):
+    server.throttle = 2
+    server.throttle_status = 500
+    embeddings = embedding_fn(["a", "bb"])
+    assert embeddings.shape == (2, 4)
+    assert len(server.requests) == 1
+
+
+def test_empty_list(embedding_fn):
+    assert embedding_fn([]).shape[0] == 0
+
+
+def test_aembed(server, embedding_fn):
+    embedding_fn.max_batch_size = 4
+    texts = ["x" * i for i in range(1, 11)]
+    embeddings = asyncio.run(embedding_fn.aembed(texts))
+
+    assert embeddings.shape == (10, 4)
+    np.testing.assert_array_equal(embeddings[:, 0], np.arange(1, 11))
+    assert sorted(len(request) for request in server.requests) == [2, 4, 4]
+
+
 @pytest.mark.skip(reason="Test only works with OpenAI API key.")
 def test_embeddings():
     embedding_fn = OpenAIEmbeddings()
@@ -0,0 +1,104 @@
+"""Cursor pagination of search results.
+
+A page of results is the next ``page_size`` vectors after the ones returned
+by the previous pages. Instead of an offset, the cursor holds what the next
+search needs: the query embedding, so the query is not embedded again, the
+distance of the last result and the ids returned at that distance. The next
+page searches for ``returned + page_size`` neighbours, hnswlib raises ``ef``
+to ``k`` so deeper pages explore more of the graph, and only the rows of the
+page are read from the database.
+
+Cursors are signed, so a client can't tamper with them, and opaque, so they
+can be passed around through the REST API.
+"""
+
+from __future__ import annotations
+
+import base64
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+from django.core import signing
+
+SALT = "vectordb.search-cursor"
+
+
+@dataclass
+class SearchCursor:
+    embedding: np.ndarray
+    content_type_id: int | None = None
+    exclude_object_id: str | None = None
+    max_distance: float | None = None
+    returned: int = 0
+    last_distance: float | None = None
+    last_ids: list[int] = field(default_factory=list)
+
+    def encode(self) -> str:
+        embedding = np.asarray(self.embedding, dtype=np.float32).tobytes()
+        return signing.dumps(
+            {
+                "q": base64.b64encode(embedding).decode(),
+                "ct": self.content_type_id,
+                "x": self.exclude_object_id,
+                "md": self.max_distance,
+                "n": self.returned,
+                "d": self.last_distance,
+                "ids": self.last_ids,
+            },
+            salt=SALT,
+            compress=True,
+        )
+
+    @classmethod
+    def decode(cls, value: str) -> SearchCursor:
+        try:
+            data = signing.loads(value, salt=SALT)
+            embedding = np.frombuffer(base64.b64decode(data["q"]), dtype=np.float32)
+            return cls(
+                embedding=embedding,
+                content_type_id=data["ct"],
+                exclude_object_id=data["x"],
+                max_distance=data["md"],
+                returned=data["n"],
+                last_distance=data["d"],
+                last_ids=data["ids"],
+            )
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            raise ValueError("Invalid search cursor")
+
+    def unseen(self, labels: np.ndarray, distances: np.ndarray) -> np.ndarray:
+        """Return a mask of the results not returned by the previous pages."""
+        if self.last_distance is None:
+            return np.ones(len(labels), dtype=bool)
+        return (distances > self.last_distance) | (
+            (distances == self.last_distance) & ~np.isin(labels, self.last_ids)
+        )
+
+    def advance(self, labels: np.ndarray, distances: np.ndarray) -> SearchCursor:
+        """Return the cursor of the page after the ``labels`` of this page."""
+        last_distance = float(distances[-1])
+        last_ids = labels[distances == distances[-1]].tolist()
+        if last_distance == self.last_distance:
+            last_ids = self.last_ids + last_ids
+        return replace(
+            self,
+            returned=self.returned + len(labels),
+            last_distance=last_distance,
+            last_ids=last_ids,
+        )
+
+
+@dataclass
+class SearchPage:
+    results: object
+    next_cursor: str | None = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
@@ -1,15 +1,24 @@
 from __future__ import annotations
 
 import logging
+import threading
 import time
+from contextlib import contextmanager
 
 import numpy as np
+from asgiref.sync import sync_to_async
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
 from django.db import models
 
 from vectordb.settings import vectordb_settings
 
-from .ann.indexes import BFIndex, HNSWIndex
+from .aio import aembed_query, run_in_executor
+from .ann.distances import pairwise_distances, prepare, score_to_distance
+from .ann.indexes import BFIndex
+from .cache import get_search_cache, invalidate_search_cache
+from .encoding import decode_embedding, decode_embeddings
+from .pagination import SearchCursor, SearchPage
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(" VectorDB ")
@@ -64,48 +73,240 @@ def _validate_option_search_args(k, content_type, unwrap):
     return k, content_type, unwrap
 
 
-class VectorQuerySet(models.QuerySet):
-    def _get_related_vectors(
-        self, query_embeddings, vectors, k: int | None = None, ids_list=None
-    ):
+def _search_limits(k, max_distance, min_score):
+    """Return the ``(k, max_distance)`` of a search.
+
+    ``min_score`` is converted to a distance of the embedding space, the
+    tightest threshold wins. Without a threshold DEFAULT_MIN_SCORE applies,
+    unless it is 0. A search with an explicit threshold and no ``k`` returns
+    every vector within the threshold.
+    """
+    space = vectordb_settings.DEFAULT_EMBEDDING_SPACE
+    if min_score is not None:
+        distance = score_to_distance(min_score, space)
+        max_distance = distance if max_distance is None else min(max_distance, distance)
+    if max_distance is None:
+        if vectordb_settings.DEFAULT_MIN_SCORE:
+            max_distance = score_to_distance(vectordb_settings.DEFAULT_MIN_SCORE, space)
         if k is None:
             k = vectordb_settings.DEFAULT_MAX_N_RESULTS
-        manager = self.model.objects
-        vector_count = len(vectors)
-        # k cannot be greater than the number of vectors. Don't raise an error
-        k = min(k, vector_count)
+    return k, max_distance
+
 
-        if vector_count == 0:
-            return self.none()
+def _embed_query(embedding_fn, text: str) -> np.ndarray:
+    """Embed a search query as a (1, dim) array.
 
-        embeddings_list = [vector.embedding for vector in vectors]
-        embeddings = np.frombuffer(b"".join(embeddings_list), dtype=np.float32).reshape(
-            vector_count, -1
+    Encoders that distinguish queries from documents (e.g. Cohere) expose an
+    ``embed_query`` method, which is preferred on the search path.
+    """
+    if hasattr(embedding_fn, "embed_query"):
+        return np.asarray(embedding_fn.embed_query(text), dtype=np.float32).reshape(
+            1, -1
         )
+    return embedding_fn([text])
+
+
+def _get_query_text(model_object) -> str:
+    if hasattr(model_object, "get_vectordb_text"):
+        return model_object.get_vectordb_text()
+    return model_object.get_text()
+
+
+def _candidates_from_rows(rows):
+    """Turn ``(id, embedding)`` rows into an id array and an embedding matrix."""
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    return ids, decode_embeddings([row[1] for row in rows])
+
+
+# bulk operations keep the index in sync themselves, with one call for all the
+# affected rows, and mute the per-row signal handlers while they run
+_bulk = threading.local()
+
+# stay below the number of query parameters sqlite accepts
+ID_CHUNK_SIZE = 900
 
-        if vector_count < 10_000:
+
+@contextmanager
+def _mute_index_signals():
+    _bulk.depth = getattr(_bulk, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _bulk.depth -= 1
+
+
+def index_signals_muted() -> bool:
+    return getattr(_bulk, "depth", 0) > 0
+
+
+def _no_results():
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+
+def _chunks(ids, size=ID_CHUNK_SIZE):
+    for start in range(0, len(ids), size):
+        yield ids[start : start + size]
+
+
+class VectorQuerySet(models.QuerySet):
+    # The search runs in three steps so that the sync and async APIs share
+    # everything but the I/O: fetch the candidates from the database, run the
+    # (CPU bound) nearest neighbour search, then build the result queryset.
+
+    def with_embeddings(self):
+        """Load the embeddings with the rows, they are deferred by default."""
+        clone = self._chain()
+        field_names, defer = clone.query.deferred_loading
+        if defer:
+            clone.query.deferred_loading = (field_names - {"embedding"}, True)
+        elif field_names:
+            # only() was called
+            clone.query.deferred_loading = (field_names | {"embedding"}, False)
+        return clone
+
+    def _use_bruteforce(self, count: int) -> bool:
+        return count <= vectordb_settings.DEFAULT_MAX_BRUTEFORCE_N
+
+    def _is_unfiltered(self) -> bool:
+        return not (self.query.has_filters() or self.query.is_sliced)
+
+    def _searchable(self):
+        """Exclude the vectors still waiting for the background ingestion."""
+        return self.exclude(status=self.model.Status.PENDING)
+
+    def _get_search_candidates(self):
+        """Return ``(count, ids, embeddings)`` for the vectors in this queryset.
+
+        Small candidate sets are searched exactly, so their embeddings are
+        loaded. Larger ones are searched with the ANN index and only the ids
+        are needed to filter it, or nothing at all when the queryset is not
+        filtered.
+        """
+        # the ANN index never holds pending vectors, so an unfiltered queryset
+        # can still be searched without passing the ids
+        unfiltered = self._is_unfiltered()
+        vectors = self._searchable()
+        count = vectors.count()
+        if count == 0:
+            return 0, None, None
+        if self._use_bruteforce(count):
+            matrix = self.model.objects.get_matrix()
+            if matrix is not None:
+                ids = np.fromiter(vectors.values_list("id", flat=True), dtype=np.int64)
+                ids, embeddings = self._rows_from_matrix(matrix, ids)
+                return count, ids, embeddings
+            ids, embeddings = _candidates_from_rows(
+                list(vectors.values_list("id", "embedding"))
+            )
+            return count, ids, embeddings
+        if unfiltered:
+            return count, None, None
+        ids = np.fromiter(vectors.values_list("id", flat=True), dtype=np.int64)
+        return count, ids, None
+
+    def _rows_from_matrix(self, matrix, ids):
+        """Read the embeddings of ``ids`` from the matrix, or the database."""
+        found, embeddings = matrix.get(ids)
+        if len(found) == len(ids):
+            return found, embeddings
+        # written behind the manager's back, add them to the matrix
+        missing = np.setdiff1d(ids, found).tolist()
+        rows = []
+        for chunk in _chunks(missing):
+            rows += (
+                self.model._base_manager.using(self.db)
+                .filter(id__in=chunk)
+                .values_list("id", "embedding")
+            )
+        if not rows:
+            # deleted since
+            return found, embeddings
+        missing_ids, missing_embeddings = _candidates_from_rows(rows)
+        matrix.write(missing_embeddings, missing_ids)
+        return (
+            np.concatenate([found, missing_ids]),
+            np.concatenate([embeddings, missing_embeddings]),
+        )
+
+    async def _aget_search_candidates(self):
+        unfiltered = self._is_unfiltered()
+        vectors = self._searchable()
+        count = await vectors.acount()
+        if count == 0:
+            return 0, None, None
+        if self._use_bruteforce(count):
+            matrix = await sync_to_async(self.model.objects.get_matrix)()
+            if matrix is not None:
+                ids = np.array(
+                    [id async for id in vectors.values_list("id", flat=True)],
+                    dtype=np.int64,
+                )
+                ids, embeddings = await sync_to_async(self._rows_from_matrix)(
+                    matrix, ids
+                )
+                return count, ids, embeddings
+            rows = [row async for row in vectors.values_list("id", "embedding")]
+            ids, embeddings = _candidates_from_rows(rows)
+            return count, ids, embeddings
+        if unfiltered:
+            return count, None, None
+        ids = np.array(
+            [id async for id in vectors.values_list("id", flat=True)], dtype=np.int64
+        )
+        return count, ids, None
+
+    def _search_candidates(
+        self, query_embeddings, candidates, k: int | None, max_distance=None
+    ):
+        """Run the nearest neighbour search and return ``(labels, distances)``.
+
+        With ``max_distance`` only the vectors within it are returned, at most
+        ``k`` of them or all of them when ``k`` is None.
+        """
+        count, ids, embeddings = candidates
+        # k cannot be greater than the number of vectors. Don't raise an error
+        k = count if k is None else min(k, count)
+
+        if max_distance is not None:
+            if embeddings is not None:
+                return self._exact_range_search(
+                    query_embeddings, ids, embeddings, k, max_distance
+                )
+            ids_in = set(ids.tolist()) if ids is not None else None
+            with self.model.objects.use_index() as index:
+                return index.range_search(
+                    query_embeddings, max_distance, k, ids__in=ids_in
+                )
+
+        if embeddings is not None:
             index = BFIndex(
-                max_elements=vector_count,
-                dim=vectordb_settings.DEFAULT_EMBEDDING_DIMENSION,
+                max_elements=len(ids),
+                dim=embeddings.shape[1],
                 space=vectordb_settings.DEFAULT_EMBEDDING_SPACE,
                 should_not_cache=True,
             )
-            index.add(embeddings, ids=ids_list)
+            index.add(embeddings, ids=ids)
             labels, distances = index.search(query_embeddings, k)
         else:
-            if manager.index is None:
-                manager.index = HNSWIndex(
-                    max_elements=vector_count,
-                    dim=vectordb_settings.DEFAULT_EMBEDDING_DIMENSION,
-                    space=vectordb_settings.DEFAULT_EMBEDDING_SPACE,
-                )
-                manager.index.add(embeddings, ids=ids_list)
-
-            labels, distances = manager.index.search(
-                query_embeddings, k, ids__in=ids_list
-            )
-        labels: list[int] = labels[0].tolist()
-        distances: list[float] = distances[0].tolist()
+            ids_in = set(ids.tolist()) if ids is not None else None
+            with self.model.objects.use_index() as index:
+                labels, distances = index.search(query_embeddings, k, ids__in=ids_in)
+
+        return labels[0], distances[0]
+
+    def _exact_range_search(self, query_embeddings, ids, embeddings, k, max_distance):
+        space = vectordb_settings.DEFAULT_EMBEDDING_SPACE
+        distances = pairwise_distances(
+            prepare(query_embeddings[:1], space), prepare(embeddings, space), space
+        )[0]
+        # only sort the vectors within range
+        within = np.flatnonzero(distances <= max_distance)
+        order = within[np.argsort(distances[within], kind="stable")][:k]
+        return ids[order], distances[order].astype(np.float32)
+
+    def _get_results_queryset(self, labels, distances):
+        labels: list[int] = labels.tolist()
+        distances: list[float] = distances.tolist()
 
         # Annotate queryset with distances and sort by descending order
         queryset = self.filter(id__in=labels)
@@ -123,6 +324,128 @@ class VectorQuerySet(models.QuerySet):
 
         return queryset.order_by("distance")
 
+    def _find_related(self, query_embeddings, vectors, k, max_distance=None):
+        """Return the ``(labels, distances)`` of the k nearest ``vectors``."""
+        candidates = vectors._get_search_candidates()
+        if candidates[0] == 0:
+            return _no_results()
+        return self._search_candidates(query_embeddings, candidates, k, max_distance)
+
+    async def _afind_related(self, query_embeddings, vectors, k, max_distance=None):
+        candidates = await vectors._aget_search_candidates()
+        if candidates[0] == 0:
+            return _no_results()
+
+        if candidates[2] is None:
+            # building the index reads the database, keep it off the executor
+            await sync_to_async(self.model.objects.get_index)()
+        return await run_in_executor(
+            self._search_candidates, query_embeddings, candidates, k, max_distance
+        )
+
+    def _get_related_vectors(
+        self, query_embeddings, vectors, k: int | None = None, max_distance=None
+    ):
+        if k is None and max_distance is None:
+            k = vectordb_settings.DEFAULT_MAX_N_RESULTS
+        labels, distances = self._find_related(
+            query_embeddings, vectors, k, max_distance
+        )
+        return self._get_results_queryset(labels, distances)
+
+    async def _aget_related_vectors(
+        self, query_embeddings, vectors, k: int | None = None, max_distance=None
+    ):
+        if k is None and max_distance is None:
+            k = vectordb_settings.DEFAULT_MAX_N_RESULTS
+        labels, distances = await self._afind_related(
+            query_embeddings, vectors, k, max_distance
+        )
+        return self._get_results_queryset(labels, distances)
+
+    def _search_text(self, text: str, vectors, k: int | None = None, max_distance=None):
+        """Search ``vectors`` for ``text`` through the search cache."""
+        if k is None and max_distance is None:
+            k = vectordb_settings.DEFAULT_MAX_N_RESULTS
+        cache = get_search_cache()
+        key = None
+        if cache is not None:
+            key = cache.make_key(vectors, text, k, max_distance)
+        result = cache.get(key) if key is not None else None
+        if result is None:
+            query_embeddings = _embed_query(self.model.objects.embedding_fn, text)
+            result = self._find_related(query_embeddings, vectors, k, max_distance)
+            if key is not None:
+                cache.set(key, result)
+        return self._get_results_queryset(*result)
+
+    async def _asearch_text(
+        self, text: str, vectors, k: int | None = None, max_distance=None
+    ):
+        if k is None and max_distance is None:
+            k = vectordb_settings.DEFAULT_MAX_N_RESULTS
+        cache = get_search_cache()
+        key = None
+        if cache is not None:
+            key = await sync_to_async(cache.make_key)(vectors, text, k, max_distance)
+        result = await sync_to_async(cache.get)(key) if key is not None else None
+        if result is None:
+            query_embeddings = await aembed_query(self.model.objects.embedding_fn, text)
+            result = await self._afind_related(
+                query_embeddings, vectors, k, max_distance
+            )
+            if key is not None:
+                await sync_to_async(cache.set)(key, result)
+        return self._get_results_queryset(*result)
+
+    def _get_precomputed_neighbours(
+        self, model_object, k: int | None = None, max_distance=None
+    ):
+        """Read the neighbours of ``model_object`` from the neighbour table.
+
+        Returns None when they are disabled, have not been computed, or can't
+        answer the query because the queryset is filtered.
+        """
+        if not vectordb_settings.USE_PRECOMPUTED_NEIGHBOURS:
+            return None
+        if not self._is_unfiltered():
+            return None
+        from .neighbours import get_neighbours
+
+        if k is None:
+            if max_distance is not None:
+                # only the nearest NEIGHBOURS_K are stored
+                return None
+            k = vectordb_settings.DEFAULT_MAX_N_RESULTS
+        return get_neighbours(self, model_object, k, max_distance)
+
+    def _get_query_embedding(self, model_object):
+        """Return the stored embedding of ``model_object`` or embed it."""
+        content_type = ContentType.objects.get_for_model(model_object)
+        embedding = (
+            self.filter(content_type=content_type, object_id=model_object.pk)
+            .values_list("embedding", flat=True)
+            .first()
+        )
+        if embedding is not None:
+            return decode_embedding(embedding).reshape(1, -1)
+        return self.model.objects.embedding_fn([_get_query_text(model_object)])
+
+    async def _aget_query_embedding(self, model_object):
+        content_type = await sync_to_async(ContentType.objects.get_for_model)(
+            model_object
+        )
+        embedding = await (
+            self.filter(content_type=content_type, object_id=model_object.pk)
+            .values_list("embedding", flat=True)
+            .afirst()
+        )
+        if embedding is not None:
+            return decode_embedding(embedding).reshape(1, -1)
+        return await aembed_query(
+            self.model.objects.embedding_fn, _get_query_text(model_object)
+        )
+
     def related_text(
         self,
         text: str,
@@ -130,6 +453,8 @@ class VectorQuerySet(models.QuerySet):
         *,
         content_type: str | int | models.Model | ContentType | None = None,
         unwrap: bool = False,
+        max_distance: float | None = None,
+        min_score: float | None = None,
     ):
         """Return the k most similar entries to the given text
 
@@ -138,23 +463,23 @@ class VectorQuerySet(models.QuerySet):
             k (int, optional): The number of results to return. Defaults to None.
             content_type (str, int, models.Model, ContentType, optional): The content type to filter by. Defaults to None.
             unwrap (bool, optional): If True, return the actual model instances instead of the vector instances. Defaults to False.
+            max_distance (float, optional): Only return the vectors within this distance. Defaults to None.
+            min_score (float, optional): Only return the vectors with at least this similarity score. Defaults to DEFAULT_MIN_SCORE.
+
+        With a threshold and no k, every vector within the threshold is returned.
         """
         k, content_type, unwrap = _validate_option_search_args(
             k=k, content_type=content_type, unwrap=unwrap
         )
+        k, max_distance = _search_limits(k, max_distance, min_score)
         vectors = self
 
         if content_type is not None:
             vectors = vectors.filter(content_type=content_type)
-            ids_list = [vector.id for vector in vectors]
-        else:
-            ids_list = [vector.id for vector in vectors]
-
-        query_embeddings = self.model.objects.embedding_fn([text])
 
         # measure vectordb search time
         start = time.time()
-        results = self._get_related_vectors(query_embeddings, vectors, k, ids_list)
+        results = self._search_text(text, vectors, k, max_distance)
         results.search_time = time.time() - start
         logger.info(f"Search took {1000*(time.time() - start)}ms")
 
@@ -162,6 +487,40 @@ class VectorQuerySet(models.QuerySet):
             results = results.unwrap()
         return results
 
+    async def arelated_text(
+        self,
+        text: str,
+        k: int | None = None,
+        *,
+        content_type: str | int | models.Model | ContentType | None = None,
+        unwrap: bool = False,
+        max_distance: float | None = None,
+        min_score: float | None = None,
+    ):
+        """Async version of `related_text`.
+
+        The query is embedded with the encoder's native async API when it has
+        one, the database is read with Django's async ORM and the search runs
+        in a bounded thread pool. Requires Django 4.1 or newer.
+        """
+        k, content_type, unwrap = await sync_to_async(_validate_option_search_args)(
+            k=k, content_type=content_type, unwrap=unwrap
+        )
+        k, max_distance = _search_limits(k, max_distance, min_score)
+        vectors = self
+
+        if content_type is not None:
+            vectors = vectors.filter(content_type=content_type)
+
+        start = time.time()
+        results = await self._asearch_text(text, vectors, k, max_distance)
+        results.search_time = time.time() - start
+        logger.info(f"Search took {1000*(time.time() - start)}ms")
+
+        if unwrap:
+            results = await sync_to_async(results.unwrap)()
+        return results
+
     def related_objects(
         self,
         model_object,
@@ -169,6 +528,8 @@ class VectorQuerySet(models.QuerySet):
         *,
         content_type: str | int | models.Model | ContentType | None = None,
         unwrap: bool = False,
+        max_distance: float | None = None,
+        min_score: float | None = None,
     ):
         """Return the k most similar entries to the given model instance.
 
@@ -177,38 +538,75 @@ class VectorQuerySet(models.QuerySet):
             k (int, optional): The number of results to return. Defaults to None.
             content_type (str, int, models.Model, ContentType, optional): The content type to filter by. Defaults to None.
             unwrap (bool, optional): If True, return the actual model instances instead of the vector instances. Defaults to False.
+            max_distance (float, optional): Only return the vectors within this distance. Defaults to None.
+            min_score (float, optional): Only return the vectors with at least this similarity score. Defaults to DEFAULT_MIN_SCORE.
+
+        With a threshold and no k, every vector within the threshold is returned.
         """
 
         k, content_type, unwrap = _validate_option_search_args(
             k=k, content_type=content_type, unwrap=unwrap
         )
+        k, max_distance = _search_limits(k, max_distance, min_score)
 
-        # An object can only be related to types of itself
-        content_type = ContentType.objects.get_for_model(model_object)
-
-        if self.filter(content_type=content_type, object_id=model_object.id).exists():
-            query_object = self.get(
-                content_type=content_type, object_id=model_object.id
+        # measure vectordb search time
+        start = time.time()
+        results = self._get_precomputed_neighbours(model_object, k, max_distance)
+        if results is None:
+            # An object can only be related to types of itself
+            content_type = ContentType.objects.get_for_model(model_object)
+            query_embeddings = self._get_query_embedding(model_object)
+
+            vectors = self.filter(content_type=content_type).exclude(
+                object_id=model_object.pk, content_type=content_type
             )
-            query_embeddings = np.frombuffer(
-                query_object.embedding, dtype=np.float32
-            ).reshape(1, -1)
-        else:
-            query_embeddings = self.model.objects.embedding_fn(model_object.get_text())
+            results = self._get_related_vectors(
+                query_embeddings, vectors, k, max_distance
+            )
+        results.search_time = time.time() - start
+        logger.info(f"Search took {1000*(time.time() - start)}ms")
+
+        if unwrap:
+            results = results.unwrap()
+        return results
 
-        vectors = self.filter(content_type=content_type).exclude(
-            object_id=model_object.id, content_type=content_type
+    async def arelated_objects(
+        self,
+        model_object,
+        k: int | None = None,
+        *,
+        content_type: str | int | models.Model | ContentType | None = None,
+        unwrap: bool = False,
+        max_distance: float | None = None,
+        min_score: float | None = None,
+    ):
+        """Async version of `related_objects`."""
+        k, content_type, unwrap = await sync_to_async(_validate_option_search_args)(
+            k=k, content_type=content_type, unwrap=unwrap
         )
-        ids_list = [vector.id for vector in vectors]
+        k, max_distance = _search_limits(k, max_distance, min_score)
 
-        # measure vectordb search time
         start = time.time()
-        results = self._get_related_vectors(query_embeddings, vectors, k, ids_list)
+        results = await sync_to_async(self._get_precomputed_neighbours)(
+            model_object, k, max_distance
+        )
+        if results is None:
+            content_type = await sync_to_async(ContentType.objects.get_for_model)(
+                model_object
+            )
+            query_embeddings = await self._aget_query_embedding(model_object)
+
+            vectors = self.filter(content_type=content_type).exclude(
+                object_id=model_object.pk, content_type=content_type
+            )
+            results = await self._aget_related_vectors(
+                query_embeddings, vectors, k, max_distance
+            )
         results.search_time = time.time() - start
         logger.info(f"Search took {1000*(time.time() - start)}ms")
 
         if unwrap:
-            results = results.unwrap()
+            results = await sync_to_async(results.unwrap)()
         return results
 
     def search(
@@ -218,6 +616,8 @@ class VectorQuerySet(models.QuerySet):
         *,
         content_type: str | int | models.Model | ContentType | None = None,
         unwrap: bool = False,
+        max_distance: float | None = None,
+        min_score: float | None = None,
     ):
         """
         Search for similar vectors in the queryset
@@ -227,6 +627,8 @@ class VectorQuerySet(models.QuerySet):
             content_type: A ContentType instance or a model class
             unwrap: If True, return the actual model instances instead of the vector instances.
                 This breaks the queryset chaining.
+            max_distance: Only return the vectors within this distance
+            min_score: Only return the vectors with at least this similarity score
         Returns:
             A list of model instances or vector instances
         """
@@ -234,30 +636,347 @@ class VectorQuerySet(models.QuerySet):
         # search
         if isinstance(query, models.Model):
             results = self.related_objects(
-                query, k=k, content_type=content_type, unwrap=unwrap
+                query,
+                k=k,
+                content_type=content_type,
+                unwrap=unwrap,
+                max_distance=max_distance,
+                min_score=min_score,
             )
         elif isinstance(query, str):
             results = self.related_text(
-                query, k=k, content_type=content_type, unwrap=unwrap
+                query,
+                k=k,
+                content_type=content_type,
+                unwrap=unwrap,
+                max_distance=max_distance,
+                min_score=min_score,
             )
         else:
             raise ValueError("Query must be a model instance or string")
 
         return results
 
+    async def asearch(
+        self,
+        query,
+        k: int | None = None,
+        *,
+        content_type: str | int | models.Model | ContentType | None = None,
+        unwrap: bool = False,
+        max_distance: float | None = None,
+        min_score: float | None = None,
+    ):
+        """Async version of `search`.
+
+        The returned queryset is lazy, evaluate it with ``async for`` or one of
+        the async queryset methods.
+        """
+        if isinstance(query, models.Model):
+            return await self.arelated_objects(
+                query,
+                k=k,
+                content_type=content_type,
+                unwrap=unwrap,
+                max_distance=max_distance,
+                min_score=min_score,
+            )
+        elif isinstance(query, str):
+            return await self.arelated_text(
+                query,
+                k=k,
+                content_type=content_type,
+                unwrap=unwrap,
+                max_distance=max_distance,
+                min_score=min_score,
+            )
+        raise ValueError("Query must be a model instance or string")
+
+    def search_page(
+        self,
+        query=None,
+        page_size: int | None = None,
+        cursor: str | None = None,
+        *,
+        content_type: str | int | models.Model | ContentType | None = None,
+        max_distance: float | None = None,
+        min_score: float | None = None,
+    ) -> SearchPage:
+        """Return a page of search results and the cursor of the next page.
+
+        Args:
+            query: A string or a model instance, for the first page
+            page_size: Number of results per page. Defaults to DEFAULT_MAX_N_RESULTS.
+            cursor: The ``next_cursor`` of the previous page. The query and
+                thresholds are read from it, the queryset filters must be the same.
+            content_type: A ContentType instance or a model class
+            max_distance: Only return the vectors within this distance
+            min_score: Only return the vectors with at least this similarity score
+        Returns:
+            SearchPage: The results and the ``next_cursor``, None on the last page.
+        """
+        if page_size is None:
+            page_size = vectordb_settings.DEFAULT_MAX_N_RESULTS
+        if cursor is not None:
+            cursor = SearchCursor.decode(cursor)
+        elif isinstance(query, (models.Model, str)):
+            cursor = self._first_cursor(query, content_type, max_distance, min_score)
+        else:
+            raise ValueError("Query must be a model instance or string")
+
+        start = time.time()
+        candidates = self._cursor_vectors(cursor)._get_search_candidates()
+        labels, distances, has_next = self._next_page(cursor, candidates, page_size)
+        results = self._get_results_queryset(labels, distances)
+        results.search_time = time.time() - start
+        next_cursor = None
+        if has_next:
+            next_cursor = cursor.advance(labels, distances).encode()
+        return SearchPage(results, next_cursor)
+
+    def iter_search(
+        self,
+        query,
+        batch_size: int = 100,
+        *,
+        content_type: str | int | models.Model | ContentType | None = None,
+        max_distance: float | None = None,
+        min_score: float | None = None,
+        ids_only: bool = False,
+    ):
+        """Yield every vector ordered by distance to the query, in batches.
+
+        Stop iterating when you have seen enough, each batch widens the search
+        and reads its own rows, so only one batch is held in memory.
+
+        Args:
+            query: A string or a model instance
+            batch_size: Number of results per batch
+            content_type: A ContentType instance or a model class
+            max_distance: Only yield the vectors within this distance
+            min_score: Only yield the vectors with at least this similarity score
+            ids_only: Yield vector ids instead of reading the vectors
+        Yields:
+            list: ``(vector, distance)`` pairs, or ``(id, distance)`` with ``ids_only``.
+        """
+        if not isinstance(query, (models.Model, str)):
+            raise ValueError("Query must be a model instance or string")
+        cursor = self._first_cursor(query, content_type, max_distance, min_score)
+        vectors = self._cursor_vectors(cursor)
+        candidates = vectors._get_search_candidates()
+
+        while True:
+            labels, distances, has_next = self._next_page(
+                cursor, candidates, batch_size
+            )
+            if len(labels):
+                batch = zip(labels.tolist(), distances.tolist())
+                if ids_only:
+                    yield list(batch)
+                else:
+                    rows = vectors.in_bulk(labels.tolist())
+                    # skip the vectors deleted since the search started
+                    yield [(rows[id], distance) for id, distance in batch if id in rows]
+            if not has_next:
+                return
+            cursor = cursor.advance(labels, distances)
+
+    def _cursor_vectors(self, cursor: SearchCursor):
+        """Return the vectors searched by ``cursor``."""
+        vectors = self
+        if cursor.content_type_id is not None:
+            vectors = vectors.filter(content_type_id=cursor.content_type_id)
+        if cursor.exclude_object_id is not None:
+            vectors = vectors.exclude(
+                content_type_id=cursor.content_type_id,
+                object_id=cursor.exclude_object_id,
+            )
+        return vectors
+
+    def _next_page(self, cursor: SearchCursor, candidates, page_size: int):
+        """Return ``(labels, distances, has_next)`` of the page after ``cursor``."""
+        if candidates[0] == 0:
+            labels, distances = _no_results()
+            return labels, distances, False
+        # the previous pages and the ties at the last distance come first, one
+        # more result tells whether there is a next page
+        k = cursor.returned + len(cursor.last_ids) + page_size + 1
+        labels, distances = self._search_candidates(
+            cursor.embedding.reshape(1, -1), candidates, k, cursor.max_distance
+        )
+        unseen = np.flatnonzero(cursor.unseen(labels, distances))
+        page = unseen[:page_size]
+        return labels[page], distances[page], len(unseen) > page_size
+
+    def _first_cursor(self, query, content_type, max_distance, min_score):
+        _, content_type, _ = _validate_option_search_args(None, content_type, False)
+        _, max_distance = _search_limits(None, max_distance, min_score)
+        if isinstance(query, models.Model):
+            # an object can only be related to types of itself
+            content_type = ContentType.objects.get_for_model(query)
+            return SearchCursor(
+                embedding=self._get_query_embedding(query)[0],
+                content_type_id=content_type.id,
+                exclude_object_id=str(query.pk),
+                max_distance=max_distance,
+            )
+        return SearchCursor(
+            embedding=_embed_query(self.model.objects.embedding_fn, query)[0],
+            content_type_id=content_type.id if content_type is not None else None,
+            max_distance=max_distance,
+        )
+
     def related(self, *args, **kwargs):
         return self.search(*args, **kwargs)
 
-    def unwrap(self):
+    async def arelated(self, *args, **kwargs):
+        return await self.asearch(*args, **kwargs)
+
+    # Index maintenance for bulk operations, which either bypass the model
+    # signals or send one per row.
+
+    def _indexable(self, vectors):
+        return [
+            vector
+            for vector in vectors
+            if vector.pk is not None
+            and vector.embedding is not None
+            and vector.status != self.model.Status.PENDING
+        ]
+
+    def _reindex(self, ids):
+        """Reload the embeddings of ``ids`` and write them to the index."""
+        manager = self.model.objects
+        if not manager.has_index_writes():
+            return
+        for chunk in _chunks(ids):
+            rows = list(
+                self.model._base_manager.using(self.db)
+                .filter(id__in=chunk)
+                .exclude(status=self.model.Status.PENDING)
+                .values_list("id", "embedding")
+            )
+            if rows:
+                chunk_ids, embeddings = _candidates_from_rows(rows)
+                manager.index_update(embeddings, chunk_ids)
+
+    def delete(self):
+        ids = np.fromiter(self.values_list("id", flat=True), dtype=np.int64)
+        # the per-row signals still run, don't load the embeddings for them
+        with _mute_index_signals():
+            result = super(VectorQuerySet, self.defer("embedding")).delete()
+        invalidate_search_cache()
+        self.model.objects.index_delete(ids)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def update(self, **kwargs):
+        invalidate_search_cache()
+        if "embedding" not in kwargs:
+            return super().update(**kwargs)
+        ids = list(self.values_list("id", flat=True))
+        rows = super().update(**kwargs)
+        self._reindex(ids)
+        return rows
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        invalidate_search_cache()
+        if not self.model.objects.has_index_writes():
+            return objs
+        if any(vector.pk is None for vector in objs):
+            # the database backend does not return the ids of bulk inserts
+            _fetch_ids(self, objs)
+        vectors = self._indexable(objs)
+        if vectors:
+            self.model.objects.index_add(
+                [vector.vector for vector in vectors],
+                [vector.pk for vector in vectors],
+            )
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        invalidate_search_cache()
+        if "embedding" in fields:
+            vectors = self._indexable(objs)
+            if vectors:
+                self.model.objects.index_update(
+                    [vector.vector for vector in vectors],
+                    [vector.pk for vector in vectors],
+                )
+        return rows
+
+    bulk_update.alters_data = True
+
+    def unwrap(self, querysets: dict | None = None):
         """Return the actual model instances instead of the vector instances.
 
-        This breaks the queryset chaining.
+        The objects are read with one query per content type and keep the
+        order of the results. They are annotated with the ``distance`` of
+        their vector, if any. This breaks the queryset chaining.
+
+        Args:
+            querysets (dict, optional): The queryset to read the objects of a
+                model from, by model class, e.g. to add ``select_related`` or
+                ``only``. Defaults to the model's base manager.
 
         Returns:
             A list of model instances
         """
-        return [
-            result.content_object
-            for result in self
-            if result.content_object is not None
-        ]
+        querysets = querysets or {}
+        results = list(self)
+
+        by_content_type = {}
+        for result in results:
+            if result.content_type_id is not None and result.object_id is not None:
+                object_ids = by_content_type.setdefault(result.content_type_id, set())
+                object_ids.add(result.object_id)
+
+        objects = {}
+        for content_type_id, object_ids in by_content_type.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            if model is None:
+                # the model has been removed
+                continue
+            pks = []
+            for object_id in object_ids:
+                try:
+                    pks.append(model._meta.pk.to_python(object_id))
+                except ValidationError:
+                    continue
+            queryset = querysets.get(model, model._base_manager.all())
+            for pk, obj in queryset.in_bulk(pks).items():
+                objects[content_type_id, str(pk)] = obj
+
+        unwrapped = []
+        for result in results:
+            obj = objects.get((result.content_type_id, str(result.object_id)))
+            if obj is None:
+                continue
+            if hasattr(result, "distance"):
+                obj.distance = result.distance
+            unwrapped.append(obj)
+        return unwrapped
+
+
+def _fetch_ids(queryset, vectors):
+    """Look up the ids of bulk created vectors by their object."""
+    by_content_type = {}
+    for vector in vectors:
+        if vector.pk is None and vector.object_id is not None:
+            by_object_id = by_content_type.setdefault(vector.content_type_id, {})
+            by_object_id[str(vector.object_id)] = vector
+    for content_type_id, by_object_id in by_content_type.items():
+        for chunk in _chunks(list(by_object_id)):
+            for id, object_id in (
+                queryset.model._base_manager.using(queryset.db)
+                .filter(content_type_id=content_type_id, object_id__in=chunk)
+                .values_list("id", "object_id")
+            ):
+                by_object_id[object_id].pk = id
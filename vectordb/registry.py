@@ -0,0 +1,414 @@
+"""Many named indexes in bounded memory.
+
+An `IndexRegistry` holds indexes by name, e.g. one per tenant or per
+collection. Indexes are loaded from ``directory/<name>`` on first use, and
+once the estimated size of the loaded indexes exceeds ``memory_budget`` the
+least recently used ones are unloaded, after being persisted if they were
+written to since they were loaded:
+
+    registry = get_index_registry()
+    index = registry.get("tenant-42", create=lambda: HNSWIndex(...), write=True)
+    index.add(embeddings, ids)
+
+The indexes are created and loaded bypassing the `SingletonMeta` cache, so
+two names never share an index even if it has the same parameters. The size
+of an index is estimated from its parameters, see `estimate_index_bytes`.
+
+An index held with `IndexRegistry.hold` is not evicted while it is in use,
+and `evict`, `flush` and `drop` wait for the threads using it to release it
+before persisting or closing it:
+
+    with registry.hold("tenant-42") as index:
+        index.search(query, k=10)
+
+The index of `VectorManager` is held in the registry of the process too, so
+it counts towards the budget. It is not persisted when it is evicted, the
+manager builds it again from the database on its next use.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+from .ann.indexes import BFIndex, HNSWIndex
+from .ann.sharded import ShardedIndex
+from .ann.singleton import SingletonMeta
+from .settings import vectordb_settings
+
+# bytes taken by every element of an hnswlib index besides its vector and
+# links: its label, level, lock and entry in the label lookup table
+_ELEMENT_OVERHEAD = 8 + 4 + 40 + 32
+
+
+def estimate_index_bytes(index) -> int:
+    """Estimate the memory held by ``index``: vectors, graph links and overhead.
+
+    hnswlib allocates the vectors and the bottom layer links of
+    ``max_elements`` elements up front, the upper layers as elements are
+    added. An element has on average ``1 / (M - 1)`` upper layers.
+    """
+    # wrappers such as ConcurrentIndex hold the index in .index
+    inner = getattr(index, "index", None)
+    if isinstance(inner, (HNSWIndex, BFIndex)):
+        index = inner
+    if isinstance(index, HNSWIndex):
+        vector = index.dim * 4
+        level0_links = 2 * index.M * 4 + 4
+        upper_links = (index.M * 4 + 4) / max(index.M - 1, 1)
+        return int(
+            index.max_elements * (vector + level0_links + _ELEMENT_OVERHEAD)
+            + index.size * upper_links
+        )
+    if isinstance(index, BFIndex):
+        return index.max_elements * (index.dim * 4 + 8)
+    metadata = getattr(index, "metadata", None)
+    if metadata and "M" in metadata:
+        # held by other processes, e.g. a ShardedIndex
+        return int(
+            metadata["max_elements"]
+            * (metadata["dim"] * 4 + 2 * metadata["M"] * 4 + 4 + _ELEMENT_OVERHEAD)
+        )
+    return 0
+
+
+def load_index(path: str):
+    """Load an index persisted at ``path``, sharded or not."""
+    with open(path + ".meta") as f:
+        sharded = "n_shards" in json.load(f)
+    return (ShardedIndex if sharded else HNSWIndex).load(path)
+
+
+@dataclass
+class IndexStats:
+    name: str
+    bytes: int = 0
+    loaded: bool = False
+    dirty: bool = False
+    hits: int = 0
+    loads: int = 0
+    evictions: int = 0
+
+
+class IndexRegistry:
+    """Named indexes loaded on demand and evicted under a memory budget.
+
+    Args:
+        directory (str): Where the indexes are persisted, one per name.
+        memory_budget (int, optional): Estimated bytes the loaded indexes may
+            take. None for no limit. The index in use is never evicted, even
+            if it alone exceeds the budget.
+        loader (callable, optional): Loads an index from its path, defaults
+            to `load_index`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        memory_budget: int | None = None,
+        loader: Callable | None = None,
+    ):
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.loader = loader or load_index
+        self._indexes = OrderedDict()
+        self._stats = {}
+        self._lock = threading.RLock()
+        # the number of holders of every held index by id, the replaced
+        # indexes to close once released, the names being evicted and the
+        # names not persisted when they are evicted
+        self._holders = {}
+        self._replaced = {}
+        self._evicting = set()
+        self._transient = set()
+        self._released = threading.Condition(self._lock)
+        self._local = threading.local()
+
+    def _path(self, name: str) -> str:
+        if not name or os.sep in name or name.startswith("."):
+            raise ValueError(f"Invalid index name: {name!r}")
+        return os.path.join(self.directory, name, "index")
+
+    def _stats_of(self, name: str) -> IndexStats:
+        return self._stats.setdefault(name, IndexStats(name))
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return name in self._indexes or os.path.exists(self._path(name) + ".meta")
+
+    @property
+    def memory_used(self) -> int:
+        with self._lock:
+            return sum(self._stats[name].bytes for name in self._indexes)
+
+    def peek(self, name: str):
+        """Return the index ``name`` if it is loaded, None otherwise.
+
+        Unlike `get`, the index is neither loaded nor marked as used.
+        """
+        with self._lock:
+            return self._indexes.get(name)
+
+    def get(
+        self,
+        name: str,
+        create: Callable | None = None,
+        write: bool = False,
+        persist: bool = True,
+    ):
+        """Return the index ``name``, loading or creating it if needed.
+
+        Args:
+            name (str): Name of the index.
+            create (callable, optional): Returns a new index when ``name`` is
+                neither loaded nor persisted. Raises KeyError without it.
+            write (bool, optional): The caller writes to the index, so it is
+                persisted before it is evicted.
+            persist (bool, optional): False for indexes that are created
+                again rather than persisted and loaded once evicted.
+        """
+        with self._lock:
+            # wait for the index to be persisted before it is loaded again
+            while name in self._evicting and not self._is_held_here(name):
+                self._released.wait()
+            index = self._indexes.get(name)
+            if index is not None:
+                self._indexes.move_to_end(name)
+                stats = self._stats_of(name)
+                stats.hits += 1
+            else:
+                path = self._path(name)
+                if os.path.exists(path + ".meta"):
+                    # every name gets its own index, never a cached one
+                    with SingletonMeta.uncached():
+                        index = self.loader(path)
+                    stats = self._stats_of(name)
+                    stats.loads += 1
+                elif create is not None:
+                    with SingletonMeta.uncached():
+                        index = create()
+                    stats = self._stats_of(name)
+                    stats.dirty = True
+                else:
+                    raise KeyError(name)
+                self._indexes[name] = index
+                stats.loaded = True
+                self._set_transient(name, not persist)
+            if write:
+                stats.dirty = True
+            # the index may have grown since it was last used
+            stats.bytes = estimate_index_bytes(index)
+            self._evict_over_budget()
+            return index
+
+    @contextmanager
+    def hold(
+        self,
+        name: str,
+        create: Callable | None = None,
+        write: bool = False,
+        persist: bool = True,
+    ):
+        """Use the index ``name``, like `get`, without it being evicted.
+
+        The index is neither evicted nor persisted or closed until the block
+        exits, other threads may search it meanwhile.
+        """
+        with self._lock:
+            index = self.get(name, create=create, write=write, persist=persist)
+            key = id(index)
+            self._holders[key] = self._holders.get(key, 0) + 1
+        held = self._held_here()
+        held[key] = held.get(key, 0) + 1
+        try:
+            yield index
+        finally:
+            held[key] -= 1
+            if not held[key]:
+                del held[key]
+            with self._lock:
+                self._holders[key] -= 1
+                if not self._holders[key]:
+                    del self._holders[key]
+                    replaced = self._replaced.pop(key, None)
+                    if replaced is not None:
+                        self._close(replaced)
+                    self._released.notify_all()
+                    self._evict_over_budget()
+
+    def put(self, name: str, index, persist: bool = True):
+        """Register ``index`` as ``name``, replacing the loaded one if any.
+
+        The replaced index is closed once it is released.
+        """
+        with self._lock:
+            self._path(name)
+            previous = self._indexes.pop(name, None)
+            stats = self._stats_of(name)
+            self._indexes[name] = index
+            self._set_transient(name, not persist)
+            stats.loaded = True
+            stats.dirty = persist
+            stats.bytes = estimate_index_bytes(index)
+            if previous is not None and previous is not index:
+                if id(previous) in self._holders:
+                    # closed once the threads using it release it
+                    self._replaced[id(previous)] = previous
+                else:
+                    self._close(previous)
+            self._evict_over_budget()
+
+    def pop(self, name: str):
+        """Unregister ``name`` without persisting or closing it.
+
+        Returns:
+            The index, None if it was not loaded.
+        """
+        with self._lock:
+            index = self._indexes.pop(name, None)
+            if index is not None:
+                stats = self._stats_of(name)
+                stats.loaded = stats.dirty = False
+                stats.bytes = 0
+            return index
+
+    def mark_dirty(self, name: str):
+        with self._lock:
+            if name in self._indexes:
+                self._stats_of(name).dirty = True
+
+    def _evict_over_budget(self):
+        if self.memory_budget is None:
+            return
+        # the most recently used index and the held ones are kept
+        while self.memory_used > self.memory_budget:
+            names = [
+                name
+                for name in list(self._indexes)[:-1]
+                if id(self._indexes[name]) not in self._holders
+                and name not in self._evicting
+            ]
+            if not names:
+                return
+            self.evict(names[0])
+
+    def _held_here(self) -> dict:
+        # the indexes held by the current thread, it never waits for itself
+        return self._local.__dict__.setdefault("held", {})
+
+    def _is_held_here(self, name: str) -> bool:
+        return id(self._indexes.get(name)) in self._held_here()
+
+    def _wait_released(self, name: str):
+        while True:
+            key = id(self._indexes.get(name))
+            if self._holders.get(key, 0) <= self._held_here().get(key, 0):
+                return
+            self._released.wait()
+
+    def evict(self, name: str):
+        """Unload ``name``, persisting it first if it was written to.
+
+        Waits for the threads holding the index to release it.
+        """
+        with self._lock:
+            if name not in self._indexes or name in self._evicting:
+                return
+            self._evicting.add(name)
+            try:
+                self._wait_released(name)
+                index = self._indexes.pop(name)
+                stats = self._stats_of(name)
+                if stats.dirty and name not in self._transient:
+                    self._persist(name, index)
+                stats.loaded = stats.dirty = False
+                stats.bytes = 0
+                stats.evictions += 1
+                self._close(index)
+            finally:
+                self._evicting.discard(name)
+                self._released.notify_all()
+
+    def flush(self):
+        """Persist every loaded index that was written to.
+
+        Waits for the threads holding an index to release it first.
+        """
+        with self._lock:
+            for name in list(self._indexes):
+                stats = self._stats_of(name)
+                if stats.dirty and name not in self._transient:
+                    self._wait_released(name)
+                    index = self._indexes.get(name)
+                    if index is not None:
+                        self._persist(name, index)
+                    stats.dirty = False
+
+    def drop(self, name: str):
+        """Unload ``name`` and delete it from disk.
+
+        Waits for the threads holding the index to release it.
+        """
+        with self._lock:
+            self._wait_released(name)
+            index = self._indexes.pop(name, None)
+            if index is not None:
+                self._close(index)
+            self._stats.pop(name, None)
+            self._transient.discard(name)
+            shutil.rmtree(os.path.dirname(self._path(name)), ignore_errors=True)
+
+    def stats(self) -> list[dict]:
+        """Return the size, state and counters of every index used so far."""
+        with self._lock:
+            return [asdict(stats) for stats in self._stats.values()]
+
+    def _persist(self, name: str, index):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        index.persist(path)
+
+    def _set_transient(self, name: str, transient: bool):
+        if transient:
+            self._transient.add(name)
+        else:
+            self._transient.discard(name)
+
+    def _close(self, index):
+        if isinstance(type(index), SingletonMeta):
+            type(index).forget(index)
+        close = getattr(index, "close", None)
+        if close is not None:
+            close()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_index_registry() -> IndexRegistry:
+    """Return the registry of the process, configured by the settings.
+
+    Indexes are persisted under DEFAULT_PERSISTENT_DIRECTORY/indexes and
+    evicted beyond INDEX_MEMORY_BUDGET bytes.
+    """
+    global _registry
+    directory = os.path.join(vectordb_settings.DEFAULT_PERSISTENT_DIRECTORY, "indexes")
+    budget = vectordb_settings.INDEX_MEMORY_BUDGET
+    with _registry_lock:
+        if _registry is None or _registry.directory != directory:
+            previous, _registry = _registry, IndexRegistry(directory, budget)
+            if previous is not None:
+                # the indexes that are not persisted do not depend on it
+                for name in list(previous._transient):
+                    index = previous.pop(name)
+                    if index is not None:
+                        _registry.put(name, index, persist=False)
+        _registry.memory_budget = budget
+        return _registry
@@ -11,4 +11,6 @@ from .models import Vector
 class VectorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vector
-        fields = ["embedding", "text", "metadata", "object_id", "content_type"]
+        # the embedding is left out: it is deferred, so reading it would cost a
+        # query per row, and raw float32 bytes don't render as JSON
+        fields = ["text", "metadata", "object_id", "content_type"]
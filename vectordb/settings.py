@@ -20,14 +20,101 @@ DEFAULTS = {
     # if you want use the openai embedding functions you need to set OPENAI_API_KEY in your django settings
     # here we will try to get the value from the environment variable OPENAI_API_KEY
     "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", None),
+    # point the openai client at a proxy or a compatible server
+    "OPENAI_BASE_URL": None,
     # if you want use the cohere embedding functions you need to set COHERE_API_KEY in your django settings
     # here we will try to get the value from the environment variable COHERE_API_KEY
     "COHERE_API_KEY": os.environ.get("COHERE_API_KEY", None),
+    # remote embedding clients (openai, cohere) split inputs into API sized
+    # batches and send up to this many requests at once
+    "EMBEDDING_MAX_CONCURRENT_REQUESTS": 4,
+    # retries with exponential backoff when a provider throttles a request
+    "EMBEDDING_MAX_RETRIES": 6,
+    # autosync_model_to_vectordb: collect the instances saved in a transaction
+    # and sync them as one batch (one query, one embedding call, bulk writes)
+    # when it commits. Optionally hand that batch to a background thread.
+    "AUTOSYNC_ON_COMMIT": False,
+    "AUTOSYNC_BACKGROUND": False,
+    # store new vectors as pending and embed them in batches on a background
+    # thread instead of in the request, see vectordb.ingestion
+    "BACKGROUND_INGESTION": False,
+    "INGESTION_BATCH_SIZE": 64,
+    # bounded queue of ids waiting for the worker, writers wait at most
+    # INGESTION_ENQUEUE_TIMEOUT seconds for room before leaving the vector to
+    # the database scan that runs every INGESTION_POLL_INTERVAL idle seconds
+    "INGESTION_QUEUE_SIZE": 10_000,
+    "INGESTION_ENQUEUE_TIMEOUT": 1.0,
+    "INGESTION_POLL_INTERVAL": 5.0,
+    # writes to the ANN index are buffered and applied in bulk once the
+    # buffer holds INDEX_WRITE_BUFFER_SIZE ids or INDEX_WRITE_BUFFER_DELAY
+    # seconds after the first write, by the next write or search unless the
+    # index can be written while it is searched (CONCURRENT_INDEX,
+    # INDEX_SHARDS or INDEX_SERVER). INDEX_FLUSH_ON_SEARCH applies them
+    # before every search so that searches see the latest writes.
+    "INDEX_WRITE_BUFFER_SIZE": 1000,
+    "INDEX_WRITE_BUFFER_DELAY": 1.0,
+    "INDEX_FLUSH_ON_SEARCH": True,
+    # cache the results of text searches, see vectordb.cache. The size is the
+    # number of results kept in memory, 0 disables the cache. Set the backend
+    # to a Django cache alias to share the results between processes.
+    "SEARCH_CACHE_SIZE": 0,
+    "SEARCH_CACHE_TTL": 300,
+    "SEARCH_CACHE_BACKEND": None,
+    # related_objects reads the neighbours precomputed by
+    # `manage.py vectordb_neighbours`, see vectordb.neighbours
+    "USE_PRECOMPUTED_NEIGHBOURS": False,
+    "NEIGHBOURS_K": 10,
+    # format of the stored embeddings: "float32", or "float16" and "int8" to
+    # halve or quarter their size, see vectordb.encoding
+    "EMBEDDING_STORAGE_DTYPE": "float32",
+    # keep a memory-mapped copy of the embeddings under
+    # DEFAULT_PERSISTENT_DIRECTORY for exact searches and index rebuilds, see
+    # vectordb.matrix
+    "EMBEDDING_MATRIX": False,
+    # load the index from the snapshots published by
+    # `manage.py vectordb_snapshot` instead of building it in every process,
+    # and check for a new one every INDEX_SNAPSHOT_POLL_INTERVAL seconds, see
+    # vectordb.snapshots
+    "INDEX_SNAPSHOTS": False,
+    "INDEX_SNAPSHOT_POLL_INTERVAL": 5.0,
+    # let threads search the index while others write to it: writes are
+    # applied by a single writer thread, through a queue of at most
+    # INDEX_WRITE_QUEUE_SIZE writes, see vectordb.ann.concurrent
+    "CONCURRENT_INDEX": False,
+    "INDEX_WRITE_QUEUE_SIZE": 1000,
+    # split the index across this many worker processes, 0 keeps it in the
+    # current process. With affinity every shard is pinned to its own CPUs,
+    # see vectordb.ann.sharded
+    "INDEX_SHARDS": 0,
+    "INDEX_SHARD_AFFINITY": False,
+    # estimated bytes that the indexes of the registry may take before the
+    # least recently used ones are unloaded, None for no limit, see
+    # vectordb.registry
+    "INDEX_MEMORY_BUDGET": None,
+    # send the index writes and searches to the index server started with
+    # `manage.py vectordb_serve`, see vectordb.index_server. The address is a
+    # unix socket path or "host:port", None means
+    # DEFAULT_PERSISTENT_DIRECTORY/index.sock
+    "INDEX_SERVER": False,
+    "INDEX_SERVER_ADDRESS": None,
+    "INDEX_SERVER_TIMEOUT": 30.0,
+    # size of the thread pool that runs embedding and index searches for the
+    # async API (asearch, arelated_text, ...), None lets python decide
+    "ASYNC_MAX_WORKERS": None,
+    # shared embedding server, see vectordb.embedding_server
+    # the address is a unix socket path or "host:port", None means
+    # DEFAULT_PERSISTENT_DIRECTORY/embedding.sock
+    "EMBEDDING_SERVER_ADDRESS": None,
+    "EMBEDDING_SERVER_ENCODER_CLASS": "vectordb.embedding_functions.SentenceTransformerEncoder",
+    "EMBEDDING_SERVER_MAX_BATCH_SIZE": 64,
+    "EMBEDDING_SERVER_BATCH_TIMEOUT": 0.005,
+    "EMBEDDING_SERVER_TIMEOUT": 30.0,
 }
 
 
 IMPORT_STRINGS = [
     "DEFAULT_EMBEDDING_CLASS",
+    "EMBEDDING_SERVER_ENCODER_CLASS",
 ]
 
 
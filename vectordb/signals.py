@@ -6,7 +6,9 @@ import numpy as np
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .cache import invalidate_search_cache
 from .models import Vector
+from .queryset import index_signals_muted
 
 # Get an instance of a logger
 logger = logging.getLogger("VectorDB")
@@ -18,17 +20,28 @@ def update_vector_index(sender, instance, created, **kwargs):
     """
     Signal to update the HNSWIndex when a Vector instance is updated.
     """
-    # Ensure VectorManager has an instance of HNSWIndex
-    if sender.objects.index is not None:
-        embedding = instance.vector
-        id = instance.id
-
-        # If instance is created, add it to the index
-        if created:
-            sender.objects.index.add(embedding, np.array([id]))
-        # If instance is updated, update the index with the new embedding
-        else:
-            sender.objects.index.update(embedding, np.array([id]))
+    if index_signals_muted():
+        # bulk writes update the index and the cache once for all their ids
+        return
+    if (
+        instance.status == Vector.Status.PENDING
+        or "embedding" in instance.get_deferred_fields()
+    ):
+        # pending vectors are added by the ingestion once embedded, and a
+        # deferred embedding has not changed. The text, metadata or status
+        # of the cached results may have, so the cache is still invalidated.
+        invalidate_search_cache()
+        return
+
+    embedding = instance.vector
+    ids = np.array([instance.id])
+
+    # If instance is created, add it to the index
+    if created:
+        sender.objects.index_add(embedding, ids)
+    # If instance is updated, update the index with the new embedding
+    else:
+        sender.objects.index_update(embedding, ids)
 
 
 @receiver(post_delete, sender=Vector, dispatch_uid="delete_vector_index_unique_id")
@@ -36,10 +49,7 @@ def delete_vector_index(sender, instance, **kwargs):
     """
     Signal to delete the index when a Vector instance is deleted.
     """
-    # Ensure VectorManager has an instance of HNSWIndex
-    if sender.objects.index is not None:
-        # Get the id from the deleted instance
-        id = instance.id
-
-        # Delete the index with the given id
-        sender.objects.index.delete(np.array([id]))
+    if index_signals_muted():
+        # bulk deletes remove all their ids from the index at once
+        return
+    sender.objects.index_delete(np.array([instance.id]))
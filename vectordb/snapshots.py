@@ -0,0 +1,153 @@
+"""Read-only index snapshots shared by pre-forked workers.
+
+Each process building its own index from the database means holding one
+copy of the graph per worker. With ``INDEX_SNAPSHOTS`` enabled, a single
+writer (``manage.py vectordb_snapshot``) builds the index and publishes it
+under ``DEFAULT_PERSISTENT_DIRECTORY/snapshots``, and the workers only ever
+load the published snapshot and never write to it:
+
+- Load the index in the master process before it forks (``--preload`` and a
+  call to ``Vector.objects.get_index()`` in the WSGI module, or gunicorn's
+  ``pre_fork`` hook) and the workers share its pages copy-on-write. The
+  graph lives in memory allocated by hnswlib, which the python reference
+  counts never touch, so the pages stay shared.
+- The workers check the version file every ``INDEX_SNAPSHOT_POLL_INTERVAL``
+  seconds and swap in a newly published snapshot. The swap replaces the
+  manager's reference to the index, searches already running finish on the
+  previous one.
+
+A worker that swaps loads a private copy of the new snapshot, until it is
+recycled and forked again from a master that loaded it.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import threading
+import time
+
+from .registry import load_index
+from .settings import vectordb_settings
+
+logger = logging.getLogger("VectorDB")
+
+VERSION_FILE = "CURRENT"
+
+
+def get_snapshot_directory() -> str:
+    return os.path.join(vectordb_settings.DEFAULT_PERSISTENT_DIRECTORY, "snapshots")
+
+
+def _index_path(directory: str, version: str) -> str:
+    return os.path.join(directory, version, "index")
+
+
+def current_version(directory: str | None = None) -> str | None:
+    """Return the version of the published snapshot, None if there is none."""
+    directory = directory or get_snapshot_directory()
+    try:
+        with open(os.path.join(directory, VERSION_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_snapshot(version: str, directory: str | None = None):
+    directory = directory or get_snapshot_directory()
+    return load_index(_index_path(directory, version))
+
+
+def publish_snapshot(index, directory: str | None = None, keep: int = 2) -> str:
+    """Write ``index`` as a new snapshot and make it the current one.
+
+    The snapshot is written under a temporary name and renamed, then the
+    version file is replaced, so readers only ever see complete snapshots.
+
+    Args:
+        index (HNSWIndex): The index to publish.
+        directory (str, optional): Defaults to DEFAULT_PERSISTENT_DIRECTORY/snapshots.
+        keep (int, optional): Number of snapshots kept, the older ones are
+            removed. Keep at least 2 so that workers still loading the
+            previous snapshot can finish.
+
+    Returns:
+        str: The version of the new snapshot.
+    """
+    directory = directory or get_snapshot_directory()
+    os.makedirs(directory, exist_ok=True)
+
+    # versions sort in publication order
+    version = str(time.time_ns())
+    previous = current_version(directory)
+    if previous is not None and version <= previous:
+        version = str(int(previous) + 1)
+
+    tmp = os.path.join(directory, f".tmp-{os.getpid()}-{version}")
+    os.makedirs(tmp)
+    index.persist(os.path.join(tmp, "index"))
+    os.rename(tmp, os.path.join(directory, version))
+
+    tmp_version_file = os.path.join(directory, f".{VERSION_FILE}-{os.getpid()}")
+    with open(tmp_version_file, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_version_file, os.path.join(directory, VERSION_FILE))
+
+    _prune(directory, keep)
+    return version
+
+
+def _prune(directory: str, keep: int):
+    versions = sorted(
+        (name for name in os.listdir(directory) if name.isdigit()),
+        key=int,
+    )
+    for version in versions[: -max(keep, 1)]:
+        shutil.rmtree(os.path.join(directory, version), ignore_errors=True)
+
+
+class SnapshotReader:
+    """Load the published snapshot when its version changes.
+
+    Args:
+        directory (str, optional): Defaults to DEFAULT_PERSISTENT_DIRECTORY/snapshots.
+        poll_interval (float, optional): Seconds between two reads of the
+            version file. Defaults to the INDEX_SNAPSHOT_POLL_INTERVAL setting.
+    """
+
+    def __init__(self, directory: str | None = None, poll_interval=None):
+        self.directory = directory or get_snapshot_directory()
+        if poll_interval is None:
+            poll_interval = vectordb_settings.INDEX_SNAPSHOT_POLL_INTERVAL
+        self.poll_interval = poll_interval
+        self.version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """Return the newly published snapshot, None if it did not change."""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.poll_interval:
+            return None
+        # one thread loads the snapshot, the others keep the current index
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            self._checked_at = now
+            version = current_version(self.directory)
+            if version is None or version == self.version:
+                return None
+            try:
+                index = load_snapshot(version, self.directory)
+            except (OSError, RuntimeError):
+                # pruned while loading, a newer one was published
+                logger.warning("Could not load index snapshot %s", version)
+                return None
+            self.version = version
+            logger.info("Loaded index snapshot %s", version)
+            return index
+        finally:
+            self._lock.release()
@@ -1,14 +1,30 @@
 from __future__ import annotations
 
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
 from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
 
+from .encoding import encode_embedding
 from .models import Vector
+from .settings import vectordb_settings
+from .utils import serializer
+
+logger = logging.getLogger("VectorDB")
 
 
 def sync_vectordb_on_create_update(sender, instance, created=None, **kwargs):
     """
     Signal to save or update the vectordb when an instance is created or updated.
     """
+    if vectordb_settings.AUTOSYNC_ON_COMMIT:
+        _get_pending_sync(kwargs.get("using")).save(instance)
+        return
+
     content_type = ContentType.objects.get_for_model(instance)
     if (
         created
@@ -36,9 +52,7 @@ def sync_vectordb_on_create_update(sender, instance, created=None, **kwargs):
             vector.text = text
 
             # Convert the text to embeddings using the Manager's embedding_fn
-            vector.embedding = (
-                Vector.objects.embedding_fn(text).astype("float32").tobytes()
-            )
+            vector.embedding = encode_embedding(Vector.objects.embedding_fn(text))
             vector.save()
 
 
@@ -46,7 +60,213 @@ def sync_vectordb_on_delete(sender, instance, **kwargs):
     """
     Signal to delete an entry from the vectordb when an instance is deleted.
     """
+    if vectordb_settings.AUTOSYNC_ON_COMMIT:
+        _get_pending_sync(kwargs.get("using")).delete(instance)
+        return
+
     # Delete the instance from the Vector model
     content_type = ContentType.objects.get_for_model(instance)
     vector = Vector.objects.filter(content_type=content_type, object_id=instance.pk)
     vector.delete()
+
+
+# Deferred autosync (AUTOSYNC_ON_COMMIT)
+#
+# Instead of embedding inside every post_save, the instances touched in a
+# transaction are collected, keyed by (content_type, pk) so that only their
+# last state is kept, and synced as one batch when the transaction commits.
+
+_local = threading.local()
+_background_executor = None
+_background_lock = threading.Lock()
+
+
+class PendingSync:
+    """The instances saved or deleted in the current transaction.
+
+    Outside of a transaction (``immediate``) every change is synced right away.
+    """
+
+    def __init__(self, using, immediate=False):
+        self.using = using
+        self.immediate = immediate
+        self.saves = {}
+        self.deletes = {}
+        self.callback = self.commit
+
+    def _key(self, instance):
+        content_type = ContentType.objects.get_for_model(instance)
+        return content_type.id, str(instance.pk)
+
+    def save(self, instance):
+        key = self._key(instance)
+        self.deletes.pop(key, None)
+        self.saves[key] = instance.pk
+        if self.immediate:
+            self.commit()
+
+    def delete(self, instance):
+        key = self._key(instance)
+        self.saves.pop(key, None)
+        self.deletes[key] = instance.pk
+        if self.immediate:
+            self.commit()
+
+    def commit(self):
+        if getattr(_local, "pending", {}).get(self.using) is self:
+            del _local.pending[self.using]
+        if vectordb_settings.AUTOSYNC_BACKGROUND:
+            _get_background_executor().submit(_sync_in_background, self)
+        else:
+            sync_pending(self)
+
+
+def _get_pending_sync(using) -> PendingSync:
+    using = using or "default"
+    connection = connections[using]
+    if not connection.in_atomic_block:
+        return PendingSync(using, immediate=True)
+
+    if not hasattr(_local, "pending"):
+        _local.pending = {}
+    pending = _local.pending.get(using)
+
+    # A rolled back transaction drops its on_commit callbacks, start afresh
+    # when ours is no longer registered.
+    if pending is not None and not any(
+        entry[1] is pending.callback for entry in connection.run_on_commit
+    ):
+        pending = None
+
+    if pending is None:
+        pending = PendingSync(using)
+        _local.pending[using] = pending
+        transaction.on_commit(pending.callback, using=using)
+    return pending
+
+
+def _get_text(instance):
+    if hasattr(instance, "get_vectordb_text"):
+        return instance.get_vectordb_text()
+    raise ValueError(
+        f"Object of class {instance.__class__.__name__} must have a "
+        "get_vectordb_text method."
+    )
+
+
+def _get_metadata(instance):
+    if hasattr(instance, "get_vectordb_metadata"):
+        return instance.get_vectordb_metadata()
+    return serializer(instance)
+
+
+def _get_background_executor():
+    global _background_executor
+    if _background_executor is None:
+        with _background_lock:
+            if _background_executor is None:
+                _background_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="vectordb-autosync"
+                )
+    return _background_executor
+
+
+def _sync_in_background(pending):
+    close_old_connections()
+    try:
+        sync_pending(pending)
+    except Exception:
+        logger.exception("Background autosync failed")
+    finally:
+        close_old_connections()
+
+
+def sync_pending(pending: PendingSync):
+    """Apply a batch of coalesced saves and deletes to the Vector table.
+
+    The instances are read back from the database, so the vectors match the
+    committed rows: a save or delete rolled back with a savepoint is not
+    applied. Existing vectors are read with one query per content type, all
+    new or changed texts are embedded with a single call to the embedding
+    function and the rows are written with bulk operations.
+    """
+    manager = Vector.objects
+    using = pending.using
+
+    deleted = 0
+    deletes = defaultdict(list)
+    for content_type_id, object_id in pending.deletes:
+        deletes[content_type_id].append(object_id)
+    for content_type_id, object_ids in deletes.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        # skip instances whose delete was rolled back with a savepoint
+        kept = {
+            str(pk)
+            for pk in model._base_manager.using(using)
+            .filter(pk__in=object_ids)
+            .values_list("pk", flat=True)
+        }
+        object_ids = [object_id for object_id in object_ids if object_id not in kept]
+        if object_ids:
+            manager.filter(
+                content_type_id=content_type_id, object_id__in=object_ids
+            ).delete()
+            deleted += len(object_ids)
+
+    saves = defaultdict(list)
+    for content_type_id, object_id in pending.saves:
+        saves[content_type_id].append(object_id)
+
+    to_create, to_update, to_touch = [], [], []
+    texts = []
+    for content_type_id, object_ids in saves.items():
+        # the committed state, without the changes rolled back with a
+        # savepoint or the instances whose creation was rolled back
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        instances = {
+            str(instance.pk): instance
+            for instance in model._base_manager.using(using).filter(pk__in=object_ids)
+        }
+        existing = {
+            vector.object_id: vector
+            for vector in manager.filter(
+                content_type_id=content_type_id, object_id__in=list(instances)
+            ).only("id", "object_id", "text", "metadata", "status")
+        }
+        for object_id, instance in instances.items():
+            text, metadata = _get_text(instance), _get_metadata(instance)
+            vector = existing.get(object_id)
+            if vector is None:
+                vector = Vector(content_object=instance, text=text, metadata=metadata)
+                to_create.append(vector)
+                texts.append(text)
+            elif vector.text != text:
+                vector.text = text
+                vector.metadata = metadata
+                to_update.append(vector)
+                texts.append(text)
+            elif vector.metadata != metadata:
+                vector.metadata = metadata
+                to_touch.append(vector)
+
+    if texts:
+        embeddings = manager.embedding_fn(texts)
+        for vector, embedding in zip(to_create + to_update, embeddings):
+            vector.embedding = encode_embedding(embedding)
+
+    now = timezone.now()
+    for vector in to_update + to_touch:
+        vector.updated_at = now
+
+    with transaction.atomic(using=using):
+        if to_create:
+            manager.bulk_create(to_create)
+        if to_update:
+            manager.bulk_update(
+                to_update, ["text", "metadata", "embedding", "updated_at"]
+            )
+        if to_touch:
+            manager.bulk_update(to_touch, ["metadata", "updated_at"])
+
+    # bulk_create and bulk_update keep the index in sync
+    return len(to_create), len(to_update) + len(to_touch), deleted
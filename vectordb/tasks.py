@@ -1,32 +1,51 @@
 from __future__ import annotations
 
-import numpy as np
 from celery import shared_task
 
+from .ingestion import embed_batch, index_batch, sweep_pending
+from .neighbours import refresh_neighbours
 from .models import Vector
-from .utils import get_embedding_function
+from .utils import _populate_index
+
+# The tasks take lists of ids so that a single message covers a whole batch.
+# Their results report the number of vectors handled and the seconds spent
+# on each step.
 
 
 @shared_task
-def create_vector(vector_id: int) -> Vector:
-    embedding_fn, embedding_dim = get_embedding_function()
-    vector = Vector.objects.get(id=vector_id)
-    vector.embedding = embedding_fn(vector.text).tobytes()
-    vector.save()
+def embed_vectors(vector_ids: list[int]) -> dict:
+    """Embed, store and index a batch of pending vectors."""
+    return embed_batch(vector_ids)
 
-    add_vector_to_index.delay(vector_id)
 
-    return vector
+@shared_task
+def index_vectors(vector_ids: list[int]) -> dict:
+    """Add a batch of embedded vectors to the ANN index."""
+    return index_batch(vector_ids)
 
 
 @shared_task
-def add_vector_to_index(vector_id: int):
-    if Vector.objects.index is None:
-        return
+def sweep_pending_vectors(
+    chunk_size: int | None = None, max_chunks: int | None = None
+) -> list[dict]:
+    """Embed the vectors left pending, run it periodically with celery beat."""
+    return sweep_pending(chunk_size, max_chunks)
 
-    vector = Vector.objects.only("id", "embedding").get(id=vector_id)
-    embeddings = np.frombuffer(vector.embedding).reshape(1, -1)
-    Vector.objects.index.add(embeddings=embeddings, ids=np.array([vector.id]))
+
+@shared_task
+def refresh_vector_neighbours() -> int:
+    """Update the precomputed neighbours, run it periodically with celery beat."""
+    return refresh_neighbours()
+
+
+@shared_task
+def create_vector(vector_id: int) -> dict:
+    return embed_batch([vector_id])
+
+
+@shared_task
+def add_vector_to_index(vector_id: int) -> dict:
+    return index_batch([vector_id])
 
 
 @shared_task
@@ -34,16 +53,7 @@ def populate_index():
     if Vector.objects.index is None:
         return
 
-    vectors = Vector.objects.only("id", "embedding").all()
-    vector_count = vectors.count()
-
-    ids_list = []
-    embeddings_list = []
-    for vector in vectors:
-        ids_list = ids_list.append(vector.id)
-        embeddings_list.append(vector.embedding)
-    embeddings = np.frombuffer(b"".join(embeddings_list)).reshape(vector_count, -1)
-    Vector.objects.index.add(embeddings=embeddings, ids=np.array(ids_list))
+    _populate_index(Vector.objects)
 
 
 @shared_task
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from vectordb.models import SampleModel, Vector
+
+
+@pytest.mark.django_db
+def test_asearch_text():
+    manager = Vector.objects
+    manager.add_text(1, "The green fox jumps 1", {"field": "value"})
+    manager.add_text(2, "The person walks", {"field": "value"})
+
+    results = async_to_sync(manager.asearch)("green fox", k=1)
+    assert len(results) == 1
+    assert results.first().object_id == "1"
+
+
+@pytest.mark.django_db
+def test_arelated_objects():
+    sample_instance1 = SampleModel.objects.create(text="The green fox jumps 1")
+    sample_instance2 = SampleModel.objects.create(text="The green fox jumps 2")
+    sample_instance3 = SampleModel.objects.create(text="The person walks")
+    manager = Vector.objects
+    manager.add_instances([sample_instance1, sample_instance2, sample_instance3])
+
+    results = async_to_sync(manager.arelated_objects)(sample_instance1, k=1)
+    assert [vector.object_id for vector in results] == [str(sample_instance2.pk)]
+
+
+@pytest.mark.django_db
+def test_asearch_unwrap():
+    sample_instance = SampleModel.objects.create(text="The green fox jumps 1")
+    manager = Vector.objects
+    manager.add_instance(sample_instance)
+    manager.add_text(1, "The person walks", {"field": "value"})
+
+    results = async_to_sync(manager.asearch)("green fox", k=2, unwrap=True)
+    assert results == [sample_instance]
+
+
+@pytest.mark.django_db
+def test_concurrent_asearch():
+    manager = Vector.objects
+    for idx in range(1, 20):
+        manager.add_text(idx, f"Sample text {idx}", {"user": idx % 2})
+
+    async def search_many():
+        queries = [
+            manager.filter(metadata__user=user).asearch("Sample text", k=3)
+            for user in (0, 1) * 4
+        ]
+        users = []
+        for results in await asyncio.gather(*queries):
+            users.append([vector.metadata["user"] async for vector in results])
+        return users
+
+    for users in async_to_sync(search_many)():
+        assert len(users) == 3
+        assert len(set(users)) == 1
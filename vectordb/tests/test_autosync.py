@@ -0,0 +1,123 @@
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from vectordb.models import SampleModel, Vector
+from vectordb.settings import vectordb_settings
+from vectordb.shortcuts import autosync_model_to_vectordb, registered_models
+
+
+@pytest.fixture
+def autosync(monkeypatch):
+    monkeypatch.setattr(vectordb_settings, "AUTOSYNC_ON_COMMIT", True)
+    monkeypatch.setattr(vectordb_settings, "AUTOSYNC_BACKGROUND", False)
+    autosync_model_to_vectordb(SampleModel)
+
+    calls = []
+    embedding_fn = Vector.objects.embedding_fn
+
+    def counting_embedding_fn(texts):
+        calls.append(texts)
+        return embedding_fn(texts)
+
+    monkeypatch.setattr(Vector.objects, "embedding_fn", counting_embedding_fn)
+    yield calls
+
+    model_key = "vectordb.vectordb.SampleModel"
+    post_save.disconnect(sender=SampleModel, dispatch_uid=model_key)
+    post_delete.disconnect(sender=SampleModel, dispatch_uid=model_key)
+    registered_models.discard(model_key)
+
+
+def get_vectors(instance):
+    content_type = ContentType.objects.get_for_model(instance)
+    return Vector.objects.filter(content_type=content_type, object_id=instance.pk)
+
+
+@pytest.mark.django_db
+def test_saves_are_coalesced_per_transaction(
+    autosync, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        instance = SampleModel.objects.create(text="draft")
+        for idx in range(10):
+            instance.text = f"The green fox jumps {idx}"
+            instance.save()
+        other = SampleModel.objects.create(text="The person walks")
+
+    assert len(callbacks) == 1
+    assert len(autosync) == 1
+    assert sorted(autosync[0]) == ["The green fox jumps 9", "The person walks"]
+
+    vector = get_vectors(instance).get()
+    assert vector.text == "The green fox jumps 9"
+    assert get_vectors(other).exists()
+
+
+@pytest.mark.django_db
+def test_update_and_delete_in_transaction(autosync, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        kept = SampleModel.objects.create(text="first")
+        removed = SampleModel.objects.create(text="second")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        kept.text = "first changed"
+        kept.save()
+        removed.delete()
+
+    assert get_vectors(kept).get().text == "first changed"
+    assert Vector.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_unchanged_text_is_not_embedded(autosync, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        instance = SampleModel.objects.create(text="same")
+    with django_capture_on_commit_callbacks(execute=True):
+        instance.save()
+
+    assert len(autosync) == 1
+    assert get_vectors(instance).count() == 1
+
+
+@pytest.mark.django_db
+def test_rolled_back_savepoint_is_skipped(autosync, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        kept = SampleModel.objects.create(text="kept")
+        try:
+            with transaction.atomic():
+                SampleModel.objects.create(text="rolled back")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+    assert Vector.objects.count() == 1
+    assert get_vectors(kept).exists()
+
+
+@pytest.mark.django_db
+def test_rolled_back_update_and_delete_are_skipped(
+    autosync, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        updated = SampleModel.objects.create(text="kept text")
+        deleted = SampleModel.objects.create(text="kept row")
+    deleted_pk = deleted.pk
+
+    with django_capture_on_commit_callbacks(execute=True):
+        # registers the sync in the outer transaction
+        other = SampleModel.objects.create(text="The person walks")
+        try:
+            with transaction.atomic():
+                updated.text = "rolled back text"
+                updated.save()
+                deleted.delete()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+    assert get_vectors(updated).get().text == "kept text"
+    assert get_vectors(SampleModel(pk=deleted_pk)).exists()
+    assert get_vectors(other).exists()
+    assert autosync[1] == ["The person walks"]
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from vectordb.batching import (
+    BatchedEmbeddingExecutor,
+    make_batches,
+    retry_with_backoff,
+)
+
+
+def test_make_batches_by_size():
+    assert make_batches(["a"] * 5, max_batch_size=2) == [(0, 2), (2, 4), (4, 5)]
+    assert make_batches([], max_batch_size=2) == []
+
+
+def test_make_batches_by_tokens():
+    texts = ["a" * 30, "b" * 30, "c" * 300, "d"]
+    batches = make_batches(texts, max_batch_size=100, max_batch_tokens=25)
+    assert batches == [(0, 2), (2, 3), (3, 4)]
+
+
+def test_retry_with_backoff():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise TimeoutError
+        return "ok"
+
+    result = retry_with_backoff(
+        flaky, retry_on=(TimeoutError,), max_retries=3, base_delay=0
+    )
+    assert result == "ok"
+    assert len(calls) == 3
+
+    calls.clear()
+    with pytest.raises(TimeoutError):
+        retry_with_backoff(flaky, retry_on=(TimeoutError,), max_retries=1, base_delay=0)
+
+
+def test_executor_preserves_order():
+    executor = BatchedEmbeddingExecutor(max_workers=3)
+    texts = [str(i) for i in range(10)]
+
+    def embed_batch(batch):
+        return [[float(text), 0.0] for text in batch]
+
+    embeddings = executor.run(embed_batch, texts, make_batches(texts, 3))
+    assert embeddings.shape == (10, 2)
+    assert embeddings.dtype == np.float32
+    np.testing.assert_array_equal(embeddings[:, 0], np.arange(10))
@@ -0,0 +1,169 @@
+import numpy as np
+import pytest
+from django.apps import apps
+from django.db import connection, models
+
+from vectordb.ann.indexes import HNSWIndex
+from vectordb.models import SampleModel, Vector
+from vectordb.settings import vectordb_settings
+
+
+@pytest.fixture
+def index(monkeypatch):
+    monkeypatch.setattr(Vector.objects, "index", None)
+    monkeypatch.setattr(vectordb_settings, "INDEX_WRITE_BUFFER_DELAY", None)
+    index = Vector.objects.get_index()
+
+    calls = []
+    for name in ("add", "delete"):
+        method = getattr(index, name)
+
+        def counted(*args, name=name, method=method, **kwargs):
+            calls.append(name)
+            return method(*args, **kwargs)
+
+        monkeypatch.setattr(index, name, counted)
+    index.calls = calls
+    return index
+
+
+def get_labels(index):
+    return sorted(index.index.get_ids_list())
+
+
+def search_ids(index, embedding, k):
+    labels, _ = index.search(np.asarray(embedding).reshape(1, -1), k)
+    return labels[0].tolist()
+
+
+def make_vectors(n):
+    return [
+        Vector(
+            text=f"text {i}",
+            object_id=str(i),
+            embedding=np.random.rand(vectordb_settings.DEFAULT_EMBEDDING_DIMENSION)
+            .astype(np.float32)
+            .tobytes(),
+        )
+        for i in range(n)
+    ]
+
+
+@pytest.mark.django_db
+def test_bulk_create_adds_to_index(index):
+    vectors = Vector.objects.bulk_create(make_vectors(10))
+    Vector.objects.flush_index()
+
+    assert index.calls == ["add"]
+    assert get_labels(index) == sorted(vector.pk for vector in vectors)
+
+
+@pytest.mark.django_db
+def test_queryset_delete_removes_from_index(index):
+    vectors = Vector.objects.bulk_create(make_vectors(10))
+    Vector.objects.flush_index()
+    index.calls.clear()
+
+    Vector.objects.filter(object_id__in=[str(i) for i in range(6)]).delete()
+    Vector.objects.flush_index()
+
+    assert index.calls == ["delete"]
+    remaining = set(Vector.objects.values_list("id", flat=True))
+    assert len(remaining) == 4
+    found = search_ids(index, vectors[0].vector, k=4)
+    assert set(found) == remaining
+
+
+@pytest.mark.django_db
+def test_bulk_update_and_update_reindex(index):
+    vectors = Vector.objects.bulk_create(make_vectors(5))
+    Vector.objects.flush_index()
+
+    target = np.random.rand(vectordb_settings.DEFAULT_EMBEDDING_DIMENSION)
+    target = target.astype(np.float32)
+    vectors[0].embedding = target.tobytes()
+    Vector.objects.bulk_update(vectors, ["embedding"])
+    Vector.objects.flush_index()
+    assert search_ids(index, target, k=1) == [vectors[0].pk]
+
+    target = target[::-1].copy()
+    Vector.objects.filter(pk=vectors[3].pk).update(embedding=target.tobytes())
+    Vector.objects.flush_index()
+    assert search_ids(index, target, k=1) == [vectors[3].pk]
+
+
+@pytest.mark.django_db
+def test_reset_truncates_table_and_index(index):
+    Vector.objects.bulk_create(make_vectors(5))
+    Vector.objects.add_instance(SampleModel.objects.create(text="The cat"))
+    assert Vector.objects.get_index().size == 6
+
+    Vector.objects.reset()
+
+    assert Vector.objects.count() == 0
+    assert Vector.objects.get_index() is index
+    assert index.size == 0
+    assert SampleModel.objects.count() == 1
+
+
+@pytest.fixture
+def external_model():
+    """A model outside of vectordb pointing at the vectors."""
+
+    def make(on_delete):
+        class Bookmark(models.Model):
+            vector = models.ForeignKey(
+                Vector, on_delete=on_delete, null=True, related_name="+"
+            )
+
+            class Meta:
+                app_label = "vectordb"
+
+        with connection.schema_editor() as editor:
+            editor.create_model(Bookmark)
+        created.append(Bookmark)
+        return Bookmark
+
+    created = []
+    yield make
+    for model in created:
+        with connection.schema_editor() as editor:
+            editor.delete_model(model)
+        del apps.all_models["vectordb"][model._meta.model_name]
+    apps.clear_cache()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reset_applies_on_delete_of_other_models(index, external_model):
+    Bookmark = external_model(models.SET_NULL)
+    vectors = Vector.objects.bulk_create(make_vectors(3))
+    bookmark = Bookmark.objects.create(vector=vectors[0])
+
+    Vector.objects.reset()
+
+    assert Vector.objects.count() == 0
+    assert index.size == 0
+    bookmark.refresh_from_db()
+    assert bookmark.vector_id is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reset_respects_protected_references(index, external_model):
+    Bookmark = external_model(models.PROTECT)
+    vectors = Vector.objects.bulk_create(make_vectors(3))
+    Bookmark.objects.create(vector=vectors[0])
+
+    with pytest.raises(models.ProtectedError):
+        Vector.objects.reset()
+
+    assert Vector.objects.count() == 3
+    assert Bookmark.objects.count() == 1
+
+
+def test_hnsw_index_reset():
+    index = HNSWIndex(dim=8, max_elements=10, should_not_cache=True)
+    index.add(np.random.rand(5, 8), np.arange(5))
+    index.reset()
+    assert index.size == 0
+    index.add(np.random.rand(2, 8), np.arange(2))
+    assert index.size == 2
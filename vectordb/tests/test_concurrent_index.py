@@ -0,0 +1,141 @@
+import threading
+
+import numpy as np
+import pytest
+
+from vectordb.ann.concurrent import ConcurrentIndex
+from vectordb.ann.indexes import HNSWIndex
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+from vectordb.utils import build_index
+
+dim = 16
+rng = np.random.default_rng(0)
+embeddings = rng.random((2000, dim), dtype=np.float32)
+
+
+@pytest.fixture
+def index():
+    hnsw = HNSWIndex(dim=dim, max_elements=100, M=16, should_not_cache=True)
+    hnsw.add(embeddings[:100], np.arange(100))
+    index = ConcurrentIndex(hnsw, max_pending=8, should_not_cache=True)
+    yield index
+    index.close()
+
+
+def test_reads_and_writes(index):
+    index.add(embeddings[100:110], np.arange(100, 110))
+    index.delete([0])
+    index.update(embeddings[5:6], [1])
+
+    labels, _ = index.search(embeddings[:1], k=1)
+    assert labels[0, 0] != 0
+    assert sorted(index.get_ids().tolist()) == list(range(110))
+    ids, found = index.get_embeddings([1])
+    assert np.allclose(found, embeddings[[5]])
+
+    labels, _ = index.range_search(embeddings[100], 0.0, k=50)
+    assert labels.tolist() == [100]
+
+
+def test_resize_swaps_a_copy(index):
+    before = index.index
+    labels_before = before.search(embeddings[:3], k=5)[0]
+
+    index.add(embeddings[100:300], np.arange(100, 300))
+    assert index.resizes == 1
+    assert index.index is not before
+    assert index.size == 300
+    # the previous index is left as it was for the searches still using it
+    assert before.size == 100
+    assert np.array_equal(before.search(embeddings[:3], k=5)[0], labels_before)
+
+
+def test_write_errors_reach_the_caller(index):
+    with pytest.raises(RuntimeError):
+        index.add(np.zeros((1, dim + 1), dtype=np.float32), [500])
+    index.add(embeddings[100:101], [100])
+    assert index.size == 101
+
+
+def test_reset(index):
+    before = index.index
+    index.reset()
+    assert index.size == 0
+    assert before.size == 100
+
+
+def test_concurrent_adds_deletes_and_searches(index):
+    # ids below 100 are never deleted, so every search can find 5 vectors
+    errors = []
+    stop = threading.Event()
+    deleted = set()
+
+    def guard(fn):
+        def run(*args):
+            try:
+                fn(*args)
+            except Exception as e:  # pragma: no cover, reported below
+                errors.append(e)
+                stop.set()
+
+        return run
+
+    @guard
+    def add(start):
+        for offset in range(start, 2000, 2 * 50):
+            ids = np.arange(offset, min(offset + 50, 2000))
+            index.add(embeddings[ids], ids)
+
+    @guard
+    def delete():
+        for id in range(100, 2000, 7):
+            index.delete([id])
+            deleted.add(id)
+
+    @guard
+    def search():
+        while not stop.is_set():
+            query = embeddings[rng.integers(0, 2000, size=4)]
+            labels, distances = index.search(query, k=5)
+            assert labels.shape == distances.shape == (4, 5)
+            assert np.all(np.diff(distances, axis=1) >= 0)
+            index.search(query[:1], k=5, ids__in=set(range(100)))
+
+    writers = [threading.Thread(target=add, args=(start,)) for start in (100, 150)]
+    writers.append(threading.Thread(target=delete))
+    readers = [threading.Thread(target=search) for _ in range(4)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors
+    assert index.resizes > 0
+    assert sorted(index.get_ids().tolist()) == list(range(2000))
+    # deletes may land before the add of their id, delete them again
+    index.delete(sorted(deleted))
+    labels, _ = index.search(embeddings[sorted(deleted)], k=1)
+    assert not set(labels.ravel().tolist()) & deleted
+
+
+@pytest.mark.django_db
+def test_build_concurrent_index(monkeypatch):
+    monkeypatch.setattr(vectordb_settings, "CONCURRENT_INDEX", True)
+    monkeypatch.setattr(vectordb_settings, "DEFAULT_EMBEDDING_DIMENSION", dim)
+    monkeypatch.setattr(Vector.objects, "index", None)
+    Vector.objects.bulk_create(
+        [
+            Vector(text=f"text {i}", object_id=str(i), embedding=embedding.tobytes())
+            for i, embedding in enumerate(embeddings[:10])
+        ]
+    )
+    index = build_index(Vector.objects)
+    try:
+        assert isinstance(index, ConcurrentIndex)
+        assert index.size == 10
+    finally:
+        index.close()
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from vectordb.ann.indexes import HNSWIndex
+from vectordb.consistency import check_index
+from vectordb.index_server import IndexServer
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+from vectordb.snapshots import current_version, load_snapshot, publish_snapshot
+
+dim = vectordb_settings.DEFAULT_EMBEDDING_DIMENSION
+
+
+@pytest.fixture
+def drifted(monkeypatch):
+    monkeypatch.setattr(Vector.objects, "index", None)
+    vectors = Vector.objects.bulk_create(
+        [
+            Vector(
+                text=f"text {i}",
+                object_id=str(i),
+                embedding=np.random.rand(dim).astype(np.float32).tobytes(),
+            )
+            for i in range(10)
+        ]
+    )
+    index = Vector.objects.get_index()
+    assert index.size == 10
+
+    # writes that the index never saw
+    index.delete([vectors[0].pk, vectors[1].pk])
+    Vector.objects.index = None
+    Vector.objects.filter(pk=vectors[2].pk).update(
+        embedding=np.random.rand(dim).astype(np.float32).tobytes()
+    )
+    Vector.objects.filter(pk=vectors[3].pk).delete()
+    Vector.objects.index = index
+    index.update(np.random.rand(1, dim), [vectors[4].pk])
+    return vectors
+
+
+@pytest.mark.django_db
+def test_check_reports_drift(drifted):
+    report = check_index(Vector.objects, chunk_size=3)
+
+    assert report.checked == 9
+    assert sorted(report.missing) == [drifted[0].pk, drifted[1].pk]
+    assert report.extra == [drifted[3].pk]
+    assert sorted(report.stale) == [drifted[2].pk, drifted[4].pk]
+    assert not report.is_consistent
+
+
+@pytest.mark.django_db
+def test_repair(drifted):
+    report = Vector.objects.check_index(repair=True, chunk_size=4)
+    assert report.repaired
+    assert not report.is_consistent
+
+    report = Vector.objects.check_index()
+    assert report.is_consistent
+    assert report.checked == 9
+
+    vector = Vector.objects.get(pk=drifted[2].pk)
+    labels, _ = Vector.objects.get_index().search(vector.vector.reshape(1, -1), k=1)
+    assert labels[0][0] == vector.pk
+
+
+def test_update_keeps_the_label_in_its_slot(tmp_path):
+    index = HNSWIndex(dim=8, max_elements=10, M=16, should_not_cache=True)
+    embeddings = np.random.rand(11, 8).astype(np.float32)
+    index.add(embeddings[:10], np.arange(10))
+    index.delete([0, 1])
+
+    index.update(embeddings[10:], [5])
+    index.update(embeddings[:1], [0])
+    index.persist(str(tmp_path / "index"))
+    loaded = HNSWIndex.load(str(tmp_path / "index"))
+    for current in (index, loaded):
+        assert current.size == 10
+        assert np.allclose(current.get_embeddings([5])[1], embeddings[10:])
+        assert current.get_embeddings([0, 1])[0].tolist() == [0]
+
+
+@pytest.mark.django_db
+def test_check_command_needs_a_shared_index(drifted, monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        Vector.objects, "persistent_path", str(tmp_path / "vector.index")
+    )
+    with pytest.raises(CommandError, match="no shared index"):
+        call_command("vectordb_check")
+
+
+@pytest.mark.django_db
+def test_check_command_repairs_the_persisted_index(
+    drifted, monkeypatch, tmp_path, capsys
+):
+    path = str(tmp_path / "vector.index")
+    monkeypatch.setattr(Vector.objects, "persistent_path", path)
+    Vector.objects.get_index().persist(path)
+
+    call_command("vectordb_check", "--show-ids")
+    out = capsys.readouterr().out
+    assert "2 missing, 1 extra, 2 stale" in out
+
+    call_command("vectordb_check", "--repair")
+    assert f"Saved the index to {path}" in capsys.readouterr().out
+    call_command("vectordb_check")
+    assert "Index is consistent" in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+def test_check_command_publishes_the_repaired_snapshot(
+    drifted, monkeypatch, tmp_path, capsys
+):
+    monkeypatch.setattr(
+        vectordb_settings, "DEFAULT_PERSISTENT_DIRECTORY", str(tmp_path)
+    )
+    monkeypatch.setattr(vectordb_settings, "INDEX_SNAPSHOTS", True)
+    with pytest.raises(CommandError, match="No index snapshot"):
+        call_command("vectordb_check")
+
+    version = publish_snapshot(Vector.objects.index)
+    call_command("vectordb_check", "--repair")
+    assert current_version() != version
+    assert check_index(Vector.objects, load_snapshot(current_version())).is_consistent
+
+
+@pytest.mark.django_db
+def test_check_command_repairs_the_index_server(drifted, monkeypatch, tmp_path):
+    server = IndexServer(str(tmp_path / "index.sock"), Vector.objects.index).start()
+    monkeypatch.setattr(vectordb_settings, "INDEX_SERVER", True)
+    monkeypatch.setattr(vectordb_settings, "INDEX_SERVER_ADDRESS", server.address)
+    try:
+        call_command("vectordb_check", "--repair")
+    finally:
+        server.stop()
+    assert check_index(Vector.objects, server.index).is_consistent
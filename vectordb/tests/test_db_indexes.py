@@ -113,3 +113,25 @@ def test_hnsw_index_persist_load(tmpdir, hnsw_index):
     loaded_hnsw_index = HNSWIndex.load(directory)
     assert loaded_hnsw_index.dim == hnsw_index.dim
     assert loaded_hnsw_index.space == hnsw_index.space
+
+
+def test_hnsw_index_grows_on_add():
+    index = HNSWIndex(dim=d, max_elements=1, space="l2", should_not_cache=True)
+    index.add(np.random.rand(1, d), np.array([0]))
+    index.add(np.random.rand(5, d), np.arange(1, 6))
+    assert index.size == 6
+    assert index.max_elements >= 6
+
+
+def test_hnsw_index_resize():
+    index = HNSWIndex(dim=d, max_elements=10, space="l2", should_not_cache=True)
+    index.add(np.random.rand(10, d), np.arange(10))
+
+    # 20% more room by default, at least min_size
+    assert index.resize().max_elements == 12
+    assert index.resize(min_size=50).max_elements == 50
+    assert index.index.get_max_elements() == 50
+
+    # a batch larger than 20% of the index fits in a single resize
+    index.add(np.random.rand(100, d), np.arange(10, 110))
+    assert index.size == index.max_elements == 110
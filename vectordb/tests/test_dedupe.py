@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from django.core.management import call_command
+
+from vectordb.dedupe import connected_components, find_duplicates
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+
+dim = vectordb_settings.DEFAULT_EMBEDDING_DIMENSION
+
+
+@pytest.fixture
+def vectors(monkeypatch):
+    monkeypatch.setattr(Vector.objects, "index", None)
+    rng = np.random.default_rng(0)
+    embeddings = rng.random((30, dim), dtype=np.float32)
+    # 3 copies of vector 0, 2 of vector 10
+    embeddings[[5, 20]] = embeddings[0] + 1e-4
+    embeddings[25] = embeddings[10]
+    vectors = Vector.objects.bulk_create(
+        [
+            Vector(text=f"text {i}", object_id=str(i), embedding=embedding.tobytes())
+            for i, embedding in enumerate(embeddings)
+        ]
+    )
+    return [vector.pk for vector in vectors]
+
+
+def expected_pairs(ids):
+    return {
+        (ids[0], ids[5]),
+        (ids[0], ids[20]),
+        (ids[5], ids[20]),
+        (ids[10], ids[25]),
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("exact", [False, True])
+def test_find_duplicates(vectors, exact):
+    finder = find_duplicates(
+        Vector.objects.all(), threshold=0.01, exact=exact, block_size=7
+    )
+    pairs = list(finder)
+
+    assert {(a, b) for a, b, _ in pairs} == expected_pairs(vectors)
+    assert len(pairs) == 4
+    assert all(distance <= 0.01 for _, _, distance in pairs)
+    assert finder.vectors_scanned == 30
+    assert finder.pairs_compared > 0
+    assert finder.pairs_per_second > 0
+    if exact:
+        assert finder.pairs_compared == 30 * 29 // 2
+
+
+@pytest.mark.django_db
+def test_ann_pairs_are_yielded_once_with_one_search_per_block(vectors, monkeypatch):
+    index = Vector.objects.get_index()
+    searches = []
+    search = index.search
+
+    def counting_search(*args, **kwargs):
+        searches.append(1)
+        return search(*args, **kwargs)
+
+    monkeypatch.setattr(index, "search", counting_search)
+    # with k=1 each copy of vector 0 finds a single other copy, a pair can
+    # be found from its largest id only
+    pairs = list(
+        find_duplicates(Vector.objects.all(), threshold=0.01, k=1, block_size=7)
+    )
+
+    found = [(a, b) for a, b, _ in pairs]
+    assert len(found) == len(set(found))
+    assert set(found) <= expected_pairs(vectors)
+    assert len(searches) == 5
+
+
+def test_connected_components():
+    pairs = [(1, 2, 0.0), (3, 4, 0.0), (2, 5, 0.0), (6, 4, 0.0)]
+    assert connected_components(pairs) == [[1, 2, 5], [3, 4, 6]]
+
+
+@pytest.mark.django_db
+def test_dedupe_command(vectors, tmp_path):
+    output = tmp_path / "duplicates.csv"
+    call_command(
+        "vectordb_dedupe", "--threshold", "0.01", "--components", "--output", output
+    )
+    lines = output.read_text().splitlines()
+    assert lines[0] == "component,vector_id"
+    assert lines[1:] == [
+        f"0,{vectors[0]}",
+        f"0,{vectors[5]}",
+        f"0,{vectors[20]}",
+        f"1,{vectors[10]}",
+        f"1,{vectors[25]}",
+    ]
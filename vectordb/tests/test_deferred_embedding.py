@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from vectordb.models import Vector
+
+
+@pytest.fixture
+def vectors(monkeypatch):
+    monkeypatch.setattr(Vector.objects, "index", None)
+    Vector.objects.add_texts(
+        [1, 2, 3],
+        ["The green fox jumps", "The person walks", "The cat sleeps"],
+        [{"kind": "animal"}, {"kind": "person"}, {"kind": "animal"}],
+    )
+
+
+@pytest.mark.django_db
+def test_embedding_is_deferred(vectors):
+    results = Vector.objects.search("green fox", k=2)
+    assert "embedding" not in str(Vector.objects.all().query)
+    assert "embedding" not in str(results.query)
+    assert "embedding" in str(Vector.objects.with_embeddings().query)
+
+    assert len(results) == 2
+    assert all(vector.get_deferred_fields() == {"embedding"} for vector in results)
+
+
+@pytest.mark.django_db
+def test_embedding_is_read_on_access(vectors, django_assert_num_queries):
+    vector = Vector.objects.get(object_id="1")
+    with django_assert_num_queries(1):
+        assert vector.vector.shape == (Vector.objects.embedding_dim,)
+
+    with django_assert_num_queries(1):
+        vector = Vector.objects.with_embeddings().get(object_id="1")
+    with django_assert_num_queries(0):
+        assert np.array_equal(
+            vector.vector, Vector.objects.embedding_fn(["The green fox jumps"])[0]
+        )
+    assert Vector.objects.only("text").with_embeddings().get(
+        object_id="1"
+    ).get_deferred_fields() > {"metadata"}
+
+
+@pytest.mark.django_db
+def test_saving_a_deferred_vector_keeps_its_embedding(vectors, monkeypatch):
+    vector = Vector.objects.get(object_id="1")
+    embedding = Vector.objects.with_embeddings().get(object_id="1").embedding
+
+    index_writes = []
+    monkeypatch.setattr(
+        Vector.objects, "index_update", lambda *args: index_writes.append(args)
+    )
+    vector.metadata = {"kind": "fox"}
+    vector.save()
+
+    vector = Vector.objects.with_embeddings().get(object_id="1")
+    assert vector.metadata == {"kind": "fox"}
+    assert bytes(vector.embedding) == bytes(embedding)
+    assert index_writes == []
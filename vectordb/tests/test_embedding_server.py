@@ -0,0 +1,111 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from vectordb.embedding_server import EmbeddingServer, EmbeddingServerEncoder
+
+
+class CountingEncoder:
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(text)] * self.dim for text in texts], dtype=np.float32)
+
+
+class GatedEncoder(CountingEncoder):
+    """Holds its first call until the other ``requests`` are queued."""
+
+    def __init__(self, requests, dim=8):
+        super().__init__(dim)
+        self.requests = requests
+        self.server = None
+
+    def __call__(self, texts):
+        if not self.calls:
+            deadline = time.monotonic() + 5
+            while len(texts) + self.server._jobs.qsize() < self.requests:
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+        return super().__call__(texts)
+
+
+@pytest.fixture
+def server(tmp_path):
+    encoder = CountingEncoder()
+    server = EmbeddingServer(
+        str(tmp_path / "embedding.sock"), encoder, max_batch_size=32
+    ).start()
+    yield server
+    server.stop()
+
+
+def test_embed_list(server):
+    client = EmbeddingServerEncoder(address=server.address)
+    embeddings = client(["a", "abc"])
+    assert embeddings.shape == (2, 8)
+    assert embeddings.dtype == np.float32
+    assert embeddings[1, 0] == 3
+
+
+def test_embed_single_text(server):
+    client = EmbeddingServerEncoder(address=server.address)
+    embedding = client("hello")
+    assert embedding.shape == (8,)
+    assert embedding[0] == 5
+
+
+def test_concurrent_requests_are_batched(tmp_path):
+    encoder = GatedEncoder(requests=20)
+    server = EmbeddingServer(
+        str(tmp_path / "embedding.sock"),
+        encoder,
+        max_batch_size=32,
+        batch_timeout=0.05,
+    )
+    encoder.server = server.start()
+    client = EmbeddingServerEncoder(address=server.address)
+    results = {}
+
+    def worker(i):
+        results[i] = client(["x" * i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(1, 21)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.stop()
+
+    for i in range(1, 21):
+        assert results[i][0, 0] == i
+    # the requests queued while the encoder was busy reach it as one batch
+    assert len(encoder.calls) <= 2
+    assert sorted(text for call in encoder.calls for text in call) == sorted(
+        "x" * i for i in range(1, 21)
+    )
+
+
+def test_encoder_errors_are_reported(tmp_path):
+    def failing_encoder(texts):
+        raise ValueError("boom")
+
+    server = EmbeddingServer(str(tmp_path / "e.sock"), failing_encoder).start()
+    try:
+        client = EmbeddingServerEncoder(address=server.address)
+        with pytest.raises(RuntimeError, match="boom"):
+            client(["a"])
+    finally:
+        server.stop()
+
+
+def test_client_without_server(tmp_path):
+    client = EmbeddingServerEncoder(address=str(tmp_path / "missing.sock"))
+    with pytest.raises(ConnectionError):
+        client(["a"])
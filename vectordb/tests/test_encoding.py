@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from django.core.management import call_command
+
+from vectordb.encoding import (
+    HEADER,
+    MAGIC,
+    decode_embedding,
+    decode_embeddings,
+    embedding_dtype,
+    encode_embedding,
+    reencode_embeddings,
+)
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+
+embeddings = np.random.default_rng(0).standard_normal((4, 384)).astype(np.float32)
+
+
+@pytest.mark.parametrize(
+    "dtype, size, tolerance",
+    [("float32", 4 * 384, 0), ("float16", 8 + 2 * 384, 1e-2), ("int8", 12 + 384, 5e-2)],
+)
+def test_round_trip(dtype, size, tolerance):
+    blobs = [encode_embedding(embedding, dtype) for embedding in embeddings]
+
+    assert all(len(blob) == size for blob in blobs)
+    assert embedding_dtype(blobs[0]) == dtype
+    assert np.allclose(decode_embeddings(blobs), embeddings, atol=tolerance)
+    assert np.allclose(decode_embedding(blobs[0]), embeddings[0], atol=tolerance)
+
+
+def test_decode_mixed_formats():
+    blobs = [
+        encode_embedding(embedding, dtype)
+        for embedding, dtype in zip(embeddings, ["int8", "float32", "float16", "int8"])
+    ]
+    assert np.allclose(decode_embeddings(blobs), embeddings, atol=5e-2)
+
+
+def test_float32_that_looks_like_a_header():
+    embedding = np.frombuffer(
+        HEADER.pack(MAGIC, 1, 384) + bytes(4 * 384 - HEADER.size), dtype=np.float32
+    )
+    blob = encode_embedding(embedding, "float32")
+    assert embedding_dtype(blob) == "float32"
+    assert np.array_equal(decode_embedding(blob), embedding)
+
+
+def test_zero_embedding():
+    assert np.array_equal(
+        decode_embedding(encode_embedding(np.zeros(8), "int8")), np.zeros(8)
+    )
+
+
+@pytest.mark.django_db
+def test_storage_dtype_setting(monkeypatch):
+    monkeypatch.setattr(Vector.objects, "index", None)
+    monkeypatch.setattr(vectordb_settings, "EMBEDDING_STORAGE_DTYPE", "float16")
+    Vector.objects.add_texts(
+        [1, 2], ["The green fox jumps", "The person walks"], [None, None]
+    )
+
+    vector = Vector.objects.with_embeddings().get(object_id="1")
+    assert embedding_dtype(vector.embedding) == "float16"
+    expected = Vector.objects.embedding_fn(["The green fox jumps"])[0]
+    assert np.allclose(vector.vector, expected, atol=1e-2)
+    assert Vector.objects.search("green fox", k=1).get().object_id == "1"
+
+
+@pytest.mark.django_db
+def test_reencode_command(monkeypatch):
+    monkeypatch.setattr(Vector.objects, "index", None)
+    Vector.objects.add_texts(
+        list(range(5)), [f"The green fox jumps {i}" for i in range(5)], [None] * 5
+    )
+
+    call_command("vectordb_reencode", "--dtype", "int8", "--chunk-size", "2")
+    blobs = Vector.objects.values_list("embedding", flat=True)
+    assert {embedding_dtype(blob) for blob in blobs} == {"int8"}
+    assert Vector.objects.search("green fox jumps 3", k=1).exists()
+
+    # nothing left to convert
+    assert reencode_embeddings(Vector.objects, "int8") == (5, 0)
@@ -0,0 +1,215 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from vectordb.ann import BufferedIndexWriter, ConcurrentIndex
+from vectordb.ann.indexes import HNSWIndex
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+
+d = 16
+
+
+class CountingIndex(HNSWIndex):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    def add(self, embeddings, ids, replace_deleted=True):
+        self.calls.append(("add", len(ids)))
+        return super().add(embeddings, ids, replace_deleted)
+
+    def delete(self, ids):
+        self.calls.append(("delete", len(ids)))
+        return super().delete(ids)
+
+
+@pytest.fixture
+def index():
+    return CountingIndex(dim=d, max_elements=10, should_not_cache=True)
+
+
+def test_writes_are_applied_in_bulk(index):
+    writer = BufferedIndexWriter(index, max_size=100, max_delay=None)
+    embeddings = np.random.rand(20, d).astype(np.float32)
+    for id, embedding in enumerate(embeddings):
+        writer.add(embedding, [id])
+    writer.update(embeddings[0] + 1, [0])
+    writer.delete([19])
+    assert index.size == 0
+
+    assert writer.flush() == 20
+    assert index.calls == [("delete", 1), ("add", 19)]
+    assert index.size == 19
+    np.testing.assert_allclose(index.index.get_items([0])[0], embeddings[0] + 1)
+
+    assert writer.flush() == 0
+
+
+def test_delete_then_add_keeps_the_vector(index):
+    writer = BufferedIndexWriter(index, max_size=100, max_delay=None)
+    embedding = np.random.rand(d)
+    writer.add(embedding, [1])
+    writer.flush()
+    writer.delete([1])
+    writer.add(embedding, [1])
+    writer.flush()
+
+    labels, _ = index.search(embedding.reshape(1, -1), k=1)
+    assert labels[0][0] == 1
+
+
+def test_flush_on_size(index):
+    writer = BufferedIndexWriter(index, max_size=5, max_delay=None)
+    writer.add(np.random.rand(4, d), np.arange(4))
+    assert index.size == 0
+    writer.add(np.random.rand(d), [4])
+    assert index.size == 5
+    assert len(writer) == 0
+
+
+def test_flush_on_delay_in_the_background(index):
+    writer = BufferedIndexWriter(index, max_size=100, max_delay=0.05, background=True)
+    writer.add(np.random.rand(3, d), np.arange(3))
+
+    deadline = time.monotonic() + 5
+    while index.size < 3:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert len(writer) == 0
+
+
+def test_flush_on_delay_on_the_callers_thread(index):
+    threads = []
+    index.add = lambda *args: threads.append(threading.current_thread())
+    writer = BufferedIndexWriter(index, max_size=100, max_delay=0.05)
+    writer.add(np.random.rand(3, d), np.arange(3))
+    assert writer.flush_due() == 0
+    time.sleep(0.1)
+    assert len(writer) == 3
+
+    # applied by the next write or flush_due, not by a timer thread
+    writer.add(np.random.rand(d), [3])
+    assert len(writer) == 0
+    writer.add(np.random.rand(d), [4])
+    time.sleep(0.1)
+    assert writer.flush_due() == 1
+    assert threads == [threading.current_thread()] * 2
+
+
+@pytest.mark.django_db
+def test_manager_buffers_signal_writes(monkeypatch):
+    monkeypatch.setattr(Vector.objects, "index", None)
+    monkeypatch.setattr(vectordb_settings, "INDEX_WRITE_BUFFER_DELAY", None)
+    index = Vector.objects.get_index()
+
+    Vector.objects.add_texts(
+        [1, 2, 3], ["The green fox jumps", "The person walks", "The cat"], [None] * 3
+    )
+    Vector.objects.get(object_id="3").delete()
+    assert index.size == 0
+
+    # searches flush the buffer first
+    assert Vector.objects.get_index() is index
+    assert index.size == 2
+    assert Vector.objects.flush_index() == 0
+
+    monkeypatch.setattr(vectordb_settings, "INDEX_FLUSH_ON_SEARCH", False)
+    Vector.objects.add_text(4, "A dog barks", None)
+    Vector.objects.get_index()
+    assert index.size == 2
+    Vector.objects.flush_index()
+    assert index.size == 3
+
+
+@pytest.mark.django_db
+def test_manager_flushes_in_the_background_only_for_concurrent_indexes(monkeypatch):
+    monkeypatch.setattr(Vector.objects, "_index_writer", None)
+    monkeypatch.setattr(
+        Vector.objects,
+        "index",
+        HNSWIndex(dim=d, max_elements=10, should_not_cache=True),
+    )
+    assert not Vector.objects._get_index_writer().background
+
+    concurrent = ConcurrentIndex(Vector.objects.index, should_not_cache=True)
+    monkeypatch.setattr(Vector.objects, "index", concurrent)
+    assert Vector.objects._get_index_writer().background
+    concurrent.close()
+
+
+def test_updates_keep_the_label_in_its_slot(index):
+    writer = BufferedIndexWriter(index, max_size=100, max_delay=None)
+    embeddings = np.random.rand(3, d).astype(np.float32)
+    writer.add(embeddings, np.arange(3))
+    writer.flush()
+
+    # the delete frees a slot, the update must not be written to it
+    writer.delete([0])
+    writer.flush()
+    writer.update(embeddings[0] + 10, [1])
+    writer.flush()
+
+    labels, distances = index.search(embeddings[1].reshape(1, -1), k=2)
+    assert labels[0].tolist().count(1) <= 1
+    assert 1 not in labels[0][distances[0] < 1e-6].tolist()
+    assert index.get_embeddings([1])[1] == pytest.approx(embeddings[:1] + 10)
+
+
+def test_failed_flush_keeps_the_writes(index, monkeypatch):
+    writer = BufferedIndexWriter(index, max_size=100, max_delay=None)
+    writer.add(np.random.rand(2, d), [0, 1])
+    writer.delete([5])
+
+    def fail(*args):
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(index, "add", fail)
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    assert len(writer) == 3
+
+    monkeypatch.undo()
+    assert writer.flush() == 3
+    assert sorted(index.get_ids().tolist()) == [0, 1]
+
+
+def test_failed_background_flush_is_logged(index, monkeypatch, caplog):
+    writer = BufferedIndexWriter(index, max_size=100, max_delay=0.01, background=True)
+
+    def fail(*args):
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(index, "add", fail)
+    writer.add(np.random.rand(d), [0])
+    deadline = time.monotonic() + 5
+    while "buffered index writes" not in caplog.text:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert len(writer) == 1
+
+
+@pytest.mark.django_db
+def test_search_after_delete_and_update(monkeypatch):
+    from vectordb.settings import vectordb_settings as settings
+
+    monkeypatch.setattr(Vector.objects, "index", None)
+    monkeypatch.setattr(Vector.objects, "_index_writer", None)
+    monkeypatch.setattr(settings, "DEFAULT_MAX_BRUTEFORCE_N", 0)
+    for idx, text in enumerate(["The green fox jumps", "The person walks", "A cat"]):
+        Vector.objects.add_text(idx, text, None)
+    Vector.objects.get_index()
+
+    Vector.objects.get(object_id="2").delete()
+    vector = Vector.objects.get(object_id="1")
+    old_embedding = vector.vector
+    vector.text = "Completely different"
+    vector.embedding = Vector.objects.embedding_fn("Completely different").tobytes()
+    vector.save()
+
+    labels, distances = Vector.objects.get_index().search(
+        old_embedding.reshape(1, -1), k=1
+    )
+    assert labels[0][0] != vector.pk or distances[0][0] > 1e-6
@@ -0,0 +1,179 @@
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from vectordb import ipc
+from vectordb.ann import ConcurrentIndex
+from vectordb.ann.indexes import HNSWIndex
+from vectordb.index_server import OP_DELETE, OP_PING, IndexServer, RemoteIndex
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+from vectordb.utils import build_index
+
+embeddings = np.random.default_rng(0).random((20, 8), dtype=np.float32)
+
+
+@pytest.fixture
+def local_index():
+    index = HNSWIndex(dim=8, max_elements=10, should_not_cache=True)
+    index.add(embeddings, np.arange(20))
+    return index
+
+
+@pytest.fixture
+def server(tmp_path, local_index):
+    server = IndexServer(str(tmp_path / "index.sock"), local_index).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def remote_index(server):
+    return RemoteIndex(address=server.address, should_not_cache=True)
+
+
+def test_search(remote_index, local_index):
+    labels, distances = remote_index.search(embeddings[:3], k=5)
+    expected_labels, expected_distances = local_index.search(embeddings[:3], k=5)
+    assert labels.shape == distances.shape == (3, 5)
+    assert np.array_equal(labels, expected_labels)
+    assert np.allclose(distances, expected_distances)
+
+    labels, _ = remote_index.search(embeddings[0], k=3, ids__in={1, 2, 3, 4})
+    assert set(labels[0].tolist()) <= {1, 2, 3, 4}
+    labels, _ = remote_index.search(embeddings[0], k=3, ids__not_in={0})
+    assert 0 not in labels[0].tolist()
+
+    labels, distances = remote_index.range_search(embeddings[0], 0.0, k=20)
+    assert labels.tolist() == [0]
+
+
+def test_writes(remote_index, server):
+    new = np.random.default_rng(1).random((2, 8), dtype=np.float32)
+    remote_index.add(new, [20, 21])
+    remote_index.update(new[:1], [0])
+    remote_index.delete([5])
+
+    assert remote_index.info() == {
+        "dim": 8,
+        "size": 22,
+        "max_elements": server.index.max_elements,
+        "space": "l2",
+    }
+    assert sorted(remote_index.get_ids().tolist()) == list(range(22))
+    ids, found = remote_index.get_embeddings([0, 5, 21])
+    assert ids.tolist() == [0, 21]
+    assert np.allclose(found, new[[0, 1]])
+
+    remote_index.reset()
+    assert remote_index.size == 0
+
+
+def test_searches_run_concurrently(server):
+    # writes go through a single writer, searches are not serialized
+    assert isinstance(server.index, ConcurrentIndex)
+
+
+def test_persist_and_load(remote_index, server, tmp_path):
+    remote_index.persist(str(tmp_path / "persisted"))
+    persisted = HNSWIndex.load(str(tmp_path / "persisted"))
+    assert sorted(persisted.get_ids().tolist()) == list(range(20))
+
+    client = RemoteIndex.load(server.address)
+    assert isinstance(client, RemoteIndex)
+    assert client.size == 20
+
+
+def test_requests_are_retried_only_when_the_connection_closed(tmp_path):
+    address = str(tmp_path / "fake.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(address)
+    listener.listen()
+    listener.settimeout(1)
+    received = []
+
+    def serve(replies):
+        # one connection per reply: None closes it, False never answers
+        for reply in replies:
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                return
+            received.append(ipc.recv_frame(conn)[0])
+            if reply:
+                ipc.send_frame(conn, ipc.OP_OK)
+            elif reply is False:
+                time.sleep(0.5)
+            conn.close()
+
+    client = RemoteIndex(address=address, timeout=0.2, should_not_cache=True)
+
+    # closed by a server restart: sent again on a new connection
+    thread = threading.Thread(target=serve, args=([None, True],))
+    thread.start()
+    assert client.ping()
+    thread.join()
+    assert received == [OP_PING, OP_PING]
+
+    # the server may still apply a write that timed out, it is not resent
+    received.clear()
+    client._close()
+    thread = threading.Thread(target=serve, args=([False, True],))
+    thread.start()
+    with pytest.raises(OSError):
+        client.delete([1])
+    thread.join()
+    assert received == [OP_DELETE]
+    listener.close()
+
+
+def test_errors_are_raised_by_the_client(remote_index):
+    with pytest.raises(RuntimeError, match="Index server error"):
+        remote_index.search(embeddings[0], k=30)
+    # the connection is still usable
+    assert remote_index.ping()
+
+
+def test_no_server(tmp_path):
+    index = RemoteIndex(address=str(tmp_path / "missing.sock"), should_not_cache=True)
+    with pytest.raises(ConnectionError, match="vectordb_serve"):
+        index.ping()
+
+
+@pytest.mark.django_db
+def test_manager_uses_the_server(monkeypatch, tmp_path):
+    monkeypatch.setattr(vectordb_settings, "INDEX_SERVER", True)
+    monkeypatch.setattr(
+        vectordb_settings, "INDEX_SERVER_ADDRESS", str(tmp_path / "index.sock")
+    )
+    monkeypatch.setattr(vectordb_settings, "DEFAULT_MAX_BRUTEFORCE_N", 0)
+    monkeypatch.setattr(Vector.objects, "index", None)
+    monkeypatch.setattr(Vector.objects, "_index_writer", None)
+
+    Vector.objects.bulk_create(
+        [
+            Vector(
+                text=text,
+                object_id=str(i),
+                embedding=Vector.objects.embedding_fn(text).tobytes(),
+            )
+            for i, text in [(1, "The person walks"), (2, "The cat sleeps")]
+        ]
+    )
+    server = IndexServer(
+        vectordb_settings.INDEX_SERVER_ADDRESS, build_index(Vector.objects)
+    ).start()
+    try:
+        Vector.objects.add_text(3, "The green fox jumps", {})
+        Vector.objects.filter(object_id="2").delete()
+
+        assert isinstance(Vector.objects.get_index(), RemoteIndex)
+        assert server.index.size == 3
+        results = Vector.objects.search("green fox", k=3)
+        assert [vector.object_id for vector in results] == ["3", "1"]
+        assert Vector.objects.check_index().is_consistent
+    finally:
+        server.stop()
@@ -0,0 +1,173 @@
+import time
+
+import pytest
+from django.core.management import call_command
+from django.db import OperationalError
+
+from vectordb import ingestion
+from vectordb.models import SampleModel, Vector
+from vectordb.settings import vectordb_settings
+
+
+@pytest.fixture
+def background(monkeypatch):
+    monkeypatch.setattr(vectordb_settings, "BACKGROUND_INGESTION", True)
+    monkeypatch.setattr(Vector.objects, "index", None)
+    queued = []
+    monkeypatch.setattr(ingestion, "enqueue_pending", queued.append)
+    return queued
+
+
+@pytest.mark.django_db
+def test_add_text_is_stored_as_pending(background):
+    vector = Vector.objects.add_text(1, "The green fox jumps", {"id": 1})
+    vector.refresh_from_db()
+
+    assert vector.status == Vector.Status.PENDING
+    assert vector.embedding is None
+    assert background == [vector]
+    assert Vector.objects.search("green fox").count() == 0
+
+
+@pytest.mark.django_db
+def test_embed_pending(background, monkeypatch):
+    Vector.objects.add_texts(
+        [1, 2, 3],
+        ["The green fox jumps", "The person walks", "The cat sleeps"],
+        [None, None, None],
+    )
+    Vector.objects.add_instance(SampleModel.objects.create(text="A dog barks"))
+
+    calls = []
+    embedding_fn = Vector.objects.embedding_fn
+
+    def counting_embedding_fn(texts):
+        calls.append(texts)
+        return embedding_fn(texts)
+
+    monkeypatch.setattr(Vector.objects, "embedding_fn", counting_embedding_fn)
+    assert ingestion.drain_pending(batch_size=3) == 4
+    assert [len(texts) for texts in calls] == [3, 1]
+
+    assert not Vector.objects.filter(status=Vector.Status.PENDING).exists()
+    vector = Vector.objects.search("green fox", k=1).first()
+    assert vector.text == "The green fox jumps"
+    # the index is built after the vectors were embedded
+    assert vector.status == Vector.Status.EMBEDDED
+    assert vector.vector.shape == (vectordb_settings.DEFAULT_EMBEDDING_DIMENSION,)
+
+
+@pytest.mark.django_db
+def test_embed_pending_adds_to_index(background):
+    index = Vector.objects.get_index()
+    Vector.objects.add_text(1, "The green fox jumps", None)
+    assert ingestion.embed_pending() == 1
+    assert Vector.objects.get_index() is index
+    assert index.size == 1
+    assert Vector.objects.get().status == Vector.Status.INDEXED
+
+
+@pytest.mark.django_db
+def test_embed_pending_without_index(background):
+    Vector.objects.add_text(1, "The green fox jumps", None)
+    assert ingestion.embed_pending() == 1
+    assert Vector.objects.get().status == Vector.Status.EMBEDDED
+    assert ingestion.index_batch([Vector.objects.get().id])["count"] == 0
+    assert Vector.objects.get().status == Vector.Status.EMBEDDED
+
+
+@pytest.mark.django_db
+def test_failed_index_write_stays_embedded(background, monkeypatch):
+    Vector.objects.get_index()
+    Vector.objects.add_text(1, "The green fox jumps", None)
+
+    def failing_flush():
+        raise RuntimeError("The index is full")
+
+    monkeypatch.setattr(Vector.objects, "flush_index", failing_flush)
+    with pytest.raises(RuntimeError):
+        ingestion.embed_pending()
+    assert Vector.objects.get().status == Vector.Status.EMBEDDED
+
+
+@pytest.mark.django_db
+def test_ingest_command(background):
+    Vector.objects.get_index()
+    Vector.objects.add_text(1, "The green fox jumps", None)
+    call_command("vectordb_ingest")
+    assert Vector.objects.get().status == Vector.Status.INDEXED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_recovers_and_drains_queue(monkeypatch):
+    monkeypatch.setattr(Vector.objects, "index", None)
+    # left behind by a previous process
+    Vector.objects.create(text="The green fox jumps", object_id="1", status="pending")
+
+    vectors = [
+        Vector.objects.create(text=f"text {i}", object_id=str(i), status="pending")
+        for i in range(2, 6)
+    ]
+
+    worker = ingestion.IngestionWorker(batch_size=2, queue_size=1, poll_interval=0.05)
+    worker.start()
+    try:
+        # the queue holds a single id, the rest are found by the database scan
+        worker.enqueue([vector.id for vector in vectors], timeout=0)
+
+        deadline = time.monotonic() + 10
+        while True:
+            assert time.monotonic() < deadline
+            try:
+                if not Vector.objects.filter(status=Vector.Status.PENDING).exists():
+                    break
+            except OperationalError:
+                # the in-memory sqlite test database locks the table while the
+                # worker writes to it
+                pass
+            time.sleep(0.05)
+    finally:
+        worker.stop(timeout=5)
+
+    assert not worker.is_alive
+    # there is no index in this process, the vectors are left embedded
+    assert Vector.objects.filter(status=Vector.Status.EMBEDDED).count() == 5
+
+
+@pytest.mark.django_db
+def test_embed_batch_reports_timing(background):
+    Vector.objects.add_texts([1, 2], ["The green fox jumps", "The cat"], [None, None])
+    result = ingestion.embed_batch([vector.id for vector in Vector.objects.all()])
+
+    assert result["count"] == 2
+    assert set(result) == {"count", "embed_time", "write_time", "index_time"}
+    assert all(result[key] >= 0 for key in result)
+
+
+@pytest.mark.django_db
+def test_sweep_pending_in_chunks(background):
+    Vector.objects.add_texts(
+        list(range(5)), [f"text {i}" for i in range(5)], [None] * 5
+    )
+    results = ingestion.sweep_pending(chunk_size=2, max_chunks=2)
+    assert [result["count"] for result in results] == [2, 2]
+    assert Vector.objects.filter(status=Vector.Status.PENDING).count() == 1
+
+    results = ingestion.sweep_pending(chunk_size=2)
+    assert [result["count"] for result in results] == [1]
+
+
+@pytest.mark.django_db
+def test_pending_vectors_are_dispatched_per_transaction(
+    monkeypatch, django_capture_on_commit_callbacks
+):
+    monkeypatch.setattr(vectordb_settings, "BACKGROUND_INGESTION", True)
+    dispatched = []
+    monkeypatch.setattr(ingestion, "dispatch_pending", dispatched.append)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Vector.objects.add_texts([1, 2, 3], ["a", "b", "c"], [None, None, None])
+        Vector.objects.add_text(4, "d", None)
+
+    ids = list(Vector.objects.order_by("id").values_list("id", flat=True))
+    assert dispatched == [ids]
@@ -0,0 +1,73 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+
+dim = vectordb_settings.DEFAULT_EMBEDDING_DIMENSION
+
+
+@pytest.fixture
+def vectors(monkeypatch):
+    monkeypatch.setattr(Vector.objects, "index", None)
+    rng = np.random.default_rng(0)
+    query = rng.random((1, dim), dtype=np.float32)
+    monkeypatch.setattr(Vector.objects, "embedding_fn", lambda texts: query)
+    embeddings = rng.random((40, dim), dtype=np.float32)
+    return Vector.objects.bulk_create(
+        [
+            Vector(text=f"text {i}", object_id=str(i), embedding=embedding.tobytes())
+            for i, embedding in enumerate(embeddings)
+        ]
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("bruteforce", [True, False])
+def test_iter_search_yields_everything_in_order(vectors, monkeypatch, bruteforce):
+    if not bruteforce:
+        monkeypatch.setattr(vectordb_settings, "DEFAULT_MAX_BRUTEFORCE_N", 0)
+    expected = list(Vector.objects.search("query", k=40))
+
+    batches = list(Vector.objects.iter_search("query", batch_size=15))
+
+    assert [len(batch) for batch in batches] == [15, 15, 10]
+    results = [pair for batch in batches for pair in batch]
+    assert [vector.pk for vector, _ in results] == [v.pk for v in expected]
+    assert [distance for _, distance in results] == pytest.approx(
+        [v.distance for v in expected]
+    )
+
+
+@pytest.mark.django_db
+def test_iter_search_reads_one_batch_at_a_time(vectors, django_assert_num_queries):
+    batches = Vector.objects.iter_search("query", batch_size=5, ids_only=True)
+    # the candidates are read once, then the ids need no query
+    with django_assert_num_queries(2):
+        first = next(batches)
+    with django_assert_num_queries(0):
+        second = next(batches)
+    assert len(first) == len(second) == 5
+    assert not set(first) & set(second)
+
+    batches = Vector.objects.iter_search("query", batch_size=5)
+    next(batches)
+    with django_assert_num_queries(1):
+        next(batches)
+
+
+@pytest.mark.django_db
+def test_iter_search_stops_early(vectors):
+    max_distance = sorted(v.distance for v in Vector.objects.search("query", k=40))[11]
+    batches = Vector.objects.iter_search(
+        "query", batch_size=5, max_distance=max_distance, ids_only=True
+    )
+    assert [len(batch) for batch in batches] == [5, 5, 2]
+
+    close = itertools.takewhile(
+        lambda pair: pair[1] <= max_distance,
+        itertools.chain.from_iterable(Vector.objects.iter_search("query", 5)),
+    )
+    assert len(list(close)) == 12
@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from vectordb import matrix as matrix_module
+from vectordb.matrix import EmbeddingMatrix
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+
+embeddings = np.random.default_rng(0).random((6, 8), dtype=np.float32)
+
+
+def test_write_update_delete(tmp_path):
+    matrix = EmbeddingMatrix(str(tmp_path), dim=8)
+    matrix.write(embeddings[:4], [10, 11, 12, 13])
+    matrix.write(embeddings[4], [11])
+    matrix.delete([12, 99])
+
+    ids, found = matrix.get([13, 12, 11, 10])
+    assert ids.tolist() == [13, 11, 10]
+    assert np.array_equal(found, embeddings[[3, 4, 0]])
+    assert len(matrix) == 3
+
+    ids, all_embeddings = matrix.all()
+    assert ids.tolist() == [10, 11, 13]
+    assert np.array_equal(all_embeddings, embeddings[[0, 4, 3]])
+
+    # a deleted id can come back, in a new row
+    matrix.write(embeddings[5], [12])
+    assert np.array_equal(matrix.get([12])[1], embeddings[[5]])
+
+
+def test_shared_between_processes(tmp_path):
+    writer = EmbeddingMatrix(str(tmp_path), dim=8)
+    reader = EmbeddingMatrix(str(tmp_path), dim=8)
+    writer.write(embeddings[:2], [1, 2])
+    assert reader.all()[0].tolist() == [1, 2]
+    # the rows are memory mapped, not copied
+    assert isinstance(reader.all()[1], np.memmap)
+
+    writer.delete([1])
+    writer.write(embeddings[2], [2])
+    ids, found = reader.get([1, 2])
+    assert ids.tolist() == [2]
+    assert np.array_equal(found, embeddings[[2]])
+
+    writer.clear()
+    assert len(reader) == 0
+
+
+def test_rows_are_looked_up_in_the_sorted_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(matrix_module, "MAX_UNSORTED_ROWS", 4)
+    writer = EmbeddingMatrix(str(tmp_path), dim=8)
+    reader = EmbeddingMatrix(str(tmp_path), dim=8)
+    rng = np.random.default_rng(1)
+    ids = rng.permutation(20) + 100
+    rows = rng.random((20, 8), dtype=np.float32)
+    for start in range(0, 20, 3):
+        writer.write(rows[start : start + 3], ids[start : start + 3])
+    writer.delete([ids[0]])
+
+    found, found_rows = reader.get([ids[5], 7, ids[0], ids[19]])
+    assert found.tolist() == [ids[5], ids[19]]
+    assert np.array_equal(found_rows, rows[[5, 19]])
+    # only the rows appended since the last sort are held in a dict
+    assert len(reader._unsorted) <= 4
+    assert isinstance(reader._sorted, np.memmap)
+    assert len(reader) == 19
+
+
+@pytest.fixture
+def matrix_enabled(monkeypatch, tmp_path):
+    monkeypatch.setattr(vectordb_settings, "EMBEDDING_MATRIX", True)
+    monkeypatch.setattr(
+        vectordb_settings, "DEFAULT_PERSISTENT_DIRECTORY", str(tmp_path)
+    )
+    monkeypatch.setattr(Vector.objects, "matrix", None)
+    monkeypatch.setattr(Vector.objects, "index", None)
+
+
+@pytest.mark.django_db
+def test_matrix_follows_the_database(matrix_enabled):
+    # built from the database on first use
+    Vector.objects.add_text(1, "The green fox jumps", {})
+    Vector.objects.add_texts(
+        [2, 3, 4], ["The person walks", "The cat sleeps", "The dog barks"], [{}] * 3
+    )
+    matrix = Vector.objects.get_matrix()
+    assert len(matrix) == 4
+
+    Vector.objects.filter(object_id="4").delete()
+    ids, found = matrix.all()
+    expected = Vector.objects.with_embeddings().order_by("id")
+    assert ids.tolist() == [vector.id for vector in expected]
+    assert np.array_equal(found, np.stack([vector.vector for vector in expected]))
+
+    Vector.objects.reset()
+    assert len(matrix) == 0
+
+
+@pytest.mark.django_db
+def test_search_reads_the_matrix(matrix_enabled):
+    Vector.objects.add_texts(
+        [1, 2, 3],
+        ["The green fox jumps", "The person walks", "The cat sleeps"],
+        [{}] * 3,
+    )
+    expected = [vector.object_id for vector in Vector.objects.search("green fox", k=3)]
+    # a vector written behind the manager's back is read from the database
+    vector = Vector.objects.with_embeddings().get(object_id="3")
+    Vector.objects.get_matrix().delete([vector.id])
+
+    with CaptureQueriesContext(connection) as queries:
+        results = Vector.objects.search("green fox", k=3)
+        assert [vector.object_id for vector in results] == expected
+    embedding_reads = [q for q in queries if '"embedding"' in q["sql"]]
+    assert len(embedding_reads) == 1
+
+    with CaptureQueriesContext(connection) as queries:
+        list(Vector.objects.search("green fox", k=3))
+    assert not [q for q in queries if '"embedding"' in q["sql"]]
@@ -0,0 +1,137 @@
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from vectordb import neighbours
+from vectordb.models import SampleModel, Vector, VectorNeighbour
+from vectordb.neighbours import compute_neighbours, refresh_neighbours
+from vectordb.settings import vectordb_settings
+
+TEXTS = [
+    "The green fox jumps over the fence",
+    "The green fox jumps over the dog",
+    "The person walks in the park",
+    "The person runs in the park",
+    "A cat sleeps on the sofa",
+]
+
+
+@pytest.fixture
+def samples(monkeypatch):
+    monkeypatch.setattr(vectordb_settings, "NEIGHBOURS_K", 3)
+    samples = [SampleModel.objects.create(text=text) for text in TEXTS]
+    Vector.objects.add_instances(samples)
+    # text only vectors are another partition
+    Vector.objects.add_text(1, "The green fox jumps over the fence", None)
+    return samples
+
+
+def get_vector(sample):
+    return Vector.objects.get(object_id=sample.pk, content_type__isnull=False)
+
+
+@pytest.mark.django_db
+def test_compute_neighbours(samples):
+    assert compute_neighbours() == 5
+    vector = get_vector(samples[0])
+    neighbours = list(vector.neighbours.all())
+
+    assert [neighbour.rank for neighbour in neighbours] == [0, 1, 2]
+    assert neighbours[0].neighbour == get_vector(samples[1])
+    assert all(
+        neighbour.neighbour.content_type_id == vector.content_type_id
+        for neighbour in neighbours
+    )
+    distances = [neighbour.distance for neighbour in neighbours]
+    assert distances == sorted(distances)
+
+
+@pytest.mark.django_db
+def test_related_objects_reads_neighbours(
+    samples, monkeypatch, django_assert_num_queries
+):
+    monkeypatch.setattr(vectordb_settings, "USE_PRECOMPUTED_NEIGHBOURS", True)
+    live = list(Vector.objects.search(samples[0], k=3))
+    compute_neighbours()
+
+    with django_assert_num_queries(1):
+        results = Vector.objects.search(samples[0], k=3)
+        assert [vector.pk for vector in results] == [vector.pk for vector in live]
+    assert [round(r.distance, 4) for r in results] == [
+        round(r.distance, 4) for r in live
+    ]
+
+    # more neighbours than were computed, or filters, use a live search
+    assert Vector.objects.search(samples[0], k=4).count() == 4
+    filtered = Vector.objects.filter(text__icontains="person")
+    assert filtered.search(samples[0], k=3).count() == 2
+
+
+@pytest.mark.django_db
+def test_refresh_neighbours(samples):
+    compute_neighbours()
+    assert refresh_neighbours() == 0
+
+    sample = SampleModel.objects.create(text="The green fox jumps over the wall")
+    Vector.objects.add_instance(sample)
+    assert refresh_neighbours() > 1
+    new_vector = get_vector(sample)
+    assert new_vector.neighbours.count() == 3
+    assert VectorNeighbour.objects.filter(
+        vector=get_vector(samples[0]), neighbour=new_vector
+    ).exists()
+
+    get_vector(samples[1]).delete()
+    assert refresh_neighbours() > 0
+    assert all(
+        vector.neighbours.count() == 3
+        for vector in Vector.objects.filter(content_type__isnull=False)
+    )
+
+
+@pytest.mark.django_db
+def test_refresh_loads_each_partition_once(samples, monkeypatch):
+    compute_neighbours()
+    builds = []
+    build_index = neighbours._build_index
+    monkeypatch.setattr(
+        neighbours, "_build_index", lambda *args: builds.append(1) or build_index(*args)
+    )
+    Vector.objects.add_instance(SampleModel.objects.create(text="The green fox"))
+    assert refresh_neighbours() > 1
+    assert len(builds) == 1
+
+
+@pytest.mark.django_db
+def test_refresh_picks_up_writes_made_while_it_runs(samples, monkeypatch):
+    compute_neighbours()
+    Vector.objects.add_instance(SampleModel.objects.create(text="The green fox"))
+    moved = get_vector(samples[2])
+    load_partition = neighbours._load_partition
+
+    def load_while_writing(content_type_id):
+        Vector.objects.filter(pk=moved.pk).update(updated_at=timezone.now())
+        return load_partition(content_type_id)
+
+    monkeypatch.setattr(neighbours, "_load_partition", load_while_writing)
+    refresh_neighbours()
+    monkeypatch.setattr(neighbours, "_load_partition", load_partition)
+
+    refreshed = []
+    compute_partition = neighbours._compute_partition
+
+    def recording_compute(partition, vector_ids, *args):
+        refreshed.append(set(vector_ids))
+        return compute_partition(partition, vector_ids, *args)
+
+    monkeypatch.setattr(neighbours, "_compute_partition", recording_compute)
+    assert refresh_neighbours() > 0
+    assert moved.pk in refreshed[0]
+
+
+@pytest.mark.django_db
+def test_command_and_reset(samples, capsys):
+    call_command("vectordb_neighbours", "--full")
+    assert "Updated the neighbours of 5 vectors" in capsys.readouterr().out
+    Vector.objects.reset()
+    assert VectorNeighbour.objects.count() == 0
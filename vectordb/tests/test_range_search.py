@@ -0,0 +1,105 @@
+import math
+
+import numpy as np
+import pytest
+
+from vectordb.ann.distances import distance_to_score, score_to_distance
+from vectordb.ann.indexes import HNSWIndex
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+
+dim = vectordb_settings.DEFAULT_EMBEDDING_DIMENSION
+
+
+@pytest.fixture
+def query(monkeypatch):
+    """Store 50 vectors and return their squared distances to the query."""
+    monkeypatch.setattr(Vector.objects, "index", None)
+    rng = np.random.default_rng(0)
+    embeddings = rng.random((50, dim), dtype=np.float32)
+    query = rng.random((1, dim), dtype=np.float32)
+    vectors = Vector.objects.bulk_create(
+        [
+            Vector(text=f"text {i}", object_id=str(i), embedding=embedding.tobytes())
+            for i, embedding in enumerate(embeddings)
+        ]
+    )
+    monkeypatch.setattr(Vector.objects, "embedding_fn", lambda texts: query)
+    distances = ((embeddings - query) ** 2).sum(axis=1)
+    return dict(zip([vector.pk for vector in vectors], distances.tolist()))
+
+
+def expected(distances, max_distance, k=None):
+    ids = sorted(
+        (id for id, distance in distances.items() if distance <= max_distance),
+        key=distances.get,
+    )
+    return ids[:k]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("bruteforce", [True, False])
+def test_max_distance(query, monkeypatch, bruteforce):
+    if not bruteforce:
+        monkeypatch.setattr(vectordb_settings, "DEFAULT_MAX_BRUTEFORCE_N", 0)
+    max_distance = float(np.median(list(query.values())))
+
+    results = Vector.objects.search("query", max_distance=max_distance)
+    # every vector within range, without the default k
+    assert [vector.pk for vector in results] == expected(query, max_distance)
+    assert len(results) == 25
+    assert all(vector.distance <= max_distance for vector in results)
+
+    results = Vector.objects.search("query", k=5, max_distance=max_distance)
+    assert [vector.pk for vector in results] == expected(query, max_distance, 5)
+
+    # filtered querysets only search their vectors
+    ids = list(query)[::2]
+    results = Vector.objects.filter(id__in=ids).search(
+        "query", max_distance=max_distance
+    )
+    assert [vector.pk for vector in results] == expected(
+        {id: query[id] for id in ids}, max_distance
+    )
+
+    assert not Vector.objects.search("query", max_distance=0.0)
+
+
+@pytest.mark.django_db
+def test_min_score(query, monkeypatch):
+    min_score = 1 / (1 + float(np.median(list(query.values()))))
+    results = Vector.objects.search("query", min_score=min_score)
+    assert len(results) == 25
+    scores = distance_to_score([vector.distance for vector in results], "l2")
+    assert np.all(scores >= min_score - 1e-6)
+
+    monkeypatch.setattr(vectordb_settings, "DEFAULT_MIN_SCORE", min_score)
+    # DEFAULT_MIN_SCORE applies on top of the default k
+    results = Vector.objects.search("query")
+    assert len(results) == vectordb_settings.DEFAULT_MAX_N_RESULTS
+    assert len(Vector.objects.search("query", k=30)) == 25
+
+
+def test_score_to_distance():
+    assert score_to_distance(0.8, "cosine") == pytest.approx(0.2)
+    assert score_to_distance(0.8, "ip") == pytest.approx(0.2)
+    assert score_to_distance(0.5, "l2") == pytest.approx(1.0)
+    assert score_to_distance(0, "l2") == math.inf
+    assert distance_to_score(1.0, "l2") == pytest.approx(0.5)
+    assert distance_to_score(0.2, "cosine") == pytest.approx(0.8)
+
+
+def test_range_search_expands_k():
+    rng = np.random.default_rng(1)
+    embeddings = rng.random((500, 16), dtype=np.float32)
+    ids = np.arange(500)
+    index = HNSWIndex(dim=16, max_elements=500, should_not_cache=True)
+    index.add(embeddings, ids)
+
+    distances = ((embeddings - embeddings[0]) ** 2).sum(axis=1)
+    max_distance = float(np.sort(distances)[100])
+    labels, found = index.range_search(embeddings[0], max_distance, k=500)
+
+    assert len(labels) == 101
+    assert np.all(found <= max_distance)
+    assert set(labels.tolist()) == set(np.flatnonzero(distances <= max_distance))
@@ -0,0 +1,223 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from vectordb.ann.concurrent import ConcurrentIndex
+from vectordb.ann.indexes import HNSWIndex
+from vectordb.ann.singleton import SingletonMeta
+from vectordb.models import Vector
+from vectordb.registry import IndexRegistry, estimate_index_bytes, get_index_registry
+from vectordb.settings import vectordb_settings
+
+dim = 8
+embeddings = np.random.default_rng(0).random((100, dim), dtype=np.float32)
+
+
+def new_index(max_elements=100):
+    return HNSWIndex(dim=dim, max_elements=max_elements, M=16, should_not_cache=True)
+
+
+def test_estimate_index_bytes():
+    index = new_index()
+    empty = estimate_index_bytes(index)
+    # vectors and bottom layer links are allocated up front
+    assert empty >= 100 * (dim * 4 + 2 * 16 * 4)
+    index.add(embeddings, np.arange(100))
+    assert estimate_index_bytes(index) > empty
+    assert estimate_index_bytes(new_index(1000)) > 9 * empty
+
+    concurrent = ConcurrentIndex(index, should_not_cache=True)
+    assert estimate_index_bytes(concurrent) == estimate_index_bytes(index)
+    concurrent.close()
+
+
+def test_get_creates_and_counts(tmp_path):
+    registry = IndexRegistry(str(tmp_path))
+    with pytest.raises(KeyError):
+        registry.get("a")
+    with pytest.raises(ValueError):
+        registry.get("../a", create=new_index)
+
+    index = registry.get("a", create=new_index)
+    assert registry.get("a") is index
+    assert "a" in registry
+    assert registry.stats() == [
+        {
+            "name": "a",
+            "bytes": estimate_index_bytes(index),
+            "loaded": True,
+            "dirty": True,
+            "hits": 1,
+            "loads": 0,
+            "evictions": 0,
+        }
+    ]
+
+
+def test_tenants_with_the_same_parameters_get_their_own_index(tmp_path):
+    registry = IndexRegistry(str(tmp_path))
+
+    def create():
+        # cached by SingletonMeta outside the registry
+        return HNSWIndex(dim=dim, max_elements=50, M=16)
+
+    tenant_a = registry.get("tenant-a", create=create, write=True)
+    tenant_a.add(embeddings[:10], np.arange(10))
+    tenant_b = registry.get("tenant-b", create=create, write=True)
+    assert tenant_b is not tenant_a
+    assert tenant_b.size == 0
+
+    registry.flush()
+    registry.evict("tenant-a")
+    registry.evict("tenant-b")
+    assert registry.get("tenant-a") is not registry.get("tenant-b")
+    assert registry.get("tenant-b").size == 0
+
+
+def test_lru_eviction_under_budget(tmp_path):
+    one_index = estimate_index_bytes(new_index())
+    registry = IndexRegistry(str(tmp_path), memory_budget=int(2.5 * one_index))
+
+    for name in "abc":
+        registry.get(name, create=new_index, write=True).add(embeddings, np.arange(100))
+    assert registry.memory_used <= registry.memory_budget or len(registry._indexes) == 1
+    registry.get("a")
+    # "b" is the least recently used, it is persisted and unloaded
+    registry.get("d", create=new_index)
+    stats = {stats["name"]: stats for stats in registry.stats()}
+    assert not stats["b"]["loaded"]
+    assert stats["b"]["evictions"] == 1
+    assert os.path.exists(tmp_path / "b" / "index.meta")
+
+    expected = registry.get("a").search(embeddings[:3], k=5)[0]
+    reloaded = registry.get("b")
+    assert np.array_equal(reloaded.search(embeddings[:3], k=5)[0], expected)
+    stats = {stats["name"]: stats for stats in registry.stats()}
+    assert stats["b"]["loads"] == 1
+    assert not stats["b"]["dirty"]
+
+
+def test_clean_indexes_are_not_persisted_again(tmp_path):
+    registry = IndexRegistry(str(tmp_path), memory_budget=1)
+    registry.get("a", create=new_index).add(embeddings, np.arange(100))
+    registry.get("b", create=new_index)
+    path = tmp_path / "a" / "index" / "vector.index"
+    mtime = path.stat().st_mtime_ns
+
+    registry.get("a")
+    registry.get("b")
+    assert path.stat().st_mtime_ns == mtime
+    assert len(registry.get("a").search(embeddings[:1], k=5)[0][0]) == 5
+
+
+def test_eviction_releases_the_singleton(tmp_path):
+    registry = IndexRegistry(str(tmp_path), memory_budget=1)
+    index = HNSWIndex(dim=dim, max_elements=7, M=16)
+    registry.put("a", index)
+    registry.get("b", create=new_index)
+    assert index not in SingletonMeta._instances.values()
+
+
+def test_flush_and_drop(tmp_path):
+    registry = IndexRegistry(str(tmp_path))
+    registry.get("a", create=new_index).add(embeddings, np.arange(100))
+    registry.flush()
+    assert (tmp_path / "a" / "index.meta").exists()
+    registry.drop("a")
+    assert "a" not in registry
+    assert registry.stats() == []
+
+
+def test_get_index_registry(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        vectordb_settings, "DEFAULT_PERSISTENT_DIRECTORY", str(tmp_path)
+    )
+    monkeypatch.setattr(vectordb_settings, "INDEX_MEMORY_BUDGET", 1024)
+    registry = get_index_registry()
+    assert registry is get_index_registry()
+    assert registry.directory == str(tmp_path / "indexes")
+    assert registry.memory_budget == 1024
+
+
+class ClosingIndex:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_held_indexes_are_not_evicted(tmp_path):
+    registry = IndexRegistry(str(tmp_path), memory_budget=1)
+    with registry.hold("a", create=new_index) as index:
+        registry.get("b", create=new_index)
+        registry.get("c", create=new_index)
+        assert registry.peek("a") is index
+        assert registry.peek("b") is None
+    # evicted once released
+    assert registry.peek("a") is None
+
+
+def test_evict_waits_for_the_holders(tmp_path):
+    registry = IndexRegistry(str(tmp_path))
+    released = threading.Event()
+    evicted = threading.Event()
+
+    def search():
+        with registry.hold("a"):
+            released.wait(5)
+
+    registry.get("a", create=new_index, write=True).add(embeddings, np.arange(100))
+    thread = threading.Thread(target=search)
+    with registry.hold("a"):
+        thread.start()
+        # evicting from the thread holding it does not wait for itself
+        evictor = threading.Thread(target=lambda: (registry.evict("a"), evicted.set()))
+        evictor.start()
+        assert not evicted.wait(0.2)
+    assert not evicted.wait(0.2)
+    released.set()
+    thread.join()
+    assert evicted.wait(5)
+    evictor.join()
+    assert registry.peek("a") is None
+    assert registry.get("a").size == 100
+
+
+def test_replaced_index_is_closed_once_released(tmp_path):
+    registry = IndexRegistry(str(tmp_path))
+    first, second = ClosingIndex(), ClosingIndex()
+    registry.put("a", first, persist=False)
+    with registry.hold("a") as index:
+        registry.put("a", second, persist=False)
+        assert index is first and not first.closed
+    assert first.closed
+    assert registry.peek("a") is second and not second.closed
+
+
+@pytest.mark.django_db
+def test_manager_index_is_held_in_the_registry(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        vectordb_settings, "DEFAULT_PERSISTENT_DIRECTORY", str(tmp_path)
+    )
+    monkeypatch.setattr(vectordb_settings, "DEFAULT_MAX_BRUTEFORCE_N", 0)
+    manager = Vector.objects
+    manager.add_texts([1, 2], ["The green fox jumps", "The cat sleeps"], [None] * 2)
+    registry = get_index_registry()
+
+    index = manager.get_index()
+    assert registry.peek(manager.index_name) is index
+    assert registry.memory_used == estimate_index_bytes(index)
+    assert index not in SingletonMeta._instances.values()
+
+    # a tenant index takes the budget, the manager's index is evicted and
+    # built again from the database, it is never persisted
+    monkeypatch.setattr(vectordb_settings, "INDEX_MEMORY_BUDGET", 1)
+    registry = get_index_registry()
+    registry.get("tenant", create=new_index)
+    assert manager.index is None
+    assert not os.path.exists(tmp_path / "indexes" / manager.index_name)
+    assert manager.search("green fox", k=1).first().object_id == "1"
+    assert manager.index is not None and manager.index is not index
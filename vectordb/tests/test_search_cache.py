@@ -0,0 +1,115 @@
+import time
+
+import pytest
+
+from vectordb import cache as search_cache
+from vectordb.cache import SearchCache
+from vectordb.models import Vector
+
+
+@pytest.fixture
+def embedding_calls(monkeypatch):
+    monkeypatch.setattr(search_cache, "_cache", SearchCache(max_size=10, ttl=60))
+    monkeypatch.setattr(search_cache.vectordb_settings, "SEARCH_CACHE_SIZE", 10)
+
+    calls = []
+    embedding_fn = Vector.objects.embedding_fn
+
+    def counting_embedding_fn(texts):
+        calls.append(texts)
+        return embedding_fn(texts)
+
+    monkeypatch.setattr(Vector.objects, "embedding_fn", counting_embedding_fn)
+    Vector.objects.add_texts(
+        [1, 2, 3],
+        ["The green fox jumps", "The person walks", "The cat sleeps"],
+        [{"kind": "animal"}, {"kind": "person"}, {"kind": "animal"}],
+    )
+    calls.clear()
+    return calls
+
+
+def test_lru_and_ttl():
+    cache = SearchCache(max_size=2, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts b, the least recently used
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats() == {
+        "hits": 2,
+        "misses": 2,
+        "evictions": 2,
+        "size": 1,
+        "version": 0,
+    }
+
+
+@pytest.mark.django_db
+def test_repeated_search_is_cached(embedding_calls):
+    first = list(Vector.objects.search("green  fox ", k=2))
+    second = list(Vector.objects.search("green fox", k=2))
+
+    assert first == second
+    assert first[0].text == "The green fox jumps"
+    assert len(embedding_calls) == 1
+    assert search_cache._cache.stats()["hits"] == 1
+
+    # another k or other filters are other searches
+    Vector.objects.search("green fox", k=1)
+    Vector.objects.filter(metadata__kind="animal").search("green fox", k=2)
+    assert len(embedding_calls) == 3
+
+
+@pytest.mark.django_db
+def test_writes_invalidate_the_cache(embedding_calls):
+    Vector.objects.search("green fox", k=1)
+    version = search_cache._cache.version
+
+    Vector.objects.add_text(4, "The green fox jumps high", None)
+    assert search_cache._cache.version > version
+    results = Vector.objects.search("green fox", k=5)
+    assert results.count() == 4
+
+    Vector.objects.filter(object_id="4").update(metadata={"kind": "animal"})
+    Vector.objects.filter(metadata__kind="animal").search("green fox", k=5)
+    assert search_cache._cache.stats()["hits"] == 0
+
+
+@pytest.mark.django_db
+def test_saves_with_a_deferred_embedding_invalidate_the_cache(embedding_calls):
+    Vector.objects.search("green fox", k=1)
+    version = search_cache._cache.version
+
+    # the embedding is deferred, the index is not written to
+    vector = Vector.objects.get(object_id="1")
+    vector.metadata = {"kind": "fox"}
+    vector.save()
+    assert search_cache._cache.version > version
+    results = Vector.objects.search("green fox", k=1)
+    assert results.first().metadata == {"kind": "fox"}
+
+
+@pytest.mark.django_db
+def test_shared_backend(embedding_calls, settings, monkeypatch):
+    settings.CACHES = {
+        "vectordb": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    monkeypatch.setattr(
+        search_cache, "_cache", SearchCache(max_size=10, ttl=60, backend="vectordb")
+    )
+    Vector.objects.search("green fox", k=1)
+
+    # another process, with an empty local cache
+    search_cache._cache.clear()
+    Vector.objects.search("green fox", k=1)
+    assert len(embedding_calls) == 1
+
+    other = SearchCache(max_size=10, ttl=60, backend="vectordb")
+    version = other.version
+    Vector.objects.add_text(4, "The green fox jumps high", None)
+    assert other.version == version + 1
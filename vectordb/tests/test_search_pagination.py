@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from rest_framework.test import APIClient
+
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+
+dim = vectordb_settings.DEFAULT_EMBEDDING_DIMENSION
+
+
+def store(embeddings):
+    vectors = Vector.objects.bulk_create(
+        [
+            Vector(text=f"text {i}", object_id=str(i), embedding=embedding.tobytes())
+            for i, embedding in enumerate(embeddings)
+        ]
+    )
+    return [vector.pk for vector in vectors]
+
+
+@pytest.fixture
+def embed_calls(monkeypatch):
+    monkeypatch.setattr(Vector.objects, "index", None)
+    rng = np.random.default_rng(0)
+    query = rng.random((1, dim), dtype=np.float32)
+    calls = []
+
+    def embedding_fn(texts):
+        calls.append(texts)
+        return query
+
+    monkeypatch.setattr(Vector.objects, "embedding_fn", embedding_fn)
+    return calls
+
+
+def all_pages(page_size, **kwargs):
+    pages = [Vector.objects.search_page("query", page_size, **kwargs)]
+    while pages[-1].has_next:
+        pages.append(
+            Vector.objects.search_page(
+                page_size=page_size, cursor=pages[-1].next_cursor
+            )
+        )
+    return pages
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("bruteforce", [True, False])
+def test_pages_cover_the_results_once(embed_calls, monkeypatch, bruteforce):
+    if not bruteforce:
+        monkeypatch.setattr(vectordb_settings, "DEFAULT_MAX_BRUTEFORCE_N", 0)
+    store(np.random.default_rng(1).random((50, dim), dtype=np.float32))
+    expected = [vector.pk for vector in Vector.objects.search("query", k=50)]
+
+    pages = all_pages(7)
+
+    assert [len(page) for page in pages] == [7] * 7 + [1]
+    assert [vector.pk for page in pages for vector in page] == expected
+    # later pages reuse the query embedding from the cursor
+    assert len(embed_calls) == 2
+
+
+@pytest.mark.django_db
+def test_ties_at_page_boundaries(embed_calls):
+    embedding = np.random.default_rng(2).random(dim, dtype=np.float32)
+    ids = store(np.tile(embedding, (10, 1)))
+
+    pages = all_pages(3)
+
+    assert sorted(vector.pk for page in pages for vector in page) == ids
+
+
+@pytest.mark.django_db
+def test_cursor_keeps_thresholds(embed_calls):
+    store(np.random.default_rng(3).random((20, dim), dtype=np.float32))
+    max_distance = sorted(v.distance for v in Vector.objects.search("query", k=20))[9]
+
+    pages = all_pages(4, max_distance=max_distance)
+
+    assert [len(page) for page in pages] == [4, 4, 2]
+
+
+@pytest.mark.django_db
+def test_invalid_cursor(embed_calls):
+    page = Vector.objects.search_page("query", 2)
+    assert page.next_cursor is None
+
+    store(np.random.default_rng(4).random((5, dim), dtype=np.float32))
+    cursor = Vector.objects.search_page("query", 2).next_cursor
+    with pytest.raises(ValueError):
+        Vector.objects.search_page(cursor=cursor[:-2] + "xx")
+
+
+@pytest.mark.django_db
+def test_search_endpoint_pages(embed_calls):
+    store(np.random.default_rng(5).random((5, dim), dtype=np.float32))
+    client = APIClient()
+
+    response = client.get("/vectordb/search/", {"query": "example", "page_size": 3})
+    assert response.status_code == 200
+    first = [vector["text"] for vector in response.data["results"]]
+    assert len(first) == 3
+
+    response = client.get(
+        "/vectordb/search/", {"cursor": response.data["next"], "page_size": 3}
+    )
+    assert response.status_code == 200
+    second = [vector["text"] for vector in response.data["results"]]
+    assert response.data["next"] is None
+    assert sorted(first + second) == [f"text {i}" for i in range(5)]
+
+    response = client.get("/vectordb/search/", {"cursor": "invalid"})
+    assert response.status_code == 400
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+from vectordb.ann.sharded import ShardedIndex, merge_topk
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+from vectordb.utils import build_index
+
+embeddings = np.random.default_rng(0).random((50, 8), dtype=np.float32)
+
+
+@pytest.fixture(scope="module")
+def sharded():
+    index = ShardedIndex(dim=8, max_elements=10, n_shards=3, should_not_cache=True)
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def index(sharded):
+    sharded.reset()
+    sharded.add(embeddings, np.arange(50))
+    return sharded
+
+
+def exact_search(query, k, ids=range(50)):
+    ids = np.asarray(list(ids))
+    distances = ((embeddings[ids][None] - query[:, None]) ** 2).sum(-1)
+    order = np.argsort(distances, axis=1)[:, :k]
+    return ids[order], np.take_along_axis(distances, order, axis=1)
+
+
+def test_merge_topk():
+    labels, distances = merge_topk(
+        [np.array([[1, 4]]), np.array([[2, 5, 6]]), np.empty((1, 0))],
+        [np.array([[0.1, 0.4]]), np.array([[0.2, 0.3, 0.9]]), np.empty((1, 0))],
+        k=3,
+    )
+    assert labels.tolist() == [[1, 2, 5]]
+    assert distances.tolist() == [[0.1, 0.2, 0.3]]
+
+
+def test_shards_hold_their_ids(index):
+    assert index.size == 50
+    assert sorted(index.get_ids().tolist()) == list(range(50))
+    ids, found = index.get_embeddings([3, 4, 5, 99])
+    assert sorted(ids.tolist()) == [3, 4, 5]
+    assert np.allclose(found[np.argsort(ids)], embeddings[[3, 4, 5]])
+
+
+def test_get_embeddings_keeps_the_order(index):
+    # the ids are spread over the three shards
+    ids, found = index.get_embeddings([7, 99, 2, 30, 4, 11, 0])
+    assert ids.tolist() == [7, 2, 30, 4, 11, 0]
+    assert np.allclose(found, embeddings[[7, 2, 30, 4, 11, 0]])
+
+
+def test_search_merges_the_shards(index):
+    labels, distances = index.search(embeddings[:4], k=5)
+    expected_labels, expected_distances = exact_search(embeddings[:4], 5)
+    assert labels.shape == (4, 5)
+    assert np.array_equal(labels, expected_labels)
+    assert np.allclose(distances, expected_distances, atol=1e-5)
+
+
+def test_filtered_search(index):
+    allowed = {1, 2, 7, 11, 30}
+    labels, _ = index.search(embeddings[:1], k=3, ids__in=allowed)
+    assert np.array_equal(labels, exact_search(embeddings[:1], 3, sorted(allowed))[0])
+
+    labels, _ = index.search(embeddings[:1], k=3, ids__not_in={0, 1, 2})
+    expected = exact_search(embeddings[:1], 3, range(3, 50))[0]
+    assert np.array_equal(labels, expected)
+
+    labels, distances = index.range_search(embeddings[0], 0.0, k=50)
+    assert labels.tolist() == [0]
+
+
+def test_writes_are_routed(index):
+    index.delete([0])
+    index.update(embeddings[1], [2])
+    labels, _ = index.search(embeddings[:1], k=1)
+    assert labels[0, 0] != 0
+    ids, found = index.get_embeddings([2])
+    assert np.allclose(found, embeddings[[1]])
+
+    with pytest.raises(RuntimeError):
+        index.search(embeddings[:1], k=100)
+    # the shards are still in sync after an error
+    assert index.size == 50
+
+
+def test_search_after_delete(index):
+    index.delete([0, 1, 2])
+    labels, _ = index.search(embeddings[:1], k=47)
+    assert sorted(labels[0].tolist()) == list(range(3, 50))
+
+    labels, _ = index.search(embeddings[:1], k=1, ids__in={0, 1, 2, 3})
+    assert labels.tolist() == [[3]]
+    with pytest.raises(RuntimeError):
+        index.search(embeddings[:1], k=48)
+
+
+def test_persist_and_load(index, tmp_path):
+    index.persist(str(tmp_path / "index"))
+    loaded = ShardedIndex.load(str(tmp_path / "index"))
+    try:
+        assert loaded.n_shards == 3
+        labels, _ = loaded.search(embeddings[:2], k=4)
+        assert np.array_equal(labels, index.search(embeddings[:2], k=4)[0])
+    finally:
+        loaded.close()
+
+
+@pytest.mark.django_db
+def test_build_sharded_index(monkeypatch):
+    monkeypatch.setattr(vectordb_settings, "INDEX_SHARDS", 2)
+    monkeypatch.setattr(vectordb_settings, "DEFAULT_EMBEDDING_DIMENSION", 8)
+    vectors = Vector.objects.bulk_create(
+        [
+            Vector(text=f"text {i}", object_id=str(i), embedding=embedding.tobytes())
+            for i, embedding in enumerate(embeddings[:10])
+        ]
+    )
+    index = build_index(Vector.objects)
+    try:
+        assert isinstance(index, ShardedIndex)
+        assert sorted(index.get_ids().tolist()) == [vector.pk for vector in vectors]
+        labels, _ = index.search(embeddings[3], k=1)
+        assert labels[0, 0] == vectors[3].pk
+    finally:
+        index.close()
@@ -26,3 +26,11 @@ def test_singleton_meta():
 
     assert instance5 is instance6
     assert instance1 is not instance5
+
+
+def test_uncached():
+    instance = TSingleton("uncached")
+    with SingletonABCMeta.uncached():
+        assert TSingleton("uncached") is not instance
+        assert TSingleton("other") is not TSingleton("other")
+    assert TSingleton("uncached") is instance
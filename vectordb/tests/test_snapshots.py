@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+
+from vectordb.models import Vector
+from vectordb.settings import vectordb_settings
+from vectordb.snapshots import (
+    SnapshotReader,
+    current_version,
+    load_snapshot,
+    publish_snapshot,
+)
+from vectordb.utils import build_index
+
+dim = vectordb_settings.DEFAULT_EMBEDDING_DIMENSION
+
+
+@pytest.fixture
+def snapshots(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        vectordb_settings, "DEFAULT_PERSISTENT_DIRECTORY", str(tmp_path)
+    )
+    monkeypatch.setattr(vectordb_settings, "INDEX_SNAPSHOTS", True)
+    monkeypatch.setattr(vectordb_settings, "INDEX_SNAPSHOT_POLL_INTERVAL", 0)
+    monkeypatch.setattr(Vector.objects, "index", None)
+    monkeypatch.setattr(Vector.objects, "snapshots", None)
+    return tmp_path / "snapshots"
+
+
+def add_vectors(start, stop):
+    Vector.objects.bulk_create(
+        [
+            Vector(
+                text=f"text {i}",
+                object_id=str(i),
+                embedding=np.random.rand(dim).astype(np.float32).tobytes(),
+            )
+            for i in range(start, stop)
+        ]
+    )
+
+
+@pytest.mark.django_db
+def test_publish_snapshot(snapshots):
+    add_vectors(0, 5)
+    index = build_index(Vector.objects)
+    assert current_version() is None
+
+    versions = [publish_snapshot(index, keep=2) for _ in range(3)]
+    assert versions == sorted(versions, key=int)
+    assert current_version() == versions[-1]
+    # the oldest one was pruned
+    assert sorted(os.listdir(snapshots)) == sorted(["CURRENT", *versions[1:]])
+
+    loaded = load_snapshot(versions[-1])
+    assert loaded is not index
+    assert sorted(loaded.index.get_ids_list()) == sorted(index.index.get_ids_list())
+
+
+@pytest.mark.django_db
+def test_reader_polls_the_version_file(snapshots):
+    add_vectors(0, 5)
+    reader = SnapshotReader(poll_interval=3600)
+    assert reader.poll() is None
+
+    publish_snapshot(build_index(Vector.objects))
+    # checked less than poll_interval ago
+    assert reader.poll() is None
+    reader._checked_at = None
+    assert reader.poll().size == 5
+    assert reader.poll() is None
+
+
+@pytest.mark.django_db
+def test_workers_swap_in_new_snapshots(snapshots):
+    add_vectors(0, 5)
+    call_command("vectordb_snapshot")
+    index = Vector.objects.get_index()
+    assert index.size == 5
+    assert Vector.objects.get_index() is index
+
+    # writes are left to the next snapshot
+    Vector.objects.add_text(5, "The green fox jumps", {})
+    assert Vector.objects.get_index() is index
+    assert index.size == 5
+
+    call_command("vectordb_snapshot")
+    new_index = Vector.objects.get_index()
+    assert new_index is not index
+    assert new_index.size == 6
+    assert index.size == 5
+    assert Vector.objects.search("green fox", k=1)[0].object_id == "5"
+
+
+@pytest.mark.django_db
+def test_no_snapshot_builds_the_index(snapshots):
+    add_vectors(0, 3)
+    assert Vector.objects.get_index().size == 3
+    assert Vector.objects.snapshots.version is None
@@ -0,0 +1,62 @@
+import pytest
+from django.contrib.contenttypes.models import ContentType
+
+from django.contrib.auth.models import Group
+
+from vectordb.models import SampleModel, Vector
+
+
+@pytest.fixture
+def objects(monkeypatch):
+    monkeypatch.setattr(Vector.objects, "index", None)
+    samples = [
+        SampleModel.objects.create(text=f"The green fox jumps {i}") for i in range(5)
+    ]
+    Vector.objects.add_instances(samples)
+    groups = [Group.objects.create(name=f"The green fox {i}") for i in range(5)]
+    embeddings = Vector.objects.embedding_fn([group.name for group in groups])
+    Vector.objects.bulk_create(
+        [
+            Vector(content_object=group, text=group.name, embedding=embedding.tobytes())
+            for group, embedding in zip(groups, embeddings)
+        ]
+    )
+    Vector.objects.add_text(100, "The green fox jumps", {})
+    return samples + groups
+
+
+@pytest.mark.django_db
+def test_unwrap_reads_each_model_once(objects, django_assert_num_queries):
+    results = Vector.objects.search("The green fox", k=11)
+    vectors = list(results)
+    ContentType.objects.clear_cache()
+
+    # the results are cached, one query per content type and one per model
+    with django_assert_num_queries(2 + 2):
+        unwrapped = results.unwrap()
+
+    assert len(unwrapped) == 10
+    assert set(unwrapped) == set(objects)
+    # same order and distances as the vectors
+    expected = [v for v in vectors if v.content_type_id is not None]
+    assert [obj.distance for obj in unwrapped] == [v.distance for v in expected]
+    assert [obj.pk for obj in unwrapped] == [int(v.object_id) for v in expected]
+
+
+@pytest.mark.django_db
+def test_unwrap_querysets(objects):
+    results = Vector.objects.search("The green fox", k=11)
+    unwrapped = results.unwrap(querysets={SampleModel: SampleModel.objects.only("id")})
+    samples = [obj for obj in unwrapped if isinstance(obj, SampleModel)]
+    assert len(samples) == 5
+    assert samples[0].get_deferred_fields() == {"text"}
+
+
+@pytest.mark.django_db
+def test_unwrap_skips_deleted_objects(objects):
+    results = Vector.objects.search("The green fox", k=11)
+    list(results)
+    # delete the row without the signals that delete its vector
+    SampleModel.objects.filter(pk=objects[0].pk)._raw_delete("default")
+    assert objects[0] not in results.unwrap()
+    assert len(results.unwrap()) == 9
@@ -186,3 +186,110 @@ def test_search_with_content_type_filter():
         assert (
             "user" not in match.metadata
         )  # user metadata is only set in the add_text calls
+
+
+@pytest.mark.django_db
+def test_search_with_ann_index(monkeypatch):
+    from vectordb.settings import vectordb_settings
+
+    manager = Vector.objects
+    monkeypatch.setattr(vectordb_settings, "DEFAULT_MAX_BRUTEFORCE_N", 5)
+    monkeypatch.setattr(manager, "index", None)
+
+    for idx in range(1, 20):
+        manager.add_text(idx, f"Sample text {idx}", {"user": idx % 2})
+    manager.add_text(100, "The green fox jumps", {"user": 1})
+
+    results = manager.search("green fox", k=1)
+    assert results.first().object_id == "100"
+    assert manager.index is not None
+
+    results = manager.filter(metadata__user=0).search("green fox", k=3)
+    assert len(results) == 3
+    assert all(vector.metadata["user"] == 0 for vector in results)
+
+
+@pytest.mark.django_db
+def test_search_bruteforce_threshold(monkeypatch):
+    from vectordb.settings import vectordb_settings
+
+    manager = Vector.objects
+    monkeypatch.setattr(manager, "index", None)
+    for idx in range(1, 7):
+        manager.add_text(idx, f"Sample text {idx}", None)
+
+    # up to DEFAULT_MAX_BRUTEFORCE_N vectors are searched exactly
+    monkeypatch.setattr(vectordb_settings, "DEFAULT_MAX_BRUTEFORCE_N", 6)
+    assert len(manager.search("Sample text 1", k=2)) == 2
+    assert manager.index is None
+
+    monkeypatch.setattr(vectordb_settings, "DEFAULT_MAX_BRUTEFORCE_N", 5)
+    assert len(manager.search("Sample text 2", k=2)) == 2
+    assert manager.index is not None
+
+
+@pytest.mark.django_db
+def test_filtered_search_builds_the_index_from_every_vector(monkeypatch):
+    from vectordb.settings import vectordb_settings
+
+    manager = Vector.objects
+    monkeypatch.setattr(vectordb_settings, "DEFAULT_MAX_BRUTEFORCE_N", 5)
+    monkeypatch.setattr(manager, "index", None)
+    for idx in range(1, 21):
+        manager.add_text(idx, f"Sample text {idx}", {"user": idx % 2})
+
+    # the first search needing the index is filtered, the index is not
+    results = manager.filter(metadata__user=0).search("Sample text", k=3)
+    assert all(vector.metadata["user"] == 0 for vector in results)
+    assert manager.index.size == 20
+
+    results = manager.filter(metadata__user=1).search("Sample text", k=3)
+    assert len(results) == 3
+    assert all(vector.metadata["user"] == 1 for vector in results)
+
+
+@pytest.mark.django_db
+def test_search_filters_the_index_with_a_set_of_ids(monkeypatch):
+    from vectordb.settings import vectordb_settings
+
+    manager = Vector.objects
+    monkeypatch.setattr(vectordb_settings, "DEFAULT_MAX_BRUTEFORCE_N", 5)
+    monkeypatch.setattr(manager, "index", None)
+    for idx in range(1, 21):
+        manager.add_text(idx, f"Sample text {idx}", {"user": idx % 2})
+    index = manager.get_index()
+
+    filters = []
+    search = index.search
+
+    def spy(query, k=10, **kwargs):
+        filters.append(kwargs.get("ids__in"))
+        return search(query, k, **kwargs)
+
+    monkeypatch.setattr(index, "search", spy)
+    manager.filter(metadata__user=0).search("Sample text", k=3)
+
+    # the filter is called for every visited node, membership must be O(1)
+    (ids_in,) = filters
+    assert isinstance(ids_in, set)
+    assert ids_in == set(manager.filter(metadata__user=0).values_list("id", flat=True))
+
+
+@pytest.mark.django_db
+def test_related_objects_reads_the_stored_embedding_once(
+    monkeypatch, django_assert_num_queries
+):
+    from vectordb.models import SampleModel
+
+    manager = Vector.objects
+    sample_instance = SampleModel.objects.create(text="The green fox jumps")
+    vector = manager.add_instance(sample_instance)
+    ContentType.objects.get_for_model(sample_instance)
+
+    def embedding_fn(texts):
+        raise AssertionError("the stored embedding is used")
+
+    monkeypatch.setattr(manager, "embedding_fn", embedding_fn)
+    with django_assert_num_queries(1):
+        embedding = manager.get_queryset()._get_query_embedding(sample_instance)
+    assert (embedding == vector.vector.reshape(1, -1)).all()
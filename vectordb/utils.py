@@ -11,13 +11,12 @@ from django.db import models
 
 from vectordb.settings import vectordb_settings
 
+from .encoding import decode_embeddings, encode_embedding
 from .validators import validate_vector_data
 
 try:
     import celery  # noqa
 
-    from . import tasks
-
     has_celery = True
     # check if celery settings are configured
     if not hasattr(settings, "CELERY_BROKER_URL"):
@@ -56,8 +55,18 @@ def serializer(obj):
     return flatten_object_json(data)
 
 
+def _queue_embedding(vector):
+    """Embed ``vector`` in the background once the transaction commits."""
+    from .ingestion import enqueue_pending
+
+    enqueue_pending(vector)
+
+
+def _use_background_ingestion():
+    return vectordb_settings.BACKGROUND_INGESTION or has_celery
+
+
 def create_vector_from_instance(manager, instance):
-    embedding_fn, embedding_dim = get_embedding_function()
     if hasattr(instance, "get_vectordb_text"):
         text = instance.get_vectordb_text()
     else:
@@ -71,12 +80,22 @@ def create_vector_from_instance(manager, instance):
     else:
         metadata = serializer(instance)
 
-    embedding = embedding_fn(text)
+    if _use_background_ingestion():
+        vector = manager.create(
+            content_object=instance,
+            text=text,
+            metadata=metadata,
+            status=manager.model.Status.PENDING,
+        )
+        _queue_embedding(vector)
+        return vector
+
+    embedding = manager.embedding_fn(text)
 
     return manager.create(
         content_object=instance,
         text=text,
-        embedding=embedding.astype("float32").tobytes(),
+        embedding=encode_embedding(embedding),
         metadata=metadata,
     )
 
@@ -89,11 +108,6 @@ def create_vector_from_text(
     content_type=None,
     embedding=None,
 ):
-    embedding_fn, embedding_dim = get_embedding_function()
-
-    if embedding is None and not has_celery:
-        embedding = embedding_fn(text)
-
     validate_vector_data(
         manager=manager,
         text=text,
@@ -102,18 +116,26 @@ def create_vector_from_text(
         embedding=embedding,
     )
 
-    vector = manager.create(
+    if embedding is None and _use_background_ingestion():
+        vector = manager.create(
+            text=text,
+            metadata=metadata,
+            object_id=object_id,
+            status=manager.model.Status.PENDING,
+        )
+        _queue_embedding(vector)
+        return vector
+
+    if embedding is None:
+        embedding = manager.embedding_fn(text)
+
+    return manager.create(
         text=text,
         metadata=metadata,
-        embedding=np.array(embedding).astype("float32").tobytes(),
+        embedding=encode_embedding(embedding),
         object_id=object_id,
     )
 
-    if embedding is not None and has_celery:
-        embedding = tasks.create_vector.delay(text)
-
-    return vector
-
 
 def get_embedding_function():
     embedding_fn = vectordb_settings.DEFAULT_EMBEDDING_CLASS(
@@ -123,21 +145,70 @@ def get_embedding_function():
     return embedding_fn, embedding_dim
 
 
-def _populate_index(manager: models.Manager):
-    vectors = manager.only("id", "embedding").all()
-    vector_count = vectors.count()
+def _populate_index(manager: models.Manager, index=None):
+    index = index if index is not None else manager.index
+    matrix = manager.get_matrix()
+    if matrix is not None:
+        ids, embeddings = matrix.all()
+        if len(ids):
+            index.add(embeddings=embeddings, ids=ids)
+        return index
+    # pending vectors have no embedding yet, the ingestion adds them later
+    rows = list(
+        manager.exclude(status=manager.model.Status.PENDING).values_list(
+            "id", "embedding"
+        )
+    )
+    if not rows:
+        return index
+
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    embeddings = decode_embeddings([row[1] for row in rows])
+    index.add(embeddings=embeddings, ids=ids)
+    return index
 
-    ids_list = []
-    embeddings_list = []
-    for vector in vectors:
-        ids_list.append(vector.id)
-        embeddings_list.append(vector.embedding)
-    embeddings = np.frombuffer(b"".join(embeddings_list)).reshape(vector_count, -1)
-    manager.index.add(embeddings=embeddings, ids=np.array(ids_list))
+
+def build_index(manager: models.Manager):
+    """Build a new HNSW index holding every vector in the database.
+
+    The index is split across INDEX_SHARDS processes when the setting is
+    enabled, see `vectordb.ann.sharded`, or wrapped in a `ConcurrentIndex`
+    with CONCURRENT_INDEX.
+    """
+    from .ann.concurrent import ConcurrentIndex
+    from .ann.indexes import HNSWIndex
+    from .ann.sharded import ShardedIndex
+
+    max_elements = max(manager.exclude(status=manager.model.Status.PENDING).count(), 1)
+    if vectordb_settings.INDEX_SHARDS:
+        index = ShardedIndex(
+            max_elements=max_elements,
+            dim=vectordb_settings.DEFAULT_EMBEDDING_DIMENSION,
+            space=vectordb_settings.DEFAULT_EMBEDDING_SPACE,
+            n_shards=vectordb_settings.INDEX_SHARDS,
+            affinity=vectordb_settings.INDEX_SHARD_AFFINITY,
+            should_not_cache=True,
+        )
+    else:
+        index = HNSWIndex(
+            max_elements=max_elements,
+            dim=vectordb_settings.DEFAULT_EMBEDDING_DIMENSION,
+            space=vectordb_settings.DEFAULT_EMBEDDING_SPACE,
+            should_not_cache=True,
+        )
+        if vectordb_settings.CONCURRENT_INDEX:
+            index = ConcurrentIndex(
+                index,
+                max_pending=vectordb_settings.INDEX_WRITE_QUEUE_SIZE,
+                should_not_cache=True,
+            )
+    return _populate_index(manager, index)
 
 
 def populate_index(manager: models.Manager):
     if has_celery:
+        from . import tasks
+
         tasks.populate_index.delay()
     else:
         _populate_index(manager=manager)
@@ -23,14 +23,24 @@ class VectorViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"], url_path="search")
     def search_vectors(self, request):
         query = request.query_params.get("query", None)
-        k = int(request.query_params.get("k", 10))
+        cursor = request.query_params.get("cursor", None)
 
-        if query is None:
+        if query is None and cursor is None:
             return Response({"error": "A query parameter is required."}, status=400)
 
         try:
+            if cursor is not None or "page_size" in request.query_params:
+                return self._search_page(request, query, cursor)
+            k = int(request.query_params.get("k", 10))
             results = self.queryset.search(query, k=k)
             serializer = self.get_serializer(results, many=True)
             return Response(serializer.data)
         except ValueError as e:
             return Response({"error": str(e)}, status=400)
+
+    def _search_page(self, request, query, cursor):
+        """Return a page of results and the cursor of the next one."""
+        page_size = int(request.query_params.get("page_size", 10))
+        page = self.queryset.search_page(query, page_size, cursor=cursor)
+        serializer = self.get_serializer(page.results, many=True)
+        return Response({"results": serializer.data, "next": page.next_cursor})